@@ -1,49 +1,118 @@
 """
 This module implements the Authentication Model for the cTrack Server.
 
-Users are stored in the `users.dat` file. Please use the given functions to modify users
+Users are stored in the `users.dat` file, or a SQLite database (see `user_stores`). Please use the given functions to
+modify users
 """
+import collections
+import datetime
 import flask
 from functools import wraps  # To create the authorization decorator
+import hashlib
 import jwt
-from typing import Dict
+from typing import Dict, Iterable, Optional, Tuple
 import werkzeug.security
 import os
 import secrets
+import tempfile
+import threading
+import time
 import configparser
 
+from aas_repository_server import user_stores
+
 config = configparser.ConfigParser()
 config.read([
     os.path.join(os.path.dirname(__file__), "config.ini"),
     os.path.join(os.path.dirname(__file__), "config.ini.default")
 ])
-USER_FILE = config["AUTHENTICATION"]["USER_FILE"]
+# Storage of the users, see `user_stores`
+USER_STORE = config["AUTHENTICATION"]["USER_STORE"]
+# Paths relative to the directory of this module
+USER_FILE = os.path.join(os.path.dirname(__file__), config["AUTHENTICATION"]["USER_FILE"])
+USER_DATABASE = os.path.join(os.path.dirname(__file__), config["AUTHENTICATION"]["USER_DATABASE"])
+SECRET_KEY_FILE = os.path.join(os.path.dirname(__file__), config["AUTHENTICATION"]["SECRET_KEY_FILE"])
+# Maximum number of validated tokens kept in the TOKEN_CACHE
+TOKEN_CACHE_SIZE = int(config["AUTHENTICATION"]["TOKEN_CACHE_SIZE"])
+# JWT Expiration Time in minutes
+TOKEN_EXPIRATION_TIME = int(config["AUTHENTICATION"]["TOKEN_EXPIRATION_TIME"])
+REFRESH_TOKEN_EXPIRATION_TIME = int(config["AUTHENTICATION"]["REFRESH_TOKEN_EXPIRATION_TIME"])
+# Method and salt length of `werkzeug.security.generate_password_hash`
+PASSWORD_HASH_METHOD = config["AUTHENTICATION"]["PASSWORD_HASH_METHOD"]
+PASSWORD_SALT_LENGTH = int(config["AUTHENTICATION"]["PASSWORD_SALT_LENGTH"])
+# Login attempts per minute and client address, and the number of attempts that may be made at once
+LOGIN_RATE_LIMIT = float(config["AUTHENTICATION"]["LOGIN_RATE_LIMIT"])
+LOGIN_BURST = int(config["AUTHENTICATION"]["LOGIN_BURST"])
+
+
+def load_secret_key(file_path: str) -> str:
+    """
+    Read the key signing the tokens from the given file, creating the file with a random key, if it does not exist yet
+
+    All server processes using the same file share the key, so that a token issued by one of them is accepted by the
+    others. The file is created atomically and readable by its owner only.
+    """
+    if not os.path.exists(file_path):
+        file_descriptor, temp_file_path = tempfile.mkstemp(prefix=".", dir=os.path.dirname(file_path))
+        try:
+            with os.fdopen(file_descriptor, "w") as file:
+                file.write(secrets.token_hex(64))
+                file.flush()
+                os.fsync(file.fileno())
+            # Unlike a rename, a hard link fails if another process created the file in the meantime
+            os.link(temp_file_path, file_path)
+        except FileExistsError:
+            pass
+        finally:
+            os.remove(temp_file_path)
+    with open(file_path) as file:
+        return file.read().strip()
 
 
-SECRET_KEY = secrets.token_hex(64)
+SECRET_KEY = config["AUTHENTICATION"]["SECRET_KEY"] or load_secret_key(SECRET_KEY_FILE)
 
 
 def load_user_file() -> Dict[str, str]:
-    users: Dict[str, str] = {}
-    with open(os.path.join(os.path.dirname(__file__), "users.dat"), "r") as file:
-        data = file.read().rstrip("\n").split("\n")
-        for i in data:
-            try:
-                usr, psw = i.split(", ")
-                users[usr] = psw
-            except ValueError:
-                pass
-    return users
+    return user_stores.load_user_file(USER_FILE)
 
 
 def save_user_file():
-    with open(os.path.join(os.path.dirname(__file__), "users.dat"), "w") as file:
-        for usr, psw in USERS.items():
-            file.write(usr + ", " + psw + "\n")
-        file.close()
+    """
+    Persist the changes of the users, if the user store does not persist them immediately
+    """
+    USERS.save()
 
 
-USERS: Dict[str, str] = load_user_file()
+if USER_STORE == "file":
+    USERS: user_stores.UserStore = user_stores.FileUserStore(USER_FILE)
+elif USER_STORE == "sqlite":
+    USERS = user_stores.SQLiteUserStore(USER_DATABASE)
+else:
+    raise ValueError("Unknown user store {}".format(USER_STORE))
+
+
+def hash_password(password: str) -> str:
+    """
+    Hash the given password with the configured PASSWORD_HASH_METHOD and PASSWORD_SALT_LENGTH
+    """
+    return werkzeug.security.generate_password_hash(password, method=PASSWORD_HASH_METHOD,
+                                                    salt_length=PASSWORD_SALT_LENGTH)
+
+
+# The method as it is stored in the hashes, including the default parameters werkzeug adds, e.g. the iterations of
+# `pbkdf2:sha256`
+_STORED_PASSWORD_HASH_METHOD: str = hash_password("").split("$", 1)[0]
+
+
+def needs_rehash(password_hash: str) -> bool:
+    """
+    Check if the given password hash was not created with the configured method and salt length
+    """
+    try:
+        method, salt, _ = password_hash.split("$", 2)
+    except ValueError:
+        return True
+    return method != _STORED_PASSWORD_HASH_METHOD or len(salt) != PASSWORD_SALT_LENGTH
 
 
 def add_user(username: str, password: str):
@@ -53,10 +122,19 @@ def add_user(username: str, password: str):
     :param username:
     :param password:
     """
-    hashed_password: str = werkzeug.security.generate_password_hash(password, method="sha256")
+    hashed_password: str = hash_password(password)
     USERS[username] = hashed_password
 
 
+def add_users(users: Iterable[Tuple[str, str]]):
+    """
+    Add multiple Users to the Users list at once, e.g. to provision service accounts
+
+    :param users: Tuples of username and password
+    """
+    USERS.add_all((username, hash_password(password)) for username, password in users)
+
+
 def remove_user(username: str):
     """
     Remove an user from the Users list
@@ -88,6 +166,81 @@ def check_if_user_exists(username: str) -> bool:
     return True
 
 
+def check_password(username: str, password: str) -> bool:
+    """
+    Check the password of the given user
+
+    If the password is correct, but its hash was created with other parameters than the configured ones, the password
+    is hashed again with the configured parameters.
+
+    :return: True, if the user exists and the password is correct
+    """
+    password_hash: Optional[str] = get_password_hash(username)
+    if password_hash is None or not werkzeug.security.check_password_hash(password_hash, password):
+        return False
+    if needs_rehash(password_hash):
+        USERS[username] = hash_password(password)
+        save_user_file()
+    return True
+
+
+def create_token(username: str) -> str:
+    """
+    Create an access token for the given user, which expires after TOKEN_EXPIRATION_TIME minutes
+    """
+    return jwt.encode(
+        {
+            'name': username,
+            'exp': datetime.datetime.utcnow() + datetime.timedelta(minutes=TOKEN_EXPIRATION_TIME)
+        },
+        SECRET_KEY,
+        algorithm="HS256"
+    )
+
+
+def create_refresh_token(username: str) -> str:
+    """
+    Create a refresh token for the given user, which expires after REFRESH_TOKEN_EXPIRATION_TIME minutes
+
+    The token can only be used to get new access tokens with :func:`~.refresh_token`, not as access token itself. It
+    contains a fingerprint of the user's password hash, so that it is invalidated when the password is changed.
+    """
+    return jwt.encode(
+        {
+            'name': username,
+            'exp': datetime.datetime.utcnow() + datetime.timedelta(minutes=REFRESH_TOKEN_EXPIRATION_TIME),
+            'type': "refresh",
+            'pwd': _get_password_fingerprint(get_password_hash(username))
+        },
+        SECRET_KEY,
+        algorithm="HS256"
+    )
+
+
+def refresh_token(token: str) -> Optional[str]:
+    """
+    Create a new access token from the given refresh token, without checking the user's password again
+
+    :return: The new access token, or None, if the refresh token is invalid, expired, or the user has been removed
+        or changed their password since
+    """
+    try:
+        data = jwt.decode(token, SECRET_KEY, algorithms=["HS256"])
+    except (jwt.DecodeError, jwt.ExpiredSignatureError):
+        return None
+    username: Optional[str] = data.get("name")
+    if data.get("type") != "refresh" or username is None:
+        return None
+    password_hash: Optional[str] = get_password_hash(username)
+    if password_hash is None or data.get("pwd") != _get_password_fingerprint(password_hash):
+        return None
+    return create_token(username)
+
+
+def _get_password_fingerprint(password_hash: str) -> str:
+    return hashlib.sha256(password_hash.encode()).hexdigest()[:16]
+
+
 def cli_add_user():
     """
     CLI-Helper tool that makes it easy to add a user.
@@ -111,6 +264,101 @@ def cli_add_user():
         print("Exiting without saving")
 
 
+class TokenCache:
+    """
+    A bounded cache of the username and expiration time of validated JWTs, so that the signature of a token is only
+    verified once
+
+    The entries are keyed by the SHA-256 digest of the token, so that the cache does not keep the tokens themselves.
+    When the cache is full, the least recently used entry is removed.
+    """
+    def __init__(self, max_size: int):
+        self.max_size: int = max_size
+        self._lock = threading.Lock()
+        self._entries: "collections.OrderedDict[bytes, Tuple[str, float]]" = collections.OrderedDict()
+
+    def get(self, token: str) -> Optional[Tuple[str, float]]:
+        """
+        Get the username and expiration time (as POSIX timestamp) of the given token, if it has been validated before
+        """
+        digest: bytes = hashlib.sha256(token.encode()).digest()
+        with self._lock:
+            entry: Optional[Tuple[str, float]] = self._entries.get(digest)
+            if entry is not None:
+                self._entries.move_to_end(digest)
+            return entry
+
+    def put(self, token: str, username: str, expiration_time: float) -> None:
+        if self.max_size <= 0:
+            return
+        digest: bytes = hashlib.sha256(token.encode()).digest()
+        with self._lock:
+            self._entries[digest] = (username, expiration_time)
+            self._entries.move_to_end(digest)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+TOKEN_CACHE: TokenCache = TokenCache(TOKEN_CACHE_SIZE)
+
+
+class RateLimiter:
+    """
+    Limits the attempts per key, e.g. the login attempts per client address, using a token bucket for each key
+
+    Each key may make `burst` attempts at once, and `rate` attempts per minute afterwards. Buckets that are full again
+    are removed, when more than MAX_KEYS keys are tracked.
+
+    :param rate: Attempts per minute, or 0 for no limit
+    """
+    MAX_KEYS: int = 10000
+
+    def __init__(self, rate: float, burst: int):
+        self.rate: float = rate
+        self.burst: int = burst
+        self._lock = threading.Lock()
+        # The remaining attempts of each key, and the time they were counted
+        self._buckets: Dict[object, Tuple[float, float]] = {}
+
+    def acquire(self, key: object) -> float:
+        """
+        Count an attempt of the given key, if it is allowed
+
+        :return: 0, if the attempt is allowed, otherwise the time in seconds until the next attempt is allowed
+        """
+        if self.rate <= 0:
+            return 0
+        now: float = time.monotonic()
+        with self._lock:
+            tokens: float = self._get_tokens(key, now)
+            if tokens < 1:
+                self._buckets[key] = (tokens, now)
+                return (1 - tokens) * 60 / self.rate
+            self._buckets[key] = (tokens - 1, now)
+            if len(self._buckets) > self.MAX_KEYS:
+                for other in [other for other in self._buckets if self._get_tokens(other, now) >= self.burst]:
+                    del self._buckets[other]
+        return 0
+
+    def reset(self) -> None:
+        with self._lock:
+            self._buckets.clear()
+
+    def _get_tokens(self, key: object, now: float) -> float:
+        tokens, last_time = self._buckets.get(key, (self.burst, now))
+        return min(self.burst, tokens + (now - last_time) * self.rate / 60)
+
+
+LOGIN_RATE_LIMITER: RateLimiter = RateLimiter(LOGIN_RATE_LIMIT, LOGIN_BURST)
+
+
 def token_required(f):
     """
     This creates the @token_required decorator, making it easy to use JWT authentication for any path I like by
@@ -119,20 +367,37 @@ def token_required(f):
     The JWT received with the request (in the "x-access-tokens" header) is checked and the username of the sender is
     extracted. If the token is valid (otherwise `jwt.decode` raises a `DecodeError`) and the user exists, the current
     user is then passed to the function below the decorator for logging purposes.
+
+    Validated tokens are kept in the TOKEN_CACHE until they expire, so that they are not decoded again. The user is
+    still looked up on every request, so that a token of a removed user is rejected.
     """
     @wraps(f)
     def decorator(*args, **kwargs):
         token = flask.request.headers.get("x-access-tokens")
         if not token:
             return flask.make_response("Unauthorized - Valid token is missing", 401)
-        try:
-            data = jwt.decode(token, SECRET_KEY, algorithms=["HS256"])
-            current_user = data["name"]
+        cached: Optional[Tuple[str, float]] = TOKEN_CACHE.get(token)
+        if cached is not None:
+            current_user, expiration_time = cached
+            if expiration_time <= time.time():
+                return flask.make_response("Unauthorized - Invalid Token", 401)
+        else:
+            try:
+                data = jwt.decode(token, SECRET_KEY, algorithms=["HS256"])
+            except (jwt.DecodeError, jwt.ExpiredSignatureError):
+                return flask.make_response("Unauthorized - Invalid Token", 401)
+            current_user = data.get("name")
+            # Refresh tokens are no access tokens
+            if data.get("type") == "refresh":
+                return flask.make_response("Unauthorized - Invalid Token", 401)
             if current_user is None:
                 return flask.make_response("Unauthorized - Invalid User", 401)
-            return f(current_user, *args, **kwargs)
-        except (jwt.DecodeError, jwt.ExpiredSignatureError):
-            return flask.make_response("Unauthorized - Invalid Token", 401)
+            # Tokens without expiration time are not cached
+            if "exp" in data:
+                TOKEN_CACHE.put(token, current_user, data["exp"])
+        if not check_if_user_exists(current_user):
+            return flask.make_response("Unauthorized - Invalid User", 401)
+        return f(current_user, *args, **kwargs)
     return decorator
 
 
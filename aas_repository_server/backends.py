@@ -0,0 +1,820 @@
+"""
+Storage backends of the :class:`~aas_repository_server.storage.RepositoryObjectStore`
+
+A backend persists the serialized Identifiables together with the parts of them that are needed to build the
+semantic index (see :class:`~.IndexRecord`), so that the index can be rebuilt without deserializing every
+Identifiable. The backend is selected with the `BACKEND` option in the `[STORAGE]` section of the config:
+
+    - `local_file`: :class:`~.LocalFileBackend`, one JSON file per Identifiable
+    - `sqlite`: :class:`~.SQLiteBackend`, a single SQLite database
+
+Each stored Identifiable has a :class:`~.Version`, whose number is incremented by each
+:meth:`~.StorageBackend.replace`. It is used for optimistic concurrency control, e.g. as ETag.
+"""
+import abc
+import concurrent.futures
+import contextlib
+import decimal
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import uuid
+from typing import IO, Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Set, Tuple, Union
+
+from basyx.aas import model
+from basyx.aas.adapter.json import json_deserialization
+from basyx.aas.util import traversal
+from aas_repository_server import connections, serialization
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None  # type: ignore
+
+
+def _get_id_short_path(referable: model.Referable) -> Tuple[str, ...]:
+    """
+    Get the idShorts leading from the Identifiable containing the given Referable to the Referable
+    """
+    id_shorts: List[str] = []
+    while not isinstance(referable, model.Identifiable):
+        id_shorts.append(referable.id_short)
+        referable = referable.parent
+    return tuple(reversed(id_shorts))
+
+
+IndexValue = Union[None, bool, int, float, str]
+
+
+def get_index_value(value: object) -> IndexValue:
+    """
+    Convert the value of a Property to a JSON serializable value, which can be compared to the values of the same type
+
+    Numbers are converted to int or float, Booleans are kept, and all other values are converted to their XSD string
+    representation, e.g. dates in ISO 8601 format. NaN is converted to None. Integers outside the signed 64 bit range,
+    which many JSON implementations cannot represent, are converted to float.
+    """
+    if value is None or isinstance(value, bool):
+        return value
+    if isinstance(value, int):
+        return int(value) if -2 ** 63 <= value < 2 ** 63 else float(value)
+    if isinstance(value, (float, decimal.Decimal)):
+        # NaN cannot be compared to other numbers
+        return float(value) if value == value else None
+    if isinstance(value, str):
+        return str(value)
+    return model.datatypes.xsd_repr(value)
+
+
+class ElementAttributes(NamedTuple):
+    """
+    The attributes of a Referable with a semanticID, by which the index can be queried
+
+    :attr: model_type: The name of the class of the Referable, e.g. `Property`
+    :attr: value: The value of a Property, converted by :func:`~.get_index_value`, otherwise None
+    """
+    model_type: str
+    value: IndexValue = None
+
+
+class IndexRecord(NamedTuple):
+    """
+    The parts of a single Identifiable that are needed to build the semantic index
+
+    :attr: identifier: The Identifier of the Identifiable
+    :attr: semantic_ids: The semanticID Keys contained in a Submodel with the idShort path of their Referable
+    :attr: submodels: The Identifiers of the Submodels referenced by an AssetAdministrationShell
+    :attr: attributes: The attributes of each Referable with a semanticID, by its idShort path
+    """
+    identifier: model.Identifier
+    semantic_ids: List[Tuple[model.Key, Tuple[str, ...]]]
+    submodels: List[model.Identifier]
+    attributes: Dict[Tuple[str, ...], ElementAttributes]
+
+
+def get_index_record(identifiable: model.Identifiable) -> IndexRecord:
+    semantic_ids: List[Tuple[model.Key, Tuple[str, ...]]] = []
+    submodels: List[model.Identifier] = []
+    attributes: Dict[Tuple[str, ...], ElementAttributes] = {}
+    if isinstance(identifiable, model.AssetAdministrationShell):
+        for submodel_reference in identifiable.submodel:
+            try:
+                submodels.append(submodel_reference.get_identifier())
+            except ValueError:
+                continue
+        # Distinct References, e.g. a local and a non-local one, may point to the same Submodel
+        submodels = list(dict.fromkeys(submodels))
+    elif isinstance(identifiable, model.Submodel):
+        if identifiable.semantic_id is not None:
+            # A Reference may repeat a Key, which is indexed only once
+            for key in dict.fromkeys(identifiable.semantic_id.key):
+                semantic_ids.append((key, ()))
+            attributes[()] = ElementAttributes(type(identifiable).__name__)
+        for submodel_element in traversal.walk_submodel(identifiable):
+            if submodel_element.semantic_id:
+                id_short_path: Tuple[str, ...] = _get_id_short_path(submodel_element)
+                for key in dict.fromkeys(submodel_element.semantic_id.key):
+                    semantic_ids.append((key, id_short_path))
+                attributes[id_short_path] = ElementAttributes(
+                    type(submodel_element).__name__,
+                    get_index_value(submodel_element.value) if isinstance(submodel_element, model.Property) else None
+                )
+    return IndexRecord(identifiable.identification, semantic_ids, submodels, attributes)
+
+
+class Version(NamedTuple):
+    """
+    The version of a stored Identifiable
+
+    :attr: tag: A random token created when the Identifiable is added, so that the versions of Identifiables, that are
+        stored under the same Identifier one after another, differ. Empty for Identifiables stored before the tags were
+        introduced.
+    :attr: number: The number of the version, which starts at 1 and is incremented by each replace
+    """
+    tag: str
+    number: int
+
+
+def _create_version_tag() -> str:
+    return uuid.uuid4().hex
+
+
+class VersionConflictError(Exception):
+    """
+    Raised, if a stored Identifiable does not have the expected version, because it was modified concurrently
+    """
+
+
+class StorageBackend(metaclass=abc.ABCMeta):
+    """
+    Abstract base class of the storage backends of a :class:`~aas_repository_server.storage.RepositoryObjectStore`
+
+    Backends return freshly deserialized Identifiables. Keeping a single local replication of each Identifiable is
+    up to the object store.
+    """
+    @abc.abstractmethod
+    def get(self, identifier: model.Identifier) -> Tuple[model.Identifiable, Version]:
+        """
+        Deserialize the stored Identifiable with the given Identifier
+
+        :return: The Identifiable and its version
+        :raises KeyError: If no such Identifiable is stored
+        """
+
+    @abc.abstractmethod
+    def add(self, items: Sequence[Tuple[model.Identifiable, IndexRecord]]) -> List[Optional[KeyError]]:
+        """
+        Store the given Identifiables together with their index records
+
+        Identifiables that exist already are not stored, but do not prevent the others from being stored.
+
+        :return: For each given Identifiable, None if it was stored, or the KeyError, if an Identifiable with the same
+            Identifier is stored already
+        """
+
+    @abc.abstractmethod
+    def replace(self, identifiable: model.Identifiable, record: IndexRecord,
+                expected_version: Optional[Version] = None) -> Version:
+        """
+        Atomically replace the stored Identifiable with the same Identifier and its index record
+
+        :param expected_version: If given, the Identifiable is only replaced, if the stored one has this version
+        :return: The new version of the Identifiable
+        :raises KeyError: If no such Identifiable is stored
+        :raises VersionConflictError: If the stored Identifiable does not have the expected version
+        """
+
+    @abc.abstractmethod
+    def discard(self, identifier: model.Identifier) -> None:
+        """
+        Delete the Identifiable with the given Identifier and its index record
+
+        :raises KeyError: If no such Identifiable is stored
+        """
+
+    @abc.abstractmethod
+    def __contains__(self, identifier: model.Identifier) -> bool:
+        pass
+
+    @abc.abstractmethod
+    def __len__(self) -> int:
+        pass
+
+    @abc.abstractmethod
+    def iter_identifiables(self) -> Iterator[model.Identifiable]:
+        """
+        Deserialize all stored Identifiables, one after another
+        """
+
+    @abc.abstractmethod
+    def iter_serialized(self) -> Iterator[bytes]:
+        """
+        Get the compact JSON serialization of each stored Identifiable, without deserializing them
+        """
+
+    @abc.abstractmethod
+    def load_index_records(self) -> Iterable[IndexRecord]:
+        """
+        Get the index record of each stored Identifiable
+        """
+
+    def close(self) -> None:
+        pass
+
+
+def _read_index_records(directory_path: str, file_names: Iterable[str]) \
+        -> List[Tuple[str, Tuple[int, int], IndexRecord]]:
+    """
+    Deserialize the given files of a :class:`~.LocalFileBackend` and extract their :class:`~.IndexRecord`
+
+    This is a module level function, so that it can be run in the worker processes of a parallel index build. Files
+    discarded by another process while they are read are skipped.
+
+    :return: Tuples of file name, (modification time, size) of the file and the record extracted from it
+    """
+    records: List[Tuple[str, Tuple[int, int], IndexRecord]] = []
+    for file_name in file_names:
+        file_path: str = os.path.join(directory_path, file_name)
+        try:
+            # Stat the file before reading it, so that a concurrent modification is detected on the next build
+            stat: os.stat_result = os.stat(file_path)
+            with open(file_path, "r") as file:
+                identifiable: model.Identifiable = json.load(file, cls=json_deserialization.AASFromJsonDecoder)["data"]
+        except FileNotFoundError:
+            continue
+        records.append((file_name, (stat.st_mtime_ns, stat.st_size), get_index_record(identifiable)))
+    return records
+
+
+class SemanticIndexSnapshot:
+    """
+    A SQLite file persisting the :class:`~.IndexRecord` of each file of a :class:`~.LocalFileBackend`
+
+    Each record is stored together with the modification time and size of the file it was extracted from, so that
+    only files that changed since the snapshot was written have to be deserialized again when the index is rebuilt.
+    """
+    def __init__(self, file_path: str):
+        self.file_path: str = file_path
+        self._lock = threading.Lock()
+        self._database: connections.ProcessLocalConnection = connections.ProcessLocalConnection(file_path)
+        with self._connection:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS files ("
+                "name TEXT PRIMARY KEY, mtime_ns INTEGER, size INTEGER, id_type TEXT, id TEXT, submodels TEXT, "
+                "attributes TEXT)"
+            )
+            # Snapshots written before the attributes were indexed are discarded
+            if "attributes" not in _get_column_names(self._connection, "files"):
+                self._connection.execute("DROP TABLE files")
+                self._connection.execute("DROP TABLE IF EXISTS semantic_ids")
+                self._connection.execute(
+                    "CREATE TABLE files ("
+                    "name TEXT PRIMARY KEY, mtime_ns INTEGER, size INTEGER, id_type TEXT, id TEXT, submodels TEXT, "
+                    "attributes TEXT)"
+                )
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS semantic_ids ("
+                "name TEXT, type TEXT, local INTEGER, value TEXT, id_type TEXT, id_short_path TEXT)"
+            )
+            self._connection.execute("CREATE INDEX IF NOT EXISTS semantic_ids_name ON semantic_ids (name)")
+
+    def get_file_stats(self) -> Dict[str, Tuple[int, int]]:
+        """
+        Get the modification time and size of each file, as they were when its record was stored
+        """
+        with self._lock:
+            return {name: (mtime_ns, size)
+                    for name, mtime_ns, size in self._connection.execute("SELECT name, mtime_ns, size FROM files")}
+
+    def get_records(self) -> Iterable[IndexRecord]:
+        """
+        Load all stored records
+        """
+        with self._lock:
+            semantic_ids: Dict[str, List[Tuple[model.Key, Tuple[str, ...]]]] = {}
+            for name, type_, local, value, id_type, id_short_path in self._connection.execute(
+                    "SELECT name, type, local, value, id_type, id_short_path FROM semantic_ids"):
+                semantic_ids.setdefault(name, []).append(
+                    (_row_to_key(type_, local, value, id_type), _row_to_id_short_path(id_short_path)))
+            return [
+                IndexRecord(
+                    model.Identifier(id_, model.IdentifierType[id_type]),
+                    semantic_ids.get(name, []),
+                    _json_to_identifiers(submodels),
+                    _json_to_attributes(attributes)
+                )
+                for name, id_type, id_, submodels, attributes in self._connection.execute(
+                    "SELECT name, id_type, id, submodels, attributes FROM files")
+            ]
+
+    def store_records(self, records: Iterable[Tuple[str, Tuple[int, int], IndexRecord]]) -> None:
+        """
+        Store the records of the given files, replacing older records of the same files
+
+        :param records: Tuples of file name, (modification time, size) of the file and the record extracted from it
+        """
+        with self._lock, self._connection:
+            for name, (mtime_ns, size), record in records:
+                self._connection.execute("DELETE FROM semantic_ids WHERE name = ?", (name,))
+                self._connection.execute(
+                    "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (name, mtime_ns, size, record.identifier.id_type.name, record.identifier.id,
+                     _identifiers_to_json(record.submodels), _attributes_to_json(record.attributes))
+                )
+                self._connection.executemany(
+                    "INSERT INTO semantic_ids VALUES (?, ?, ?, ?, ?, ?)",
+                    ((name, *_key_to_row(key), ".".join(id_short_path)) for key, id_short_path in record.semantic_ids)
+                )
+
+    def remove_records(self, names: Iterable[str]) -> None:
+        """
+        Remove the records of the given files
+        """
+        with self._lock, self._connection:
+            for name in names:
+                self._connection.execute("DELETE FROM semantic_ids WHERE name = ?", (name,))
+                self._connection.execute("DELETE FROM files WHERE name = ?", (name,))
+
+    def close(self) -> None:
+        with self._lock:
+            self._database.close()
+
+    @property
+    def _connection(self) -> sqlite3.Connection:
+        return self._database.get()
+
+
+class LocalFileBackend(StorageBackend):
+    """
+    Stores each Identifiable in a JSON file in the given directory, in the format of
+    :class:`basyx.aas.backend.local_file.LocalFileObjectStore` with an additional `version` and `tag`
+
+    Files are written to a temporary file first and then moved into place, so that readers never see a partially
+    written file. A replaced file is synced to disk before it is moved. Replacing and discarding a file locks it, so
+    that concurrent writers, even from other processes, cannot overwrite each other's changes.
+
+    If a `semantic_index_file` is given, the index records are persisted there as a :class:`~.SemanticIndexSnapshot`,
+    so that only the files that changed since the last run have to be deserialized when the index is loaded.
+
+    If `index_processes` is larger than 1, the files are deserialized by a pool of that many worker processes when
+    loading the index records.
+    """
+    def __init__(self,
+                 directory_path: str,
+                 semantic_index_file: Optional[str] = None,
+                 index_processes: int = 1):
+        self.directory_path: str = directory_path.rstrip("/")
+        self.index_processes: int = index_processes
+        self.semantic_index_snapshot: Optional[SemanticIndexSnapshot] = \
+            SemanticIndexSnapshot(semantic_index_file) if semantic_index_file is not None else None
+
+    def get(self, identifier: model.Identifier) -> Tuple[model.Identifiable, Version]:
+        try:
+            with open(self._get_file_path(identifier), "rb") as file:
+                data = json.load(file, cls=json_deserialization.AASFromJsonDecoder)
+        except FileNotFoundError as e:
+            raise KeyError("No Identifiable with id {} found in local file database".format(identifier)) from e
+        return data["data"], Version(data.get("tag", ""), data.get("version", 0))
+
+    def add(self, items: Sequence[Tuple[model.Identifiable, IndexRecord]]) -> List[Optional[KeyError]]:
+        results: List[Optional[KeyError]] = []
+        added: List[Tuple[str, Tuple[int, int], IndexRecord]] = []
+        for identifiable, record in items:
+            file_name: str = self._get_file_name(identifiable.identification)
+            temp_file_path: str = self._write_temp_file(identifiable, Version(_create_version_tag(), 1), sync=False)
+            try:
+                # Unlike a rename, a hard link fails if the file exists already
+                os.link(temp_file_path, os.path.join(self.directory_path, file_name))
+            except FileExistsError:
+                results.append(KeyError("Identifiable with id {} already exists in local file database".format(
+                    identifiable.identification)))
+                continue
+            finally:
+                os.remove(temp_file_path)
+            results.append(None)
+            added.append((file_name, self._get_file_stat(file_name), record))
+        if self.semantic_index_snapshot is not None:
+            self.semantic_index_snapshot.store_records(added)
+        return results
+
+    def replace(self, identifiable: model.Identifiable, record: IndexRecord,
+                expected_version: Optional[Version] = None) -> Version:
+        file_name: str = self._get_file_name(identifiable.identification)
+        file_path: str = os.path.join(self.directory_path, file_name)
+        with self._lock_file(file_path) as file:
+            data = json.load(file)
+            version: Version = Version(data.get("tag", ""), data.get("version", 0))
+            if expected_version is not None and version != expected_version:
+                raise VersionConflictError("Identifiable with id {} has version {}, not {}".format(
+                    identifiable.identification, version, expected_version))
+            new_version: Version = version._replace(number=version.number + 1)
+            os.replace(self._write_temp_file(identifiable, new_version, sync=True), file_path)
+            self._sync_directory()
+        if self.semantic_index_snapshot is not None:
+            self.semantic_index_snapshot.store_records([(file_name, self._get_file_stat(file_name), record)])
+        return new_version
+
+    def discard(self, identifier: model.Identifier) -> None:
+        file_path: str = self._get_file_path(identifier)
+        with self._lock_file(file_path):
+            os.remove(file_path)
+        if self.semantic_index_snapshot is not None:
+            self.semantic_index_snapshot.remove_records([self._get_file_name(identifier)])
+
+    def __contains__(self, identifier: model.Identifier) -> bool:
+        return os.path.exists(self._get_file_path(identifier))
+
+    def __len__(self) -> int:
+        return len(self._list_file_names())
+
+    def iter_identifiables(self) -> Iterator[model.Identifiable]:
+        for file_name in self._list_file_names():
+            try:
+                with open(os.path.join(self.directory_path, file_name), "rb") as file:
+                    yield json.load(file, cls=json_deserialization.AASFromJsonDecoder)["data"]
+            except FileNotFoundError:
+                continue
+
+    def iter_serialized(self) -> Iterator[bytes]:
+        for file_name in sorted(self._list_file_names()):
+            try:
+                with open(os.path.join(self.directory_path, file_name), "rb") as file:
+                    data = json.load(file)
+            except FileNotFoundError:
+                continue
+            yield serialization.dumps(data["data"])
+
+    def load_index_records(self) -> Iterable[IndexRecord]:
+        """
+        Get the index record of each file
+
+        Each file is deserialized at most once. Files whose record in the `semantic_index_snapshot` is still
+        up-to-date are not deserialized at all. Files discarded by another process in the meantime are skipped.
+        """
+        file_names: List[str] = self._list_file_names()
+        if self.semantic_index_snapshot is None:
+            return [record for _, _, record in self._read_index_records(file_names)]
+        snapshot_stats: Dict[str, Tuple[int, int]] = self.semantic_index_snapshot.get_file_stats()
+        unchanged_file_names: Set[str] = set()
+        changed_file_names: List[str] = []
+        for file_name in file_names:
+            try:
+                file_stat: Tuple[int, int] = self._get_file_stat(file_name)
+            except FileNotFoundError:
+                continue
+            if snapshot_stats.get(file_name) == file_stat:
+                unchanged_file_names.add(file_name)
+            else:
+                changed_file_names.append(file_name)
+        records: List[Tuple[str, Tuple[int, int], IndexRecord]] = self._read_index_records(changed_file_names)
+        # Drop the records of files, which were removed, including those that vanished while they were read
+        self.semantic_index_snapshot.remove_records(
+            set(snapshot_stats).difference(unchanged_file_names, (file_name for file_name, _, _ in records)))
+        self.semantic_index_snapshot.store_records(records)
+        return self.semantic_index_snapshot.get_records()
+
+    def close(self) -> None:
+        if self.semantic_index_snapshot is not None:
+            self.semantic_index_snapshot.close()
+
+    def _read_index_records(self, file_names: List[str]) -> List[Tuple[str, Tuple[int, int], IndexRecord]]:
+        """
+        Read the index records of the given files, using a process pool if `index_processes` is larger than 1
+        """
+        if self.index_processes <= 1 or len(file_names) < 2:
+            return _read_index_records(self.directory_path, file_names)
+        # Use a few shards per process to even out differently sized files
+        number_of_shards: int = min(len(file_names), self.index_processes * 4)
+        records: List[Tuple[str, Tuple[int, int], IndexRecord]] = []
+        with concurrent.futures.ProcessPoolExecutor(max_workers=self.index_processes) as executor:
+            futures = [executor.submit(_read_index_records, self.directory_path, file_names[i::number_of_shards])
+                       for i in range(number_of_shards)]
+            for future in futures:
+                records.extend(future.result())
+        return records
+
+    def _write_temp_file(self, identifiable: model.Identifiable, version: Version, sync: bool) -> str:
+        """
+        Write the given Identifiable to a new temporary file in the storage directory, which is ignored by the backend
+
+        :param sync: Sync the file to disk before returning
+        :return: The path of the temporary file
+        """
+        file_descriptor, temp_file_path = tempfile.mkstemp(suffix=".tmp", prefix=".", dir=self.directory_path)
+        try:
+            with os.fdopen(file_descriptor, "wb") as file:
+                # mkstemp() creates the file readable by the owner only
+                os.fchmod(file.fileno(), 0o644)
+                file.write(b'{"version":%d,"tag":"%s","data":' % (version.number, version.tag.encode("ascii"))
+                           + serialization.dumps(identifiable) + b"}")
+                if sync:
+                    file.flush()
+                    os.fsync(file.fileno())
+        except BaseException:
+            os.remove(temp_file_path)
+            raise
+        return temp_file_path
+
+    def _sync_directory(self) -> None:
+        """
+        Sync the storage directory to disk, to persist a rename
+        """
+        if not hasattr(os, "O_DIRECTORY"):
+            return
+        file_descriptor: int = os.open(self.directory_path, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(file_descriptor)
+        finally:
+            os.close(file_descriptor)
+
+    @contextlib.contextmanager
+    def _lock_file(self, file_path: str) -> Iterator[IO[bytes]]:
+        """
+        Open the given file and lock it exclusively, so that only one process at a time can replace or discard it
+
+        :raises KeyError: If the file does not exist
+        """
+        while True:
+            try:
+                file: IO[bytes] = open(file_path, "rb")
+            except FileNotFoundError as e:
+                raise KeyError("No AAS object with file {} exists in local file database".format(file_path)) from e
+            with file:
+                if fcntl is not None:
+                    fcntl.flock(file.fileno(), fcntl.LOCK_EX)
+                try:
+                    # The file may have been replaced or discarded, while we were waiting for the lock
+                    is_current: bool = os.path.samestat(os.fstat(file.fileno()), os.stat(file_path))
+                except FileNotFoundError:
+                    is_current = False
+                if is_current:
+                    yield file
+                    return
+
+    def _list_file_names(self) -> List[str]:
+        return [name for name in os.listdir(self.directory_path) if name.endswith(".json")]
+
+    def _get_file_name(self, identifier: model.Identifier) -> str:
+        return "{}.json".format(
+            hashlib.sha256("{}-{}".format(identifier.id_type.name, identifier.id).encode("utf-8")).hexdigest())
+
+    def _get_file_path(self, identifier: model.Identifier) -> str:
+        return os.path.join(self.directory_path, self._get_file_name(identifier))
+
+    def _get_file_stat(self, file_name: str) -> Tuple[int, int]:
+        stat: os.stat_result = os.stat(os.path.join(self.directory_path, file_name))
+        return stat.st_mtime_ns, stat.st_size
+
+
+class SQLiteBackend(StorageBackend):
+    """
+    Stores the Identifiables in a single SQLite database in WAL mode
+
+    Each Identifiable is stored as compact JSON, together with its Identifier and model type in indexed columns. The
+    semanticIDs of its index record are stored in a separate table, indexed by Identifier and `Key.value`. Each batch
+    of Identifiables is written in a single transaction.
+    """
+    def __init__(self, file_path: str):
+        self.file_path: str = file_path
+        self._lock = threading.Lock()
+        # In WAL mode, a commit is still atomic and consistent without syncing, only the durability of the last
+        # commits is lost on a power failure
+        self._database: connections.ProcessLocalConnection = connections.ProcessLocalConnection(
+            file_path, ("journal_mode=WAL", "synchronous=NORMAL"), isolation_level=None)
+        with self._transaction():
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS identifiables (id_type TEXT NOT NULL, id TEXT NOT NULL, "
+                "model_type TEXT NOT NULL, submodels TEXT NOT NULL, data BLOB NOT NULL, version INTEGER NOT NULL, "
+                "tag TEXT NOT NULL DEFAULT '', PRIMARY KEY (id_type, id))"
+            )
+            # Identifiables stored before the version tags were introduced keep an empty tag
+            if "tag" not in _get_column_names(self._connection, "identifiables"):
+                self._connection.execute("ALTER TABLE identifiables ADD COLUMN tag TEXT NOT NULL DEFAULT ''")
+            self._connection.execute(
+                "CREATE INDEX IF NOT EXISTS identifiables_model_type ON identifiables (model_type)")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS semantic_ids (id_type TEXT NOT NULL, id TEXT NOT NULL, type TEXT, "
+                "local INTEGER, value TEXT, key_id_type TEXT, id_short_path TEXT, model_type TEXT, element_value TEXT)"
+            )
+            # The attributes of databases written before they were indexed are extracted by `load_index_records()`
+            if "model_type" not in _get_column_names(self._connection, "semantic_ids"):
+                self._connection.execute("ALTER TABLE semantic_ids ADD COLUMN model_type TEXT")
+                self._connection.execute("ALTER TABLE semantic_ids ADD COLUMN element_value TEXT")
+            self._connection.execute(
+                "CREATE INDEX IF NOT EXISTS semantic_ids_identifier ON semantic_ids (id_type, id)")
+            self._connection.execute("CREATE INDEX IF NOT EXISTS semantic_ids_value ON semantic_ids (value)")
+
+    def get(self, identifier: model.Identifier) -> Tuple[model.Identifiable, Version]:
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT data, tag, version FROM identifiables WHERE id_type = ? AND id = ?",
+                (identifier.id_type.name, identifier.id)
+            ).fetchone()
+        if row is None:
+            raise KeyError("No Identifiable with id {} found in SQLite database".format(identifier))
+        return json.loads(row[0], cls=json_deserialization.AASFromJsonDecoder), Version(row[1], row[2])
+
+    def add(self, items: Sequence[Tuple[model.Identifiable, IndexRecord]]) -> List[Optional[KeyError]]:
+        # Serialize before locking the database
+        rows = [(identifiable.identification, type(identifiable).__name__, serialization.dumps(identifiable), record)
+                for identifiable, record in items]
+        results: List[Optional[KeyError]] = []
+        with self._transaction():
+            for identifier, model_type, data, record in rows:
+                try:
+                    self._connection.execute(
+                        "INSERT INTO identifiables (id_type, id, model_type, submodels, data, version, tag) "
+                        "VALUES (?, ?, ?, ?, ?, 1, ?)",
+                        (identifier.id_type.name, identifier.id, model_type, _identifiers_to_json(record.submodels),
+                         data, _create_version_tag())
+                    )
+                except sqlite3.IntegrityError:
+                    results.append(KeyError("Identifiable with id {} already exists in SQLite database".format(
+                        identifier)))
+                    continue
+                self._insert_semantic_ids(record)
+                results.append(None)
+        return results
+
+    def replace(self, identifiable: model.Identifiable, record: IndexRecord,
+                expected_version: Optional[Version] = None) -> Version:
+        identifier: model.Identifier = identifiable.identification
+        data: bytes = serialization.dumps(identifiable)
+        with self._transaction():
+            row = self._connection.execute(
+                "SELECT tag, version FROM identifiables WHERE id_type = ? AND id = ?",
+                (identifier.id_type.name, identifier.id)
+            ).fetchone()
+            if row is None:
+                raise KeyError("No AAS object with id {} exists in SQLite database".format(identifier))
+            version: Version = Version(*row)
+            if expected_version is not None and version != expected_version:
+                raise VersionConflictError("Identifiable with id {} has version {}, not {}".format(
+                    identifier, version, expected_version))
+            new_version: Version = version._replace(number=version.number + 1)
+            self._connection.execute(
+                "UPDATE identifiables SET model_type = ?, submodels = ?, data = ?, version = ? "
+                "WHERE id_type = ? AND id = ?",
+                (type(identifiable).__name__, _identifiers_to_json(record.submodels), data, new_version.number,
+                 identifier.id_type.name, identifier.id)
+            )
+            self._connection.execute(
+                "DELETE FROM semantic_ids WHERE id_type = ? AND id = ?", (identifier.id_type.name, identifier.id))
+            self._insert_semantic_ids(record)
+        return new_version
+
+    def discard(self, identifier: model.Identifier) -> None:
+        with self._transaction():
+            if self._connection.execute(
+                    "DELETE FROM identifiables WHERE id_type = ? AND id = ?",
+                    (identifier.id_type.name, identifier.id)).rowcount == 0:
+                raise KeyError("No AAS object with id {} exists in SQLite database".format(identifier))
+            self._connection.execute(
+                "DELETE FROM semantic_ids WHERE id_type = ? AND id = ?", (identifier.id_type.name, identifier.id))
+
+    def __contains__(self, identifier: model.Identifier) -> bool:
+        with self._lock:
+            return self._connection.execute(
+                "SELECT 1 FROM identifiables WHERE id_type = ? AND id = ?",
+                (identifier.id_type.name, identifier.id)
+            ).fetchone() is not None
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM identifiables").fetchone()[0]
+
+    def iter_identifiables(self) -> Iterator[model.Identifiable]:
+        for data in self.iter_serialized():
+            yield json.loads(data, cls=json_deserialization.AASFromJsonDecoder)
+
+    def iter_serialized(self) -> Iterator[bytes]:
+        # Fetch the rows in pages, so that neither all of them are held in memory, nor the lock is held while the
+        # caller processes them
+        last: Tuple[str, str] = ("", "")
+        while True:
+            with self._lock:
+                rows = self._connection.execute(
+                    "SELECT id_type, id, data FROM identifiables WHERE (id_type, id) > (?, ?) "
+                    "ORDER BY id_type, id LIMIT 1000",
+                    last
+                ).fetchall()
+            if not rows:
+                return
+            for _, _, data in rows:
+                yield bytes(data)
+            last = rows[-1][0:2]
+
+    def load_index_records(self) -> Iterable[IndexRecord]:
+        self._add_missing_attributes()
+        with self._lock:
+            semantic_ids: Dict[Tuple[str, str], List[Tuple[model.Key, Tuple[str, ...]]]] = {}
+            attributes: Dict[Tuple[str, str], Dict[Tuple[str, ...], ElementAttributes]] = {}
+            for id_type, id_, type_, local, value, key_id_type, id_short_path, model_type, element_value \
+                    in self._connection.execute("SELECT id_type, id, type, local, value, key_id_type, id_short_path, "
+                                                "model_type, element_value FROM semantic_ids"):
+                path: Tuple[str, ...] = _row_to_id_short_path(id_short_path)
+                semantic_ids.setdefault((id_type, id_), []).append(
+                    (_row_to_key(type_, local, value, key_id_type), path))
+                attributes.setdefault((id_type, id_), {})[path] = ElementAttributes(
+                    model_type, None if element_value is None else get_index_value(json.loads(element_value)))
+            # The attributes are stored with the semanticIDs instead of the Identifiable, so that they are read
+            # without reading the (possibly large) JSON data of the Identifiables
+            return [
+                IndexRecord(
+                    model.Identifier(id_, model.IdentifierType[id_type]),
+                    semantic_ids.get((id_type, id_), []),
+                    _json_to_identifiers(submodels),
+                    attributes.get((id_type, id_), {})
+                )
+                for id_type, id_, submodels in self._connection.execute(
+                    "SELECT id_type, id, submodels FROM identifiables")
+            ]
+
+    def _add_missing_attributes(self) -> None:
+        """
+        Extract the attributes of the Identifiables stored before the attributes were indexed
+        """
+        with self._transaction():
+            rows = self._connection.execute(
+                "SELECT id_type, id, data FROM identifiables WHERE (id_type, id) IN "
+                "(SELECT id_type, id FROM semantic_ids WHERE model_type IS NULL)").fetchall()
+            for id_type, id_, data in rows:
+                identifiable: model.Identifiable = json.loads(data, cls=json_deserialization.AASFromJsonDecoder)
+                self._connection.execute("DELETE FROM semantic_ids WHERE id_type = ? AND id = ?", (id_type, id_))
+                self._insert_semantic_ids(get_index_record(identifiable))
+
+    def close(self) -> None:
+        with self._lock:
+            self._database.close()
+
+    @property
+    def _connection(self) -> sqlite3.Connection:
+        return self._database.get()
+
+    def _insert_semantic_ids(self, record: IndexRecord) -> None:
+        self._connection.executemany(
+            "INSERT INTO semantic_ids VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            ((record.identifier.id_type.name, record.identifier.id, *_key_to_row(key), ".".join(id_short_path),
+              *_attributes_to_row(record.attributes.get(id_short_path)))
+             for key, id_short_path in record.semantic_ids)
+        )
+
+    @contextlib.contextmanager
+    def _transaction(self) -> Iterator[None]:
+        """
+        Run the statements in the context in a transaction, which also locks the database for other processes
+        """
+        with self._lock:
+            self._connection.execute("BEGIN IMMEDIATE")
+            try:
+                yield
+            except BaseException:
+                self._connection.execute("ROLLBACK")
+                raise
+            self._connection.execute("COMMIT")
+
+
+def _get_column_names(connection: sqlite3.Connection, table: str) -> List[str]:
+    return [row[1] for row in connection.execute("PRAGMA table_info({})".format(table))]
+
+
+def _key_to_row(key: model.Key) -> Tuple[str, bool, str, str]:
+    return key.type.name, key.local, key.value, key.id_type.name
+
+
+def _row_to_key(type_: str, local: int, value: str, id_type: str) -> model.Key:
+    return model.Key(model.KeyElements[type_], bool(local), value, model.KeyType[id_type])
+
+
+def _row_to_id_short_path(id_short_path: str) -> Tuple[str, ...]:
+    return tuple(id_short_path.split(".")) if id_short_path else ()
+
+
+def _attributes_to_row(attributes: Optional[ElementAttributes]) -> Tuple[Optional[str], Optional[str]]:
+    if attributes is None:
+        return None, None
+    return attributes.model_type, None if attributes.value is None else json.dumps(attributes.value)
+
+
+def _identifiers_to_json(identifiers: Iterable[model.Identifier]) -> str:
+    return json.dumps([(identifier.id_type.name, identifier.id) for identifier in identifiers])
+
+
+def _json_to_identifiers(data: str) -> List[model.Identifier]:
+    return [model.Identifier(id_, model.IdentifierType[id_type]) for id_type, id_ in json.loads(data)]
+
+
+def _attributes_to_json(attributes: Dict[Tuple[str, ...], ElementAttributes]) -> str:
+    return json.dumps([(list(id_short_path), *element_attributes)
+                       for id_short_path, element_attributes in attributes.items()])
+
+
+def _json_to_attributes(data: Optional[str]) -> Dict[Tuple[str, ...], ElementAttributes]:
+    if data is None:
+        return {}
+    # Values stored before the integers were limited to 64 bits are converted again
+    return {tuple(id_short_path): ElementAttributes(model_type, get_index_value(value))
+            for id_short_path, model_type, value in json.loads(data)}
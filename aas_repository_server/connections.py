@@ -0,0 +1,64 @@
+"""
+SQLite connections, which are safe to use in server processes forked after the application was created
+
+SQLite connections must not be carried across a fork (see https://www.sqlite.org/howtocorrupt.html, section 2.6). A
+WSGI server that forks its workers after loading the application, e.g. `gunicorn --preload`, would otherwise share the
+connections opened while loading it between all workers. A :class:`~.ProcessLocalConnection` opens a separate
+connection in each process instead, on its first use in that process.
+"""
+import os
+import sqlite3
+import threading
+from typing import List, Optional, Sequence
+
+
+class ProcessLocalConnection:
+    """
+    A SQLite connection to the given file, which is opened lazily by each process using it
+
+    The connection inherited from the parent process is neither used nor closed by a forked child, since closing it
+    could release the locks the child holds on the database via its own connection. It is kept until the child exits.
+
+    :param pragmas: PRAGMA statements executed on each newly opened connection, e.g. `journal_mode=WAL`
+    :param isolation_level: The `isolation_level` of the connections, see :func:`sqlite3.connect`
+    """
+    def __init__(self,
+                 file_path: str,
+                 pragmas: Sequence[str] = (),
+                 isolation_level: Optional[str] = ""):
+        self.file_path: str = file_path
+        self.pragmas: Sequence[str] = pragmas
+        self.isolation_level: Optional[str] = isolation_level
+        self._lock = threading.Lock()
+        self._connection: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+        self._inherited_connections: List[sqlite3.Connection] = []
+
+    def get(self) -> sqlite3.Connection:
+        """
+        Get the connection of the current process, opening it if this process has not opened it yet
+        """
+        pid: int = os.getpid()
+        connection: Optional[sqlite3.Connection] = self._connection
+        if connection is not None and self._pid == pid:
+            return connection
+        with self._lock:
+            if self._connection is None or self._pid != pid:
+                if self._connection is not None:
+                    self._inherited_connections.append(self._connection)
+                connection = sqlite3.connect(self.file_path, check_same_thread=False,
+                                             isolation_level=self.isolation_level)
+                for pragma in self.pragmas:
+                    connection.execute("PRAGMA {}".format(pragma))
+                self._connection, self._pid = connection, pid
+            return self._connection
+
+    def close(self) -> None:
+        """
+        Close the connection of the current process. It is opened again on the next use.
+        """
+        with self._lock:
+            if self._connection is not None and self._pid == os.getpid():
+                self._connection.close()
+            self._connection = None
+            self._pid = None
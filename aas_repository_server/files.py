@@ -0,0 +1,377 @@
+"""
+This module implements the storage of Files (e.g. FMUs or PDFs) in the FILE_STORAGE_DIR.
+
+Files are stored content-addressed: The content of each File is stored exactly once as a blob, named by its SHA-256
+digest, in the `blobs` directory. The names under which the Files were uploaded are mapped to the digests in a SQLite
+database, which also counts the references to each blob. A blob is deleted, once no name refers to it anymore.
+
+Large Files can be uploaded in parts with an upload session. Each session is a directory in `uploads`, containing the
+parts uploaded so far, so that sessions survive a restart of the server.
+"""
+import contextlib
+import hashlib
+import json
+import os
+import re
+import secrets
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from typing import IO, Iterator, Optional, List
+
+from aas_repository_server import connections
+
+
+CHUNK_SIZE: int = 1024 * 1024
+MAX_PART_NUMBER: int = 10000
+_UPLOAD_ID_PATTERN = re.compile(r"^[0-9a-f]{32}$")
+
+
+class FileTooLargeError(Exception):
+    """
+    Raised, if an uploaded File exceeds the maximum File size
+    """
+    pass
+
+
+class DigestMismatchError(Exception):
+    """
+    Raised, if the SHA-256 digest of an uploaded File does not match the expected digest
+    """
+    pass
+
+
+class FileStore:
+    """
+    A content-addressed, deduplicated store for Files
+
+    :param directory_path: The directory to store the Files in. Files that were stored directly in this directory,
+        before it was managed by a FileStore, are moved into the FileStore under their relative path.
+    """
+    def __init__(self, directory_path: str):
+        self.directory_path: str = directory_path
+        self.blob_directory_path: str = os.path.join(directory_path, "blobs")
+        self.temp_directory_path: str = os.path.join(directory_path, "tmp")
+        self.upload_directory_path: str = os.path.join(directory_path, "uploads")
+        os.makedirs(self.blob_directory_path, exist_ok=True)
+        os.makedirs(self.temp_directory_path, exist_ok=True)
+        os.makedirs(self.upload_directory_path, exist_ok=True)
+        self._lock = threading.Lock()
+        self._database: connections.ProcessLocalConnection = connections.ProcessLocalConnection(
+            os.path.join(directory_path, "names.sqlite3"),
+            ("journal_mode=WAL",),
+            isolation_level=None
+        )
+        self._connection.execute("CREATE TABLE IF NOT EXISTS names (name TEXT PRIMARY KEY, sha256 TEXT NOT NULL)")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS blobs (sha256 TEXT PRIMARY KEY, size INTEGER NOT NULL, "
+            "ref_count INTEGER NOT NULL)"
+        )
+        self._import_legacy_files()
+
+    def get_blob_path(self, sha256: str) -> str:
+        """
+        Get the path of the blob with the given hex SHA-256 digest, sharded by the first two bytes of the digest
+        """
+        return os.path.join(self.blob_directory_path, sha256[0:2], sha256[2:4], sha256)
+
+    def get_sha256(self, name: str) -> Optional[str]:
+        """
+        Get the hex SHA-256 digest of the File with the given name, if it exists
+        """
+        with self._lock:
+            row = self._connection.execute("SELECT sha256 FROM names WHERE name = ?", (name,)).fetchone()
+        return row[0] if row is not None else None
+
+    def get_path(self, name: str) -> Optional[str]:
+        """
+        Get the path of the blob containing the File with the given name, if it exists
+        """
+        sha256: Optional[str] = self.get_sha256(name)
+        return self.get_blob_path(sha256) if sha256 is not None else None
+
+    def has_blob(self, sha256: str) -> bool:
+        """
+        Check, if a File with the given hex SHA-256 digest is stored, so that it does not need to be uploaded again
+        """
+        with self._lock:
+            row = self._connection.execute("SELECT 1 FROM blobs WHERE sha256 = ?", (sha256.lower(),)).fetchone()
+        return row is not None
+
+    def link(self, name: str, sha256: str) -> bool:
+        """
+        Store the already existing blob with the given hex SHA-256 digest under the given name
+
+        :return: False, if no such blob exists
+        """
+        sha256 = sha256.lower()
+        with self._transaction():
+            if self._connection.execute("SELECT 1 FROM blobs WHERE sha256 = ?", (sha256,)).fetchone() is None:
+                return False
+            self._set_name(name, sha256)
+        return True
+
+    def add_stream(self, name: str, stream: IO[bytes], max_size: int, expected_sha256: Optional[str] = None) -> str:
+        """
+        Store the content of the given stream under the given name
+
+        The stream is written to a temporary File in chunks. Its digest is computed on the fly. If a blob with the same
+        content exists already, the temporary File is dropped, otherwise it is moved to the blob's path.
+
+        :param expected_sha256: If given, the content is only stored, if its hex SHA-256 digest matches
+        :return: The hex SHA-256 digest of the content
+        :raises FileTooLargeError: If the stream is larger than `max_size`
+        :raises DigestMismatchError: If the digest does not match the `expected_sha256`
+        """
+        temp_file = tempfile.NamedTemporaryFile(dir=self.temp_directory_path, prefix="upload-", delete=False)
+        try:
+            with temp_file:
+                sha256: str = _copy_stream(stream, temp_file, max_size)
+            if expected_sha256 is not None and expected_sha256.lower() != sha256:
+                raise DigestMismatchError(
+                    "The SHA-256 digest of the File is {}, not {}".format(sha256, expected_sha256))
+            self._add_blob(name, sha256, temp_file.name)
+        finally:
+            if os.path.exists(temp_file.name):
+                os.remove(temp_file.name)
+        return sha256
+
+    def remove(self, name: str) -> None:
+        """
+        Remove the File with the given name. Its blob is deleted, if no other name refers to it.
+
+        :raises KeyError: If no File with the given name exists
+        """
+        with self._transaction():
+            row = self._connection.execute("SELECT sha256 FROM names WHERE name = ?", (name,)).fetchone()
+            if row is None:
+                raise KeyError("No File with name {} exists".format(name))
+            self._connection.execute("DELETE FROM names WHERE name = ?", (name,))
+            self._release_blob(row[0])
+
+    def initiate_upload(self, name: str, expected_sha256: Optional[str] = None) -> str:
+        """
+        Start an upload session for a File, which is uploaded in parts
+
+        :param expected_sha256: If given, the File is only stored, if its hex SHA-256 digest matches
+        :return: The id of the upload session
+        """
+        upload_id: str = secrets.token_hex(16)
+        upload_path: str = os.path.join(self.upload_directory_path, upload_id)
+        os.makedirs(upload_path)
+        with open(os.path.join(upload_path, "session.json"), "w") as file:
+            json.dump({"name": name, "sha256": expected_sha256}, file)
+        return upload_id
+
+    def put_upload_part(self, upload_id: str, part_number: int, stream: IO[bytes], max_size: int) -> str:
+        """
+        Store a part of the File of an upload session. The parts can be uploaded in any order and in parallel. A part
+        that is uploaded again replaces the previous one.
+
+        :param part_number: The position of the part in the File, starting with 1
+        :return: The hex SHA-256 digest of the part
+        :raises KeyError: If the upload session does not exist
+        :raises ValueError: If the part number is not valid
+        :raises FileTooLargeError: If the part is larger than `max_size`
+        """
+        upload_path: str = self._get_upload_path(upload_id)
+        if not 1 <= part_number <= MAX_PART_NUMBER:
+            raise ValueError("Part number must be between 1 and {}".format(MAX_PART_NUMBER))
+        temp_file = tempfile.NamedTemporaryFile(dir=upload_path, prefix="upload-", delete=False)
+        try:
+            with temp_file:
+                sha256: str = _copy_stream(stream, temp_file, max_size)
+            os.replace(temp_file.name, os.path.join(upload_path, "part-{:05d}".format(part_number)))
+        finally:
+            if os.path.exists(temp_file.name):
+                os.remove(temp_file.name)
+        return sha256
+
+    def complete_upload(self, upload_id: str, max_size: int) -> str:
+        """
+        Assemble the parts of an upload session to the File and store it under the session's name
+
+        The parts are concatenated in chunks, so they are never held in memory completely. The upload session is
+        removed afterwards, unless the File is rejected because it is too large or its digest does not match.
+
+        :return: The hex SHA-256 digest of the File
+        :raises KeyError: If the upload session does not exist
+        :raises ValueError: If no parts were uploaded or parts are missing
+        :raises FileTooLargeError: If the File is larger than `max_size`
+        :raises DigestMismatchError: If the digest does not match the digest given when initiating the session
+        """
+        upload_path: str = self._get_upload_path(upload_id)
+        with open(os.path.join(upload_path, "session.json"), "r") as file:
+            session = json.load(file)
+        part_numbers: List[int] = sorted(int(file_name[len("part-"):]) for file_name in os.listdir(upload_path)
+                                         if file_name.startswith("part-"))
+        if part_numbers != list(range(1, len(part_numbers) + 1)) or not part_numbers:
+            raise ValueError("Parts must be numbered consecutively starting with 1, got {}".format(part_numbers))
+        sha256 = hashlib.sha256()
+        size: int = 0
+        temp_file = tempfile.NamedTemporaryFile(dir=self.temp_directory_path, prefix="upload-", delete=False)
+        try:
+            with temp_file:
+                for part_number in part_numbers:
+                    with open(os.path.join(upload_path, "part-{:05d}".format(part_number)), "rb") as part:
+                        size += os.fstat(part.fileno()).st_size
+                        if size > max_size:
+                            raise FileTooLargeError("File exceeds the maximum size of {} bytes".format(max_size))
+                        while True:
+                            chunk: bytes = part.read(CHUNK_SIZE)
+                            if not chunk:
+                                break
+                            sha256.update(chunk)
+                            temp_file.write(chunk)
+            if session["sha256"] is not None and session["sha256"].lower() != sha256.hexdigest():
+                raise DigestMismatchError(
+                    "The SHA-256 digest of the File is {}, not {}".format(sha256.hexdigest(), session["sha256"]))
+            self._add_blob(session["name"], sha256.hexdigest(), temp_file.name)
+        finally:
+            if os.path.exists(temp_file.name):
+                os.remove(temp_file.name)
+        shutil.rmtree(upload_path)
+        return sha256.hexdigest()
+
+    def get_upload_name(self, upload_id: str) -> str:
+        """
+        Get the name of the File of an upload session
+
+        :raises KeyError: If the upload session does not exist
+        """
+        with open(os.path.join(self._get_upload_path(upload_id), "session.json"), "r") as file:
+            return json.load(file)["name"]
+
+    def abort_upload(self, upload_id: str) -> None:
+        """
+        Remove an upload session and all its parts
+
+        :raises KeyError: If the upload session does not exist
+        """
+        shutil.rmtree(self._get_upload_path(upload_id))
+
+    def remove_stale_uploads(self, max_age: float) -> None:
+        """
+        Remove all upload sessions, which were not changed within the last `max_age` seconds
+        """
+        for upload_id in os.listdir(self.upload_directory_path):
+            upload_path: str = os.path.join(self.upload_directory_path, upload_id)
+            try:
+                last_change: float = max(os.stat(os.path.join(upload_path, file_name)).st_mtime
+                                         for file_name in os.listdir(upload_path) + ["."])
+            except FileNotFoundError:
+                # The session was completed or aborted in the meantime
+                continue
+            if time.time() - last_change > max_age:
+                shutil.rmtree(upload_path, ignore_errors=True)
+
+    def close(self) -> None:
+        with self._lock:
+            self._database.close()
+
+    @property
+    def _connection(self) -> sqlite3.Connection:
+        return self._database.get()
+
+    def _get_upload_path(self, upload_id: str) -> str:
+        """
+        :raises KeyError: If the upload session does not exist
+        """
+        upload_path: str = os.path.join(self.upload_directory_path, upload_id)
+        if not _UPLOAD_ID_PATTERN.match(upload_id) or not os.path.isdir(upload_path):
+            raise KeyError("No upload session with id {} exists".format(upload_id))
+        return upload_path
+
+    @contextlib.contextmanager
+    def _transaction(self) -> Iterator[None]:
+        """
+        Run the statements in the context in a transaction, which also locks the database for other processes
+        """
+        with self._lock:
+            self._connection.execute("BEGIN IMMEDIATE")
+            try:
+                yield
+            except BaseException:
+                self._connection.execute("ROLLBACK")
+                raise
+            self._connection.execute("COMMIT")
+
+    def _add_blob(self, name: str, sha256: str, file_path: str) -> None:
+        """
+        Move the given File to the blob with the given digest, unless that exists already, and link it to the name
+        """
+        blob_path: str = self.get_blob_path(sha256)
+        with self._transaction():
+            if self._connection.execute("SELECT 1 FROM blobs WHERE sha256 = ?", (sha256,)).fetchone() is None:
+                os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+                os.replace(file_path, blob_path)
+                self._connection.execute("INSERT INTO blobs VALUES (?, ?, 0)", (sha256, os.path.getsize(blob_path)))
+            self._set_name(name, sha256)
+
+    def _set_name(self, name: str, sha256: str) -> None:
+        """
+        Let the name refer to the given blob, releasing the blob it referred to before. Must be called in a transaction.
+        """
+        row = self._connection.execute("SELECT sha256 FROM names WHERE name = ?", (name,)).fetchone()
+        if row is not None and row[0] == sha256:
+            return
+        self._connection.execute("INSERT OR REPLACE INTO names VALUES (?, ?)", (name, sha256))
+        self._connection.execute("UPDATE blobs SET ref_count = ref_count + 1 WHERE sha256 = ?", (sha256,))
+        if row is not None:
+            self._release_blob(row[0])
+
+    def _release_blob(self, sha256: str) -> None:
+        """
+        Decrement the reference count of a blob and delete it, if it is not referred to anymore. Must be called in a
+        transaction.
+        """
+        self._connection.execute("UPDATE blobs SET ref_count = ref_count - 1 WHERE sha256 = ?", (sha256,))
+        row = self._connection.execute("SELECT ref_count FROM blobs WHERE sha256 = ?", (sha256,)).fetchone()
+        if row is not None and row[0] <= 0:
+            self._connection.execute("DELETE FROM blobs WHERE sha256 = ?", (sha256,))
+            try:
+                os.remove(self.get_blob_path(sha256))
+            except FileNotFoundError:
+                pass
+
+    def _import_legacy_files(self) -> None:
+        """
+        Move Files that were stored by name directly in the `directory_path` into the FileStore
+        """
+        for root, directories, file_names in os.walk(self.directory_path):
+            if root == self.directory_path:
+                directories[:] = [d for d in directories if d not in ("blobs", "tmp", "uploads")]
+            for file_name in file_names:
+                if root == self.directory_path and file_name.startswith("names.sqlite3"):
+                    continue
+                file_path: str = os.path.join(root, file_name)
+                name: str = os.path.relpath(file_path, self.directory_path).replace(os.sep, "/")
+                with open(file_path, "rb") as file:
+                    sha256: str = _copy_stream(file, None, os.path.getsize(file_path))
+                self._add_blob(name, sha256, file_path)
+                if os.path.exists(file_path):
+                    os.remove(file_path)
+
+
+def _copy_stream(stream: IO[bytes], file: Optional[IO[bytes]], max_size: int) -> str:
+    """
+    Copy the stream to the given File in chunks, if given, and compute its digest
+
+    :return: The hex SHA-256 digest of the stream's content
+    :raises FileTooLargeError: If the stream is larger than `max_size`
+    """
+    sha256 = hashlib.sha256()
+    size: int = 0
+    while True:
+        chunk: bytes = stream.read(CHUNK_SIZE)
+        if not chunk:
+            break
+        size += len(chunk)
+        if size > max_size:
+            raise FileTooLargeError("File exceeds the maximum size of {} bytes".format(max_size))
+        sha256.update(chunk)
+        if file is not None:
+            file.write(chunk)
+    return sha256.hexdigest()
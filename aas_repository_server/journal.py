@@ -0,0 +1,109 @@
+"""
+A change journal shared by multiple processes serving the same storage, e.g. the workers of a WSGI server
+
+Each process builds its own semantic index from the index records of the backend on startup. Afterwards, every
+process appends the Identifiers it adds, modifies or discards to the journal, and the others tail the journal to
+update their index and caches incrementally (see :meth:`~aas_repository_server.storage.RepositoryObjectStore.sync`).
+
+The journal is enabled with the `JOURNAL_FILE` option in the `[STORAGE]` section of the config.
+"""
+import sqlite3
+import threading
+import time
+from typing import Iterable, List, Optional, Tuple
+
+from basyx.aas import model
+from aas_repository_server import connections
+
+
+class ChangeJournal:
+    """
+    An append-only SQLite table of the Identifiers of changed Identifiables, numbered in order of their changes
+
+    Entries older than `retention` seconds are removed. A process that did not read the journal for longer than that
+    has to rebuild its index instead, which is detected by :meth:`~.read_changes`.
+
+    :param retention: Time in seconds after which entries are removed
+    """
+    # Minimum time in seconds between two removals of old entries
+    PRUNE_INTERVAL: float = 60
+
+    def __init__(self, file_path: str, retention: float = 86400):
+        self.file_path: str = file_path
+        self.retention: float = retention
+        self._lock = threading.Lock()
+        self._last_prune: float = 0
+        self._database: connections.ProcessLocalConnection = connections.ProcessLocalConnection(
+            file_path, ("journal_mode=WAL", "synchronous=NORMAL"), isolation_level=None)
+        with self._lock:
+            # AUTOINCREMENT never reuses the sequence numbers of removed entries
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS changes (sequence INTEGER PRIMARY KEY AUTOINCREMENT, "
+                "id_type TEXT NOT NULL, id TEXT NOT NULL, time REAL NOT NULL)"
+            )
+            self._connection.execute("CREATE INDEX IF NOT EXISTS changes_time ON changes (time)")
+
+    def append(self, identifiers: Iterable[model.Identifier]) -> Tuple[int, int]:
+        """
+        Append the given Identifiers to the journal, in a single transaction
+
+        :return: The sequence number of the last entry before and of the last appended entry
+        """
+        now: float = time.time()
+        rows: List[Tuple[str, str, float]] = [(identifier.id_type.name, identifier.id, now)
+                                              for identifier in identifiers]
+        with self._lock:
+            self._connection.execute("BEGIN IMMEDIATE")
+            try:
+                previous: int = self._get_last_sequence()
+                self._connection.executemany("INSERT INTO changes (id_type, id, time) VALUES (?, ?, ?)", rows)
+                if now - self._last_prune >= self.PRUNE_INTERVAL:
+                    self._connection.execute("DELETE FROM changes WHERE time < ?", (now - self.retention,))
+                    self._last_prune = now
+                last: int = self._get_last_sequence()
+            except BaseException:
+                self._connection.execute("ROLLBACK")
+                raise
+            self._connection.execute("COMMIT")
+        return previous, last
+
+    def get_last_sequence(self) -> int:
+        """
+        Get the sequence number of the last appended entry, or 0 if no entry has ever been appended
+        """
+        with self._lock:
+            return self._get_last_sequence()
+
+    def read_changes(self, after: int) -> Optional[List[Tuple[int, model.Identifier]]]:
+        """
+        Get the entries appended after the entry with the given sequence number, in order
+
+        :return: Tuples of sequence number and Identifier of each entry, or None, if some of the entries have been
+            removed already, or the journal has been recreated since
+        """
+        with self._lock:
+            # Read both in one transaction, so that no entry can be appended in between
+            self._connection.execute("BEGIN")
+            try:
+                last: int = self._get_last_sequence()
+                rows = self._connection.execute(
+                    "SELECT sequence, id_type, id FROM changes WHERE sequence > ? ORDER BY sequence", (after,)
+                ).fetchall()
+            finally:
+                self._connection.execute("COMMIT")
+        # Entries have been removed, or the journal has been recreated
+        if last < after or (last > after and (not rows or rows[0][0] != after + 1)):
+            return None
+        return [(sequence, model.Identifier(id_, model.IdentifierType[id_type])) for sequence, id_type, id_ in rows]
+
+    def close(self) -> None:
+        with self._lock:
+            self._database.close()
+
+    @property
+    def _connection(self) -> sqlite3.Connection:
+        return self._database.get()
+
+    def _get_last_sequence(self) -> int:
+        row = self._connection.execute("SELECT seq FROM sqlite_sequence WHERE name = 'changes'").fetchone()
+        return 0 if row is None else row[0]
@@ -1,16 +1,17 @@
-import datetime
+import base64
+import binascii
 import os
 import configparser
 import json
-from typing import Optional, List, Dict
+import math
+from typing import Optional, List, Dict, Iterable, Iterator, Tuple, Union
 
 import flask
-import jwt
-import werkzeug.security
+from werkzeug.middleware.proxy_fix import ProxyFix
 
 from basyx.aas import model
-from basyx.aas.adapter.json import json_serialization, json_deserialization
-from aas_repository_server import auth, storage
+from basyx.aas.adapter.json import json_deserialization
+from aas_repository_server import auth, backends, files, journal, serialization, storage, transfer
 from flask import stream_with_context, Response
 
 # todo: Config anpassen, parsing anpassen , storage anpassen
@@ -22,48 +23,240 @@ config.read([
 ])
 
 # Read config file
-# JWT Expiration Time in minutes
-JWT_EXPIRATION_TIME: int = int(config["AUTHENTICATION"]["TOKEN_EXPIRATION_TIME"])
 PORT: int = int(config["GENERAL"]["PORT"])
+# Number of reverse proxies whose X-Forwarded-For headers determine the `remote_addr` of the requests
+TRUSTED_PROXIES: int = int(config["GENERAL"]["TRUSTED_PROXIES"])
+if TRUSTED_PROXIES:
+    APP.wsgi_app = ProxyFix(APP.wsgi_app, x_for=TRUSTED_PROXIES)
+# Storage backend of the Identifiables, see `backends`
+STORAGE_BACKEND: str = config["STORAGE"]["BACKEND"]
 AAS_STORAGE_DIR: str = os.path.abspath(config["STORAGE"]["AAS_STORAGE_DIR"])
+SQLITE_FILE: str = os.path.abspath(config["STORAGE"]["SQLITE_FILE"])
 FILE_STORAGE_DIR: str = os.path.abspath(config["STORAGE"]["FILE_STORAGE_DIR"])
+SEMANTIC_INDEX_FILE: str = os.path.abspath(config["STORAGE"]["SEMANTIC_INDEX_FILE"])
+INDEX_PROCESSES: int = int(config["STORAGE"]["INDEX_PROCESSES"])
+APP.config["USE_X_SENDFILE"] = config["STORAGE"].getboolean("USE_X_SENDFILE")
+# Maximum size of uploaded Files in bytes
+MAX_FILE_SIZE: int = int(config["STORAGE"]["MAX_FILE_SIZE"])
+# Time in seconds after which unfinished upload sessions are removed on startup
+UPLOAD_SESSION_MAX_AGE: int = int(config["STORAGE"]["UPLOAD_SESSION_MAX_AGE"])
+# Number of Identifiables of a newline delimited JSON bulk request, that are stored together
+BULK_BATCH_SIZE: int = int(config["STORAGE"]["BULK_BATCH_SIZE"])
+# Maximum number of semanticIDs of a request to `/query_semantic_ids`
+MAX_BATCH_QUERIES: int = int(config["STORAGE"]["MAX_BATCH_QUERIES"])
+# Change journal shared by multiple server processes using the same storage, see `journal`
+JOURNAL_FILE: str = config["STORAGE"]["JOURNAL_FILE"]
+# Time in seconds after which the entries of the change journal are removed
+JOURNAL_RETENTION: int = int(config["STORAGE"]["JOURNAL_RETENTION"])
+NDJSON_MIMETYPE: str = "application/x-ndjson"
 # Create Storage dir, if not existing
 if not os.path.exists(AAS_STORAGE_DIR):
     os.makedirs(AAS_STORAGE_DIR)
 if not os.path.exists(FILE_STORAGE_DIR):
     os.makedirs(FILE_STORAGE_DIR)
-OBJECT_STORE: storage.RepositoryObjectStore = storage.RepositoryObjectStore(AAS_STORAGE_DIR)
+if STORAGE_BACKEND == "local_file":
+    BACKEND: backends.StorageBackend = backends.LocalFileBackend(AAS_STORAGE_DIR, SEMANTIC_INDEX_FILE, INDEX_PROCESSES)
+elif STORAGE_BACKEND == "sqlite":
+    BACKEND = backends.SQLiteBackend(SQLITE_FILE)
+else:
+    raise ValueError("Unknown storage backend {}".format(STORAGE_BACKEND))
+CHANGE_JOURNAL: Optional[journal.ChangeJournal] = \
+    journal.ChangeJournal(os.path.abspath(JOURNAL_FILE), JOURNAL_RETENTION) if JOURNAL_FILE else None
+OBJECT_STORE: storage.RepositoryObjectStore = storage.RepositoryObjectStore(BACKEND, CHANGE_JOURNAL)
+# Serialized Identifiables, as returned by `/get_identifiable`
+RESPONSE_CACHE: serialization.SerializationCache = serialization.SerializationCache(
+    int(config["STORAGE"]["RESPONSE_CACHE_MAX_BYTES"])
+)
+
+
+def _invalidate_response_cache(identifier: Optional[model.Identifier]) -> None:
+    if identifier is None:
+        RESPONSE_CACHE.clear()
+    else:
+        RESPONSE_CACHE.invalidate(identifier)
+
+
+OBJECT_STORE.change_listeners.append(_invalidate_response_cache)
+FILE_STORE: files.FileStore = files.FileStore(FILE_STORAGE_DIR)
+FILE_STORE.remove_stale_uploads(UPLOAD_SESSION_MAX_AGE)
+
+
+@APP.before_request
+def _sync_object_store() -> None:
+    """
+    Apply the changes of other server processes to the OBJECT_STORE and RESPONSE_CACHE, before handling a request
+    """
+    OBJECT_STORE.sync()
+
+
+def _is_pretty_requested() -> bool:
+    """
+    Check if the client requested indented JSON with the `pretty` query parameter, e.g. `/get_identifiable?pretty=1`
+    """
+    return flask.request.args.get("pretty", "false").lower() in ("1", "true", "yes")
+
+
+def _parse_identifier(identifier_dict: Dict[str, str]) -> model.Identifier:
+    """
+    Parse a JSON serialized :class:`basyx.aas.model.base.Identifier`
+
+    :raises KeyError: If the given dict is not a valid Identifier
+    """
+    try:
+        return model.Identifier(
+            id_=identifier_dict["id"],
+            id_type=json_deserialization.IDENTIFIER_TYPES_INVERSE[identifier_dict["idType"]]
+        )
+    except TypeError as e:
+        raise KeyError("Not an Identifier: {}".format(identifier_dict)) from e
+
+
+def _get_serialized_identifiable(identifier: model.Identifier, pretty: bool) -> Optional[Tuple[bytes, str]]:
+    """
+    Get the serialized Identifiable with the given Identifier and its ETag from the RESPONSE_CACHE, serializing it if
+    it is not cached yet
+
+    :return: The serialized Identifiable and its ETag, or None, if there is no such Identifiable in the OBJECT_STORE
+    """
+    cache_key: Tuple = (identifier, pretty)
+    cached: Optional[Tuple[bytes, str]] = RESPONSE_CACHE.get(cache_key)
+    if cached is None:
+        generation: int = RESPONSE_CACHE.generation
+        # Try to resolve the Identifier in the object store
+        try:
+            identifiable, version = OBJECT_STORE.load_identifiable(identifier)
+        except KeyError:
+            return None
+        cached = RESPONSE_CACHE.put(
+            cache_key, serialization.dumps(identifiable, pretty=pretty), generation, _version_to_etag(version))
+    return cached
+
+
+def _version_to_etag(version: backends.Version) -> str:
+    """
+    Get the ETag of the given version of an Identifiable, which is the same for its compact and indented JSON
+
+    The ETag contains the tag of the version, so that an Identifiable that is discarded and added again does not get
+    the ETags of the previous one.
+    """
+    return "{}-{}".format(version.tag, version.number)
+
+
+def _get_expected_version() -> Optional[backends.Version]:
+    """
+    Get the version of the Identifiable the client expects from the request's `If-Match` header
+
+    :return: The expected version, or None if any version is accepted
+    :raises ValueError: If the header does not contain exactly one ETag of a version
+    """
+    if not flask.request.if_match or flask.request.if_match.star_tag:
+        return None
+    etags: List[str] = list(flask.request.if_match)
+    tag, _, number = etags[0].rpartition("-") if len(etags) == 1 else ("", "", "")
+    if not number.isdigit():
+        raise ValueError("If-Match header must contain a single ETag returned by /get_identifiable")
+    return backends.Version(tag, int(number))
+
+
+def _is_ndjson_request() -> bool:
+    """
+    Check if the request body is newline delimited JSON (one JSON document per line) instead of a JSON array
+    """
+    return flask.request.mimetype == NDJSON_MIMETYPE
+
+
+def _iter_request_documents(decoder: Optional[type] = None) -> Iterator[Union[object, ValueError]]:
+    """
+    Iterate over the JSON documents of a bulk request, whose body is either a JSON array or newline delimited JSON
+
+    A newline delimited JSON body is read line by line from the request stream. If a line cannot be parsed, the
+    ValueError is yielded in place of the document.
+
+    :param decoder: The JSONDecoder class used to parse the documents
+    :raises json.decoder.JSONDecodeError: If the body is a JSON array and cannot be parsed
+    :raises TypeError: If the body is valid JSON, but not an array
+    """
+    if not _is_ndjson_request():
+        documents = json.loads(flask.request.get_data(as_text=True), cls=decoder)
+        if not isinstance(documents, list):
+            raise TypeError("Request body is not a JSON array")
+        return iter(documents)
+
+    return transfer.parse_ndjson(flask.request.stream, decoder)
+
+
+def _make_bulk_response(results: Iterable[bytes]) -> flask.Response:
+    """
+    Stream the JSON serialized per-item results of a bulk request, as newline delimited JSON if the request was
+    newline delimited JSON, and as JSON array otherwise
+    """
+    if _is_ndjson_request():
+        return flask.Response(stream_with_context(result + b"\n" for result in results), 200,
+                              mimetype=NDJSON_MIMETYPE)
+
+    def generate() -> Iterator[bytes]:
+        yield b"["
+        for i, result in enumerate(results):
+            yield b"," + result if i else result
+        yield b"]"
+    return flask.Response(stream_with_context(generate()), 200, mimetype="application/json")
+
+
+def _bulk_status(status: int, message: str, identifier: Optional[model.Identifier] = None) -> bytes:
+    """
+    Serialize the result of a single item of a bulk request, which did not return the item itself
+    """
+    result: Dict[str, object] = {"status": status, "message": message}
+    if identifier is not None:
+        result["identification"] = identifier
+    return serialization.dumps(result)
 
 
 @APP.route("/login", methods=["GET", "POST"])
 def login_user():
     """
     Login a user with basic authentication and respond with a new JWT, if the authentication was successful.
+
+    The response also contains a refresh token, which can be exchanged for new JWTs at `/refresh`, without logging
+    in again. The login attempts of each client address are limited by the `auth.LOGIN_RATE_LIMITER`. Behind reverse
+    proxies, the client address is taken from the X-Forwarded-For header, if `TRUSTED_PROXIES` is configured.
     """
     if not flask.request.authorization \
             or not flask.request.authorization.username \
             or not flask.request.authorization.password:
         return flask.make_response("Unauthorized", 401)
+    retry_after: float = auth.LOGIN_RATE_LIMITER.acquire(flask.request.remote_addr)
+    if retry_after:
+        response = flask.make_response("Too Many Login Attempts", 429)
+        response.headers["Retry-After"] = str(math.ceil(retry_after))
+        return response
     username: str = flask.request.authorization.username
     if not auth.check_if_user_exists(username):
         print("Unknown user '{}'".format(username))
         return flask.make_response("Invalid User or Password", 401)
-    if werkzeug.security.check_password_hash(auth.get_password_hash(username), flask.request.authorization.password):
-        token = jwt.encode(
-            {
-                'name': username,
-                'exp': datetime.datetime.utcnow() + datetime.timedelta(minutes=JWT_EXPIRATION_TIME)
-            },
-            auth.SECRET_KEY,
-            algorithm="HS256"
-        )
+    if auth.check_password(username, flask.request.authorization.password):
         print("User '{}' successful login".format(username))
-        return flask.json.dumps({"token": token})
+        return flask.json.dumps({"token": auth.create_token(username),
+                                 "refresh_token": auth.create_refresh_token(username)})
     else:
         print("User '{}' invalid password".format(username))
         return flask.make_response("Invalid User or Password", 401)
 
 
+@APP.route("/refresh", methods=["POST"])
+def refresh_token():
+    """
+    Respond with a new JWT for the refresh token in the `x-refresh-token` header, which was returned by `/login`
+    """
+    token: Optional[str] = flask.request.headers.get("x-refresh-token")
+    if not token:
+        return flask.make_response("Unauthorized - Refresh token is missing", 401)
+    new_token: Optional[str] = auth.refresh_token(token)
+    if new_token is None:
+        return flask.make_response("Unauthorized - Invalid Refresh Token", 401)
+    return flask.json.dumps({"token": new_token})
+
+
 @APP.route("/test_connection", methods=["GET"])
 def test_connection():
     """
@@ -118,24 +311,39 @@ def modify_identifiable(current_user: str):
 
     Modify an existing Identifiable by overwriting it with the given one.
 
+    The Identifiable is written to the storage atomically. To prevent overwriting concurrent modifications, send the
+    `ETag` of the Identifiable returned by `/get_identifiable` in the `If-Match` header. The Identifiable is then only
+    modified, if it was not modified since. The response's `ETag` header contains the ETag of the modified
+    Identifiable.
+
     :returns:
 
         - 200
         - 400, if the request cannot be parsed
         - 404, if no result is found
+        - 412, if the Identifiable was modified since the ETag in the `If-Match` header was returned
     """
     data = flask.request.get_data(as_text=True)
     try:
         identifiable_new: Optional[model.Identifiable] = json.loads(data, cls=json_deserialization.AASFromJsonDecoder)
     except json.decoder.JSONDecodeError:
         return flask.make_response("Could not parse request, not valid JSON", 400)
+    try:
+        expected_version: Optional[backends.Version] = _get_expected_version()
+    except ValueError as e:
+        return flask.make_response(str(e), 400)
     identifier: Optional[model.Identifier] = identifiable_new.identification
-    identifiable_stored: Optional[model.Identifiable] = OBJECT_STORE.get(identifier)
     # Todo: Check here if the given user has access rights to the Identifiable
-    if identifiable_stored is None:
+    try:
+        version: backends.Version = OBJECT_STORE.update_identifiable(identifiable_new, expected_version)
+    except KeyError:
         return flask.make_response("Could not find Identifiable with id {} in repository".format(identifier.id), 404)
-    identifiable_stored.update_from(identifiable_new)
-    return flask.make_response("Success", 200)
+    except backends.VersionConflictError:
+        return flask.make_response(
+            "Identifiable with id {} was modified since the given ETag was returned".format(identifier.id), 412)
+    response = flask.make_response("Success", 200)
+    response.set_etag(_version_to_etag(version))
+    return response
 
 
 @APP.route("/get_identifiable", methods=["GET"])
@@ -153,9 +361,14 @@ def get_identifiable(current_user: str):
 
     Returns a JSON serialized :class:`basyx.aas.model.base.Identifiable`.
 
+    The response carries an `ETag` header, which changes with each modification of the Identifiable. If the
+    request's `If-None-Match` header contains that ETag, the Identifiable is not sent again. Pass the ETag in the
+    `If-Match` header of `/modify_identifiable` to prevent overwriting concurrent modifications.
+
     :returns:
 
         - 200, with the Identifiable
+        - 304, if the Identifiable matches the `If-None-Match` header
         - 400, if the request cannot be parsed
         - 404, if no result is found
         - 422, if a valid AAS object was given, but not an Identifiable
@@ -168,20 +381,193 @@ def get_identifiable(current_user: str):
         return flask.make_response("Could not parse request, not valid JSON", 400)
     # Check that the request JSON contained in fact an Identifier
     try:
-        identifier: model.Identifier = model.Identifier(
-            id_=identifier_dict["id"],
-            id_type=json_deserialization.IDENTIFIER_TYPES_INVERSE[identifier_dict["idType"]]
-        )
+        identifier: model.Identifier = _parse_identifier(identifier_dict)
     except KeyError:
         return flask.make_response("Request does not contain an Identifier", 422)
-    # Try to resolve the Identifier in the object store
-    identifiable: Optional[model.Identifiable] = OBJECT_STORE.get(identifier)
     # Todo: Check here if the given user has access rights to the Identifiable
-    if identifiable is None:
+    cached: Optional[Tuple[bytes, str]] = _get_serialized_identifiable(identifier, _is_pretty_requested())
+    if cached is None:
         return flask.make_response("Could not find Identifiable with id {} in repository".format(identifier.id), 404)
-    return flask.make_response(
-        json.dumps(identifiable, cls=json_serialization.AASToJsonEncoder, indent=4),
-        200
+    data, etag = cached
+    if flask.request.if_none_match.contains(etag):
+        response = flask.Response(status=304)
+    else:
+        response = flask.Response(data, 200, mimetype="application/json")
+    response.set_etag(etag)
+    return response
+
+
+@APP.route("/add_identifiables", methods=["POST"])
+@auth.token_required
+def add_identifiables(current_user: str):
+    """
+    Request format is a JSON array of json serialized :class:`basyx.aas.model.base.Identifiable` objects, or, with
+    the `Content-Type` `application/x-ndjson`, one json serialized Identifiable per line:
+
+    Add multiple Identifiables to the repository.
+
+    The Identifiables of a JSON array are added to the OBJECT_STORE together, those of a newline delimited JSON
+    request in batches of BULK_BATCH_SIZE Identifiables, which are read from the request stream one after another.
+    The semantic index is updated once per batch.
+
+    Returns the result of each Identifiable, in the same order and format (JSON array or newline delimited JSON) as
+    the request:
+
+    .. code-block::
+
+        {
+            "status": <HTTP status code of the Identifiable>,
+            "message": "<message>",
+            "identification": <Identifier of the Identifiable, if it could be parsed>
+        }
+
+    where the status is one of
+
+        - 200, if the Identifiable was added
+        - 400, if the line of a newline delimited JSON request cannot be parsed
+        - 409, if the Identifiable already exists in the OBJECT_STORE
+        - 422, if the item is not a valid Identifiable
+
+    :returns:
+
+        - 200, with the results
+        - 400, if the JSON array cannot be parsed
+    """
+    try:
+        documents: Iterator[Union[object, ValueError]] = _iter_request_documents(
+            json_deserialization.AASFromJsonDecoder)
+    except (json.decoder.JSONDecodeError, TypeError):
+        return flask.make_response("Could not parse request, not a valid JSON array", 400)
+
+    def add_batch(batch: List[Union[object, ValueError]]) -> Iterator[bytes]:
+        identifiables: List[model.Identifiable] = [i for i in batch if isinstance(i, model.Identifiable)]
+        # Todo: Check here if the given user has access rights to the Identifiables
+        errors: Iterator[Optional[KeyError]] = iter(OBJECT_STORE.add_batch(identifiables))
+        for document in batch:
+            if isinstance(document, ValueError):
+                yield _bulk_status(400, "Could not parse line, not valid JSON")
+            elif not isinstance(document, model.Identifiable):
+                yield _bulk_status(422, "Not a valid Identifiable")
+            elif next(errors) is not None:
+                yield _bulk_status(409, "Identifiable already exists in OBJECT_STORE", document.identification)
+            else:
+                yield _bulk_status(200, "Success", document.identification)
+
+    def generate() -> Iterator[bytes]:
+        if not _is_ndjson_request():
+            yield from add_batch(list(documents))
+            return
+        for batch in transfer.iter_batches(documents, BULK_BATCH_SIZE):
+            yield from add_batch(batch)
+    return _make_bulk_response(generate())
+
+
+@APP.route("/get_identifiables", methods=["GET"])
+@auth.token_required
+def get_identifiables(current_user: str):
+    """
+    Request format is a JSON array of json serialized :class:`basyx.aas.model.base.Identifier` objects, or, with
+    the `Content-Type` `application/x-ndjson`, one json serialized Identifier per line (see `/get_identifiable`).
+
+    Returns the result of each Identifier, in the same order and format (JSON array or newline delimited JSON) as
+    the request. The result of a found Identifiable is
+
+    .. code-block::
+
+        {
+            "status": 200,
+            "data": <json serialized Identifiable>
+        }
+
+    otherwise it contains the `status` and a `message`, where the status is one of
+
+        - 400, if the line of a newline delimited JSON request cannot be parsed
+        - 404, if no Identifiable is found
+        - 422, if the item is not an Identifier
+
+    :returns:
+
+        - 200, with the results
+        - 400, if the JSON array cannot be parsed
+    """
+    try:
+        documents: Iterator[Union[object, ValueError]] = _iter_request_documents()
+    except (json.decoder.JSONDecodeError, TypeError):
+        return flask.make_response("Could not parse request, not a valid JSON array", 400)
+    # Indented JSON would not be valid newline delimited JSON
+    pretty: bool = _is_pretty_requested() and not _is_ndjson_request()
+
+    def generate() -> Iterator[bytes]:
+        for document in documents:
+            if isinstance(document, ValueError):
+                yield _bulk_status(400, "Could not parse line, not valid JSON")
+                continue
+            try:
+                identifier: model.Identifier = _parse_identifier(document)  # type: ignore
+            except KeyError:
+                yield _bulk_status(422, "Not an Identifier")
+                continue
+            # Todo: Check here if the given user has access rights to the Identifiable
+            cached: Optional[Tuple[bytes, str]] = _get_serialized_identifiable(identifier, pretty)
+            if cached is None:
+                yield _bulk_status(404, "Could not find Identifiable in repository", identifier)
+            else:
+                yield b'{"status":200,"data":' + cached[0] + b"}"
+    return _make_bulk_response(generate())
+
+
+@APP.route("/export", methods=["GET"])
+@auth.token_required
+def export_identifiables(current_user: str):
+    """
+    Returns all Identifiables of the repository as newline delimited JSON, i.e. one json serialized
+    :class:`basyx.aas.model.base.Identifiable` per line, e.g. for a backup.
+
+    The response is streamed, without loading the whole repository into memory.
+
+    :returns:
+
+        - 200, with the Identifiables
+    """
+    # Todo: Check here if the given user has access rights to export the repository
+    return flask.Response(stream_with_context(transfer.export_ndjson(OBJECT_STORE)), 200, mimetype=NDJSON_MIMETYPE)
+
+
+@APP.route("/import", methods=["POST"])
+@auth.token_required
+def import_identifiables(current_user: str):
+    """
+    Request format is newline delimited JSON, i.e. one json serialized :class:`basyx.aas.model.base.Identifiable`
+    per line, e.g. as returned by `/export`
+
+    Add the Identifiables to the repository. The request is read from the stream and stored in batches of
+    BULK_BATCH_SIZE Identifiables. With the query parameter `rebuild_index=1`, the semantic index is rebuilt once at
+    the end, instead of being updated for each batch, which is faster for large imports.
+
+    Returns a summary of the import:
+
+    .. code-block::
+
+        {
+            "added": <number of added Identifiables>,
+            "errors": [{"line": <line number>, "message": "<message>"}, ...]
+        }
+
+    :returns:
+
+        - 200, with the summary
+    """
+    rebuild_index: bool = flask.request.args.get("rebuild_index", "false").lower() in ("1", "true", "yes")
+    # Todo: Check here if the given user has access rights to the Identifiables
+    result: transfer.ImportResult = transfer.import_ndjson(
+        OBJECT_STORE, flask.request.stream, BULK_BATCH_SIZE, rebuild_index)
+    return flask.Response(
+        serialization.dumps({
+            "added": result.added,
+            "errors": [{"line": line_number, "message": message} for line_number, message in result.errors]
+        }),
+        200,
+        mimetype="application/json"
     )
 
 
@@ -191,48 +577,292 @@ def get_file(current_user: str):
     """
     Request format is a String IRI
 
-    Returns a File from the FILE_STORAGE_DIR.
+    Returns a File from the FILE_STORE.
+
+    The File is sent with `Content-Length`, `ETag` (its SHA-256 digest) and `Last-Modified` headers. Byte ranges can
+    be requested with the `Range` header, e.g. to resume a download, and conditional requests (`If-None-Match`,
+    `If-Modified-Since`, `If-Range`) are supported. If `USE_X_SENDFILE` is configured, the sending of the File is
+    delegated to the web server in front of the application.
 
     :returns:
 
         - 200, with the File
+        - 206, with the requested range of the File
+        - 304, if the File was not modified
         - 404, if no result is found
+        - 416, if the requested range is not satisfiable
     """
     file_iri = flask.request.get_data(as_text=True)
     file_iri = file_iri.strip('"')
-    file_path_iri = file_iri.removeprefix('file:/')
-    file_path: str = FILE_STORAGE_DIR+"/"+file_path_iri
-    if not os.path.isfile(file_path):
+    file_name = file_iri.removeprefix('file:/')
+    sha256: Optional[str] = FILE_STORE.get_sha256(file_name)
+    if sha256 is None:
         return flask.make_response("Could not fetch File with IRI {}".format(file_iri), 404)
-
-    def generate():
-        with open(file_path, mode='rb', buffering=4096) as myFmu:
-            for chunk in myFmu:
-                yield chunk
-    return Response(stream_with_context(generate()))
+    return flask.send_file(
+        FILE_STORE.get_blob_path(sha256),
+        download_name=os.path.basename(file_name),
+        conditional=True,
+        etag=sha256,
+        max_age=None
+    )
 
 
 @APP.route("/post_file", methods=["POST"])
 @auth.token_required
 def add_file(current_user: str):
     """
-    Request format is a streamed File:
+    Request format is a streamed File, with its name given in the `name` header:
+
+    Add an File to the FILE_STORE.
 
-    Add an File to the FILE_STORAGE_DIR.
+    The File is streamed to disk in chunks and only replaces an existing File of the same name, once it has been
+    received completely. The response's `sha256` header contains the hex SHA-256 digest of the File.
+
+    If the request has a `sha256` header, which is the digest of a File the FILE_STORE contains already (see
+    `/check_file`), that File is stored under the given name without reading the request's body, so the body can be
+    left empty. Otherwise, the File is only stored, if its digest matches the given one.
 
     :returns:
 
         - 200, and the IRI of the added FMU-File
-        - 404, if the Path of the IRI does not exist
-    """
-    data = flask.request.get_data(cache=False)
-    file_name = flask.request.headers.get("name")
-    path_with_file = FILE_STORAGE_DIR+"/"+file_name
-    print(path_with_file)
-    with open(path_with_file, 'wb', buffering=4096) as myFmu:
-        myFmu.write(data)
+        - 400, if the name of the File is missing, or the digest of the File does not match the `sha256` header
+        - 413, if the File exceeds the MAX_FILE_SIZE
+    """
+    file_name: Optional[str] = flask.request.headers.get("name")
+    if not file_name:
+        return flask.make_response("Invalid file name {}".format(file_name), 400)
     file_iri: str = "file:"+file_name
-    return flask.make_response(file_iri, 200)
+    sha256: Optional[str] = flask.request.headers.get("sha256")
+    if sha256 is not None and FILE_STORE.link(file_name, sha256):
+        return flask.make_response(file_iri, 200, {"sha256": sha256.lower()})
+    if flask.request.content_length is not None and flask.request.content_length > MAX_FILE_SIZE:
+        return flask.make_response("File exceeds the maximum size of {} bytes".format(MAX_FILE_SIZE), 413)
+    try:
+        sha256 = FILE_STORE.add_stream(file_name, flask.request.stream, MAX_FILE_SIZE, sha256)
+    except files.FileTooLargeError as e:
+        return flask.make_response(str(e), 413)
+    except files.DigestMismatchError as e:
+        return flask.make_response(str(e), 400)
+    return flask.make_response(file_iri, 200, {"sha256": sha256})
+
+
+@APP.route("/check_file", methods=["GET"])
+@auth.token_required
+def check_file(current_user: str):
+    """
+    Request format is the hex SHA-256 digest of a File
+
+    Check if the FILE_STORE contains a File with the given digest already. If so, the File can be added under another
+    name with `/post_file`, without uploading its content again.
+
+    :returns:
+
+        - 200, if the File exists
+        - 404, if the File does not exist
+    """
+    sha256: str = flask.request.get_data(as_text=True).strip().strip('"')
+    if not FILE_STORE.has_blob(sha256):
+        return flask.make_response("Could not find File with SHA-256 digest {}".format(sha256), 404)
+    return flask.make_response("Success", 200)
+
+
+@APP.route("/initiate_upload", methods=["POST"])
+@auth.token_required
+def initiate_upload(current_user: str):
+    """
+    Start an upload session for a large File, with its name given in the `name` header. Optionally, the `sha256`
+    header contains the hex SHA-256 digest of the File, which is checked when completing the upload.
+
+    The parts of the File are then uploaded with `/upload_part`, possibly in parallel, and assembled with
+    `/complete_upload`. Upload sessions survive a restart of the server, so failed parts can simply be uploaded again.
+
+    :returns:
+
+        - 200, and the id of the upload session
+        - 400, if the name of the File is missing
+    """
+    file_name: Optional[str] = flask.request.headers.get("name")
+    if not file_name:
+        return flask.make_response("Invalid file name {}".format(file_name), 400)
+    return flask.make_response(FILE_STORE.initiate_upload(file_name, flask.request.headers.get("sha256")), 200)
+
+
+@APP.route("/upload_part", methods=["PUT"])
+@auth.token_required
+def upload_part(current_user: str):
+    """
+    Request format is a streamed part of a File, with the id of the upload session in the `upload-id` header and the
+    position of the part in the File (starting with 1) in the `part-number` header.
+
+    :returns:
+
+        - 200, and the hex SHA-256 digest of the part
+        - 400, if the part number is not valid
+        - 404, if the upload session does not exist
+        - 413, if the part exceeds the MAX_FILE_SIZE
+    """
+    upload_id: str = flask.request.headers.get("upload-id", "")
+    try:
+        part_number: int = int(flask.request.headers.get("part-number", ""))
+        sha256: str = FILE_STORE.put_upload_part(upload_id, part_number, flask.request.stream, MAX_FILE_SIZE)
+    except KeyError:
+        return flask.make_response("Could not find upload session {}".format(upload_id), 404)
+    except ValueError as e:
+        return flask.make_response("Invalid part number: {}".format(e), 400)
+    except files.FileTooLargeError as e:
+        return flask.make_response(str(e), 413)
+    return flask.make_response(sha256, 200)
+
+
+@APP.route("/complete_upload", methods=["POST"])
+@auth.token_required
+def complete_upload(current_user: str):
+    """
+    Assemble the uploaded parts of the upload session given in the `upload-id` header and add the File to the
+    FILE_STORE. The response's `sha256` header contains the hex SHA-256 digest of the File.
+
+    :returns:
+
+        - 200, and the IRI of the added File
+        - 400, if parts are missing or the digest of the File does not match the one given when initiating the upload
+        - 404, if the upload session does not exist
+        - 413, if the File exceeds the MAX_FILE_SIZE
+    """
+    upload_id: str = flask.request.headers.get("upload-id", "")
+    try:
+        file_name: str = FILE_STORE.get_upload_name(upload_id)
+        sha256: str = FILE_STORE.complete_upload(upload_id, MAX_FILE_SIZE)
+    except KeyError:
+        return flask.make_response("Could not find upload session {}".format(upload_id), 404)
+    except (ValueError, files.DigestMismatchError) as e:
+        return flask.make_response(str(e), 400)
+    except files.FileTooLargeError as e:
+        return flask.make_response(str(e), 413)
+    return flask.make_response("file:"+file_name, 200, {"sha256": sha256})
+
+
+@APP.route("/abort_upload", methods=["DELETE"])
+@auth.token_required
+def abort_upload(current_user: str):
+    """
+    Remove the upload session given in the `upload-id` header and all its uploaded parts
+
+    :returns:
+
+        - 200
+        - 404, if the upload session does not exist
+    """
+    upload_id: str = flask.request.headers.get("upload-id", "")
+    try:
+        FILE_STORE.abort_upload(upload_id)
+    except KeyError:
+        return flask.make_response("Could not find upload session {}".format(upload_id), 404)
+    return flask.make_response("Success", 200)
+
+
+# Values of the `include` field of `/query_semantic_id` and `/query_semantic_ids`
+QUERY_INCLUDE_OPTIONS = ("path", "element", "value")
+
+
+def _semantic_index_element_to_jsonable(
+        semantic_index_element: storage.SemanticIndexElement,
+        include: Optional[str] = None,
+        identifiables: Optional[Dict[model.Identifier, Optional[model.Identifiable]]] = None) -> Dict:
+    """
+    :param include: One of QUERY_INCLUDE_OPTIONS, to add the idShort path and optionally the Referable the semanticID
+        is attached to, or only its value, to the result
+    :param identifiables: The Identifiables loaded for the current request, see :func:`~._resolve_referable`
+    """
+    result: Dict = {
+        "identifier": semantic_index_element.parent_identifiable,
+        "asset_administration_shell": semantic_index_element.parent_asset_administration_shell
+    }
+    if include is None:
+        return result
+    result["id_short_path"] = ".".join(semantic_index_element.id_short_path)
+    if include == "path":
+        return result
+    referable: Optional[model.Referable] = _resolve_referable(
+        semantic_index_element, identifiables if identifiables is not None else {})
+    if include == "element":
+        result["element"] = referable
+    else:
+        result["value"] = _get_referable_value(referable) if referable is not None else None
+    return result
+
+
+def _resolve_referable(semantic_index_element: storage.SemanticIndexElement,
+                       identifiables: Dict[model.Identifier, Optional[model.Identifiable]]) \
+        -> Optional[model.Referable]:
+    """
+    Get the Referable the semanticID of the SemanticIndexElement is attached to
+
+    The parent Identifiable is loaded as a private copy via `OBJECT_STORE.load_identifiable()`, which is not modified
+    by other requests while the Referable is serialized. Each Identifiable is loaded only once per request and kept in
+    the given `identifiables`, so that all results of the same Identifiable are resolved from the same copy. Streamed
+    responses only keep the Identifiable of the current results in it.
+
+    :return: The Referable, or None, if it was removed since the index was queried
+    """
+    identifier: model.Identifier = semantic_index_element.parent_identifiable
+    if identifier not in identifiables:
+        try:
+            identifiables[identifier] = OBJECT_STORE.load_identifiable(identifier)[0]
+        except KeyError:
+            identifiables[identifier] = None
+    identifiable: Optional[model.Identifiable] = identifiables[identifier]
+    if identifiable is None:
+        return None
+    try:
+        return semantic_index_element.get_referable(identifiable)
+    except KeyError:
+        return None
+
+
+def _get_referable_value(referable: model.Referable) -> object:
+    """
+    Get the value of the Referable as returned by the query routes
+
+    The value of a Property is returned as a JSON boolean, number or string, like the values of `/query_elements`.
+    The value of any other Referable is returned as it is serialized, e.g. a list of LangStrings.
+    """
+    if isinstance(referable, model.Property):
+        return backends.get_index_value(referable.value)
+    return serialization.get_serialized_value(referable)
+
+
+def _parse_key(key_dict: Dict) -> model.Key:
+    """
+    Parse a JSON serialized :class:`basyx.aas.model.base.Key`
+
+    :raises KeyError: If the given dict is not a valid Key
+    """
+    return model.Key(
+        type_=json_deserialization.KEY_ELEMENTS_INVERSE[key_dict["type"]],
+        local=key_dict["local"],
+        value=key_dict["value"],
+        id_type=json_deserialization.KEY_TYPES_INVERSE[key_dict["idType"]]
+    )
+
+
+def _encode_cursor(semantic_index_element: storage.SemanticIndexElement) -> str:
+    return base64.urlsafe_b64encode(json.dumps(semantic_index_element.get_sort_key()).encode("utf-8")).decode("ascii")
+
+
+def _decode_cursor(cursor: str) -> Tuple:
+    """
+    :raises ValueError: If the cursor is not valid
+    """
+    try:
+        sort_key = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except (AttributeError, binascii.Error, UnicodeError, json.decoder.JSONDecodeError) as e:
+        raise ValueError("Invalid cursor {}".format(cursor)) from e
+    # The sort key is compared to the sort keys of the SemanticIndexElements, which requires the same types
+    if not isinstance(sort_key, list) or len(sort_key) != 5 \
+            or not all(isinstance(sort_key[i], str) for i in (0, 1, 3, 4)) \
+            or not isinstance(sort_key[2], list) or not all(isinstance(id_short, str) for id_short in sort_key[2]):
+        raise ValueError("Invalid cursor {}".format(cursor))
+    return sort_key[0], sort_key[1], tuple(sort_key[2]), sort_key[3], sort_key[4]
 
 
 @APP.route("/query_semantic_id", methods=["GET"])
@@ -256,8 +886,25 @@ def query_semantic_id(current_user: str):
             'check_for_key_type': false,
             'check_for_key_local': false,
             'check_for_key_id_type': false,
+            'limit': 100,
+            'cursor': '<x-next-cursor header of the previous page>',
+            'stream': false,
+            'include': 'value'
         }
 
+    `limit`, `cursor`, `stream` and `include` are optional. If a `limit` is given, at most `limit` results are
+    returned, in a stable order. If there are more results, the response has a `x-next-cursor` header, whose value can
+    be given as `cursor` to get the next page. If `stream` is true, the results are written to the response one by
+    one, instead of serializing them all at once.
+
+    If `include` is given, each result also contains the `id_short_path` of the Referable the semanticID is attached
+    to, i.e. its idShorts inside the Identifiable separated by `.`, which is empty for the Identifiable itself. If
+    `include` is `element`, the result additionally contains the JSON serialized Referable as `element`. If `include`
+    is `value`, it only contains the `value` of the Referable: The value of a Property as JSON boolean, number or
+    string, like the `value` returned by `/query_elements`, the serialized `value` of other Referables, e.g. a list of
+    LangStrings, or null if the Referable has no `value`. This saves fetching the whole Identifiable via
+    `/get_identifiable`. Each Identifiable is read only once per request, however many of its Referables are returned.
+
     Returns a list of Identifiers of the identifiable the semanticID is contained in
     and optionally, the Identifier of the parent AssetAdministrationShell, if it exists.
 
@@ -272,7 +919,9 @@ def query_semantic_id(current_user: str):
                 'asset_administration_shell': {
                     "id": "<Identifier.id string>",
                     "idType": "<idType string>"
-                }
+                },
+                'id_short_path': 'Measurements.Temperature',
+                'value': 21.5
             }
         ]
 
@@ -293,37 +942,282 @@ def query_semantic_id(current_user: str):
         check_for_key_type: bool = data_dict["check_for_key_type"]
         check_for_key_local: bool = data_dict["check_for_key_local"]
         check_for_key_id_type: bool = data_dict["check_for_key_id_type"]
-        semantic_id: model.Key = model.Key(
-            type_=json_deserialization.KEY_ELEMENTS_INVERSE[data_dict["semantic_id"]["type"]],
-            local=True if data_dict["semantic_id"] else False,
-            value=data_dict["semantic_id"]["value"],
-            id_type=json_deserialization.KEY_TYPES_INVERSE[data_dict["semantic_id"]["idType"]]
-        )
-    except KeyError:
+        semantic_id: model.Key = _parse_key(data_dict["semantic_id"])
+        limit: Optional[int] = data_dict.get("limit")
+        if limit is not None and (not isinstance(limit, int) or limit < 1):
+            raise ValueError("Invalid limit {}".format(limit))
+        after: Optional[Tuple] = _decode_cursor(data_dict["cursor"]) if data_dict.get("cursor") else None
+        stream: bool = bool(data_dict.get("stream", False))
+        include: Optional[str] = data_dict.get("include")
+        if include is not None and include not in QUERY_INCLUDE_OPTIONS:
+            raise ValueError("Invalid include {}".format(include))
+    except (KeyError, TypeError, ValueError):
         return flask.make_response("Request does not have correct format", 422)
-    # Get the list of identifiables that contain the semanticID
-    result = OBJECT_STORE.get_semantic_id(
-        semantic_id=semantic_id,
-        check_for_key_type=check_for_key_type,
-        check_for_key_local=check_for_key_local,
-        check_for_key_id_type=check_for_key_id_type
+    # Get the identifiables that contain the semanticID
+    headers: Dict[str, str] = {}
+    if limit is not None:
+        # Fetch one more element than requested, to know if there is another page
+        page: List[storage.SemanticIndexElement] = OBJECT_STORE.get_semantic_id_page(
+            semantic_id=semantic_id,
+            check_for_key_type=check_for_key_type,
+            check_for_key_local=check_for_key_local,
+            check_for_key_id_type=check_for_key_id_type,
+            limit=limit + 1,
+            after=after
+        )
+        if len(page) > limit:
+            page = page[:limit]
+            headers["x-next-cursor"] = _encode_cursor(page[-1])
+        result: Iterable[storage.SemanticIndexElement] = page
+    else:
+        result = OBJECT_STORE.iter_semantic_id(
+            semantic_id=semantic_id,
+            check_for_key_type=check_for_key_type,
+            check_for_key_local=check_for_key_local,
+            check_for_key_id_type=check_for_key_id_type
+        )
+    # Todo: Check here if the given user has access rights to the Identifiable
+    identifiables: Dict[model.Identifier, Optional[model.Identifiable]] = {}
+    if stream:
+        def generate():
+            yield b"["
+            for i, semantic_index_element in enumerate(result):
+                # The results are grouped by their parent Identifiable, either by `iter_semantic_id()` or by the sort
+                # key of the page, so only the current one is kept to bound the memory needed
+                if semantic_index_element.parent_identifiable not in identifiables:
+                    identifiables.clear()
+                yield (b"," if i else b"") + serialization.dumps(
+                    _semantic_index_element_to_jsonable(semantic_index_element, include, identifiables)
+                )
+            yield b"]"
+        return Response(stream_with_context(generate()), 200, headers, mimetype="application/json")
+    jsonable_result: List = [
+        _semantic_index_element_to_jsonable(semantic_index_element, include, identifiables)
+        for semantic_index_element in result
+    ]
+    return flask.Response(
+        serialization.dumps(jsonable_result, pretty=_is_pretty_requested()),
+        200,
+        headers,
+        mimetype="application/json"
     )
+
+
+@APP.route("/query_semantic_ids", methods=["GET"])
+@auth.token_required
+def query_semantic_ids(current_user: str):
+    """
+    Query the repository for multiple semanticIDs at once
+
+    Request format is a list of queries, each like the request of `/query_semantic_id`, without pagination:
+
+    .. code-block::
+
+        {
+            'queries': [
+                {
+                    'semantic_id': {
+                        'type': 'GlobalReference',
+                        'idType': 'IRI',
+                        'value': 'https://example.com/semanticIDs/ONE',
+                        'local': False
+                    },
+                    'check_for_key_type': false,
+                    'check_for_key_local': false,
+                    'check_for_key_id_type': false
+                }
+            ],
+            'include': 'value'
+        }
+
+    The `check_for_key_*` flags and `include` are optional, see `/query_semantic_id`. At most `MAX_BATCH_QUERIES`
+    queries can be given. All queries are answered from the same state of the repository.
+
+    Returns the results of each query, in order of the queries:
+
+    .. code-block::
+
+        [
+            {
+                'semantic_id': {
+                    'type': 'GlobalReference',
+                    'idType': 'IRI',
+                    'value': 'https://example.com/semanticIDs/ONE',
+                    'local': False
+                },
+                'results': [<results as returned by /query_semantic_id>]
+            }
+        ]
+
+    :returns:
+
+        - 200, with the above result
+        - 400, if the request cannot be parsed
+        - 422, if the request does not have the above format, or contains more than `MAX_BATCH_QUERIES` queries
+    """
+    data = flask.request.get_data(as_text=True)
+    try:
+        data_dict: Dict = json.loads(data)
+    except json.decoder.JSONDecodeError:
+        return flask.make_response("Could not parse request, not valid JSON", 400)
+    try:
+        query_dicts: List[Dict] = data_dict["queries"]
+        if not isinstance(query_dicts, list):
+            raise ValueError("Invalid queries {}".format(query_dicts))
+        queries: List[storage.SemanticIDQuery] = [
+            storage.SemanticIDQuery(
+                _parse_key(query_dict["semantic_id"]),
+                bool(query_dict.get("check_for_key_type", False)),
+                bool(query_dict.get("check_for_key_local", False)),
+                bool(query_dict.get("check_for_key_id_type", False))
+            )
+            for query_dict in query_dicts
+        ]
+        include: Optional[str] = data_dict.get("include")
+        if include is not None and include not in QUERY_INCLUDE_OPTIONS:
+            raise ValueError("Invalid include {}".format(include))
+    except (KeyError, TypeError, ValueError, AttributeError):
+        return flask.make_response("Request does not have correct format", 422)
+    if len(queries) > MAX_BATCH_QUERIES:
+        return flask.make_response("Too many queries, at most {} are allowed".format(MAX_BATCH_QUERIES), 422)
+    results: List[List[storage.SemanticIndexElement]] = OBJECT_STORE.query_semantic_ids(queries)
     # Todo: Check here if the given user has access rights to the Identifiable
-    jsonable_result: List = []
-    for semantic_index_element in result:
-        jsonable_result.append(
+    identifiables: Dict[model.Identifier, Optional[model.Identifiable]] = {}
+    jsonable_result: List = [
+        {
+            "semantic_id": query.semantic_id,
+            "results": [_semantic_index_element_to_jsonable(semantic_index_element, include, identifiables)
+                        for semantic_index_element in result]
+        }
+        for query, result in zip(queries, results)
+    ]
+    return flask.Response(
+        serialization.dumps(jsonable_result, pretty=_is_pretty_requested()),
+        200,
+        mimetype="application/json"
+    )
+
+
+@APP.route("/query_elements", methods=["GET"])
+@auth.token_required
+def query_elements(current_user: str):
+    """
+    Query the repository for the Referables with a semanticID, which match the given filters
+
+    Request format:
+
+    .. code-block::
+
+        {
+            'semantic_id': {
+                'type': 'GlobalReference',
+                'idType': 'IRI',
+                'value': 'https://example.com/semanticIDs/ONE',
+                'local': False
+            },
+            'check_for_key_type': false,
+            'check_for_key_local': false,
+            'check_for_key_id_type': false,
+            'model_type': 'Property',
+            'id_short_path': 'Measurements.**.Temperature*',
+            'value': {'ge': 20, 'lt': 30},
+            'limit': 100,
+            'cursor': '<x-next-cursor header of the previous page>'
+        }
+
+    All fields but `semantic_id` are optional:
+
+        - `model_type`: The name of the class of the Referables, e.g. `Property` or `SubmodelElementCollection`
+        - `id_short_path`: A pattern of the idShort path of the Referables inside their Submodel. The idShorts are
+          separated by `.` and may contain the wildcards `*`, `?` and `[...]`. `**` matches any number of idShorts.
+        - `value`: Comparisons the value of Properties has to fulfill, with the operators `eq`, `ne`, `lt`, `le`,
+          `gt` and `ge`. Booleans, numbers and strings are only compared to values of the same type. Dates and other
+          values are compared by their XSD string representation.
+        - `limit` and `cursor`: See `/query_semantic_id`
+
+    Returns a list of the matching Referables:
+
+    .. code-block::
+
+        [
             {
-                "identifier": semantic_index_element.parent_identifiable,
-                "asset_administration_shell": semantic_index_element.parent_asset_administration_shell
+                'identifier': {
+                    "id": "<Identifier.id string>",
+                    "idType": "<idType string>"
+                },
+                'asset_administration_shell': {
+                    "id": "<Identifier.id string>",
+                    "idType": "<idType string>"
+                },
+                'id_short_path': 'Measurements.Temperature1',
+                'model_type': 'Property',
+                'value': 21.5
             }
-        )
-    return flask.make_response(
-        json.dumps(
-            jsonable_result,
-            cls=json_serialization.AASToJsonEncoder,
-            indent=4
-        ),
-        200
+        ]
+
+    `value` is null, if the Referable is not a Property.
+
+    :returns:
+
+        - 200, with the above result
+        - 400, if the request cannot be parsed
+        - 422, if the request does not have the above format
+    """
+    data = flask.request.get_data(as_text=True)
+    try:
+        data_dict: Dict = json.loads(data)
+    except json.decoder.JSONDecodeError:
+        return flask.make_response("Could not parse request, not valid JSON", 400)
+    try:
+        semantic_id: model.Key = _parse_key(data_dict["semantic_id"])
+        check_for_key_type: bool = bool(data_dict.get("check_for_key_type", False))
+        check_for_key_local: bool = bool(data_dict.get("check_for_key_local", False))
+        check_for_key_id_type: bool = bool(data_dict.get("check_for_key_id_type", False))
+        model_type: Optional[str] = data_dict.get("model_type")
+        id_short_path: Optional[str] = data_dict.get("id_short_path")
+        if not isinstance(model_type, (str, type(None))) or not isinstance(id_short_path, (str, type(None))):
+            raise ValueError("Invalid model_type or id_short_path")
+        value: Dict = data_dict.get("value") or {}
+        if not isinstance(value, dict) or any(operator not in storage.VALUE_OPERATORS
+                                              or not isinstance(other, (bool, int, float, str))
+                                              for operator, other in value.items()):
+            raise ValueError("Invalid value comparison {}".format(value))
+        limit: Optional[int] = data_dict.get("limit")
+        if limit is not None and (not isinstance(limit, int) or limit < 1):
+            raise ValueError("Invalid limit {}".format(limit))
+        after: Optional[Tuple] = _decode_cursor(data_dict["cursor"]) if data_dict.get("cursor") else None
+    except (KeyError, TypeError, ValueError):
+        return flask.make_response("Request does not have correct format", 422)
+    result: Iterable[Tuple[storage.SemanticIndexElement, backends.ElementAttributes]] = OBJECT_STORE.query_elements(
+        semantic_id,
+        check_for_key_type,
+        check_for_key_local,
+        check_for_key_id_type,
+        model_type=model_type,
+        id_short_path=id_short_path,
+        value=value
+    )
+    headers: Dict[str, str] = {}
+    if limit is not None:
+        # Fetch one more element than requested, to know if there is another page
+        page = storage.get_page(result, limit + 1, after, lambda item: item[0].get_sort_key())
+        if len(page) > limit:
+            page = page[:limit]
+            headers["x-next-cursor"] = _encode_cursor(page[-1][0])
+        result = page
+    # Todo: Check here if the given user has access rights to the Identifiable
+    jsonable_result: List = [
+        dict(_semantic_index_element_to_jsonable(element),
+             id_short_path=".".join(element.id_short_path),
+             model_type=attributes.model_type,
+             value=attributes.value)
+        for element, attributes in result
+    ]
+    return flask.Response(
+        serialization.dumps(jsonable_result, pretty=_is_pretty_requested()),
+        200,
+        headers,
+        mimetype="application/json"
     )
 
 
@@ -0,0 +1,144 @@
+"""
+This module serializes the responses of the AAS Repository Server to JSON.
+
+The objects are converted by the :class:`basyx.aas.adapter.json.json_serialization.AASToJsonEncoder`. If `orjson` or
+`ujson` is installed, it is used to encode the resulting JSON data, otherwise the `json` module of the standard
+library is used. The JSON is compact, unless pretty-printing is requested.
+
+The :class:`~.SerializationCache` keeps the JSON of recently requested Identifiables, together with an ETag.
+"""
+import collections
+import hashlib
+import json
+import threading
+from typing import Any, Dict, Hashable, Optional, Set, Tuple
+
+from basyx.aas.adapter.json import json_serialization
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    import ujson
+except ImportError:
+    ujson = None
+
+
+_ENCODER = json_serialization.AASToJsonEncoder()
+
+if orjson is not None:
+    JSON_LIBRARY: str = "orjson"
+elif ujson is not None:
+    JSON_LIBRARY = "ujson"
+else:
+    JSON_LIBRARY = "json"
+
+
+def dumps(obj: Any, pretty: bool = False) -> bytes:
+    """
+    Serialize the given object, which may contain AAS objects, to UTF-8 encoded JSON
+
+    :param obj: The object to serialize
+    :param pretty: If True, the JSON is indented for better readability
+    :return: The UTF-8 encoded JSON
+    """
+    if JSON_LIBRARY == "orjson":
+        return orjson.dumps(obj, default=_ENCODER.default, option=orjson.OPT_INDENT_2 if pretty else 0)
+    if JSON_LIBRARY == "ujson":
+        return ujson.dumps(obj, default=_ENCODER.default, indent=4 if pretty else 0,
+                           ensure_ascii=False, escape_forward_slashes=False).encode("utf-8")
+    if pretty:
+        return json.dumps(obj, cls=json_serialization.AASToJsonEncoder, indent=4).encode("utf-8")
+    return json.dumps(obj, cls=json_serialization.AASToJsonEncoder, separators=(",", ":")).encode("utf-8")
+
+
+def get_serialized_value(obj: Any) -> Any:
+    """
+    Get the `value` of the JSON serialization of the given AAS object, e.g. the XSD string representation of the value
+    of a Property, or None, if its serialization has no `value`, e.g. for a Range
+
+    The returned value may still contain AAS objects, e.g. the SubmodelElements of a SubmodelElementCollection, which
+    are serialized by :func:`~.dumps`.
+    """
+    return _ENCODER.default(obj).get("value")
+
+
+class SerializationCache:
+    """
+    A thread-safe LRU cache of serialized objects and their strong ETags, limited by the total size of the cached data
+
+    Cached data is stored under an arbitrary key, whose first element is the Identifier of the serialized
+    Identifiable, e.g. `(identifier, pretty)`, so that all entries of an Identifiable can be invalidated together.
+
+    To prevent caching data serialized from an outdated object, get the :meth:`~.generation` before reading the object
+    and pass it to :meth:`~.put`. The data is then not cached, if the cache was invalidated in the meantime.
+    """
+    def __init__(self, max_bytes: int):
+        self.max_bytes: int = max_bytes
+        self._entries: "collections.OrderedDict[Tuple[Hashable, ...], Tuple[bytes, str]]" = collections.OrderedDict()
+        self._keys: Dict[Hashable, Set[Tuple[Hashable, ...]]] = {}
+        self._size: int = 0
+        self._generation: int = 0
+        self._lock = threading.Lock()
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def get(self, key: Tuple[Hashable, ...]) -> Optional[Tuple[bytes, str]]:
+        """
+        Get the cached data and its ETag, if the key is cached
+        """
+        with self._lock:
+            entry: Optional[Tuple[bytes, str]] = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key: Tuple[Hashable, ...], data: bytes, generation: int, etag: Optional[str] = None) \
+            -> Tuple[bytes, str]:
+        """
+        Cache the given data, if the cache was not invalidated since `generation`
+
+        :param etag: The ETag of the data. By default, the hex SHA-256 digest of the data is used.
+        :return: The data and its ETag
+        """
+        entry: Tuple[bytes, str] = (data, etag if etag is not None else hashlib.sha256(data).hexdigest())
+        if len(data) > self.max_bytes:
+            return entry
+        with self._lock:
+            if generation != self._generation:
+                return entry
+            self._remove(key)
+            self._entries[key] = entry
+            self._keys.setdefault(key[0], set()).add(key)
+            self._size += len(data)
+            while self._size > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+        return entry
+
+    def invalidate(self, identifier: Hashable) -> None:
+        """
+        Remove all cached entries of the given Identifier
+        """
+        with self._lock:
+            self._generation += 1
+            for key in self._keys.pop(identifier, set()):
+                self._size -= len(self._entries.pop(key)[0])
+
+    def clear(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self._keys.clear()
+            self._size = 0
+
+    def _remove(self, key: Tuple[Hashable, ...]) -> None:
+        entry: Optional[Tuple[bytes, str]] = self._entries.pop(key, None)
+        if entry is not None:
+            self._size -= len(entry[0])
+            keys: Set[Tuple[Hashable, ...]] = self._keys[key[0]]
+            keys.discard(key)
+            if not keys:
+                del self._keys[key[0]]
@@ -1,155 +1,823 @@
-from typing import Dict, Set, Optional
-import dataclasses
+import bisect
+import contextlib
+import fnmatch
+import heapq
+import threading
+import weakref
+from typing import Callable, Dict, Set, Optional, Iterable, Iterator, Tuple, List, NamedTuple, Sequence, TypeVar
 
 from basyx.aas import model
-from basyx.aas.backend import local_file
-from basyx.aas.util import traversal
+from aas_repository_server import backends, journal
 
 
-@dataclasses.dataclass
-class SemanticIndexElement:
+# Comparison operators of the value filter of `RepositoryObjectStore.query_elements()`
+VALUE_OPERATORS: Tuple[str, ...] = ("eq", "ne", "lt", "le", "gt", "ge")
+
+
+class SemanticIndexElement(NamedTuple):
     """
     A Semantic Index Element
 
-    :attr: semantically_identified_referable: The Referable that the semanticID is
-        attached to
+    The element only holds Identifiers and idShorts, so that the index does not keep any deserialized Identifiable
+    alive. Use :meth:`~.resolve_referable` to get the Referable the semanticID is attached to.
+
     :attr: parent_identifiable: The Identifiable that is the parent of the Referable.
         Typically a Submodel. If the semantic ID is attached to the Submodel itsself,
-        `semantically_identified_referable` and `parent_identifiable` will both point
-        to the Submodel
+        the `id_short_path` is empty
+    :attr: id_short_path: The idShorts leading from the `parent_identifiable` to the
+        Referable the semanticID is attached to
     :attr: parent_asset_administration_shell: The Asset Administration Shell that
         contains the Identifiable that contains the Referable the semanticID is
         attached to, if it exists
     """
-    semantically_identified_referable: model.Referable
     parent_identifiable: model.Identifier
+    id_short_path: Tuple[str, ...] = ()
     parent_asset_administration_shell: Optional[model.Identifier] = None
 
-    def __hash__(self):
-        return hash((self.semantically_identified_referable, self.parent_identifiable))
+    def get_sort_key(self) -> Tuple[str, str, Tuple[str, ...], str, str]:
+        """
+        Get a key that orders SemanticIndexElements stably, e.g. for paginating query results
+        """
+        aas: Optional[model.Identifier] = self.parent_asset_administration_shell
+        return (self.parent_identifiable.id_type.name, self.parent_identifiable.id, self.id_short_path,
+                aas.id_type.name if aas is not None else "", aas.id if aas is not None else "")
+
+    def resolve_referable(self, object_store: model.AbstractObjectProvider) -> model.Referable:
+        """
+        Get the Referable the semanticID is attached to from the given object store
+
+        :raises KeyError: If the Referable cannot be found
+        """
+        return self.get_referable(object_store.get_identifiable(self.parent_identifiable))
+
+    def get_referable(self, parent_identifiable: model.Identifiable) -> model.Referable:
+        """
+        Get the Referable the semanticID is attached to from the given copy of the `parent_identifiable`
+
+        :raises KeyError: If the Referable cannot be found
+        """
+        referable: model.Referable = parent_identifiable
+        for id_short in self.id_short_path:
+            if not isinstance(referable, model.Namespace):
+                raise KeyError("Referable {} does not contain any Referable with id_short {}".format(
+                    referable, id_short))
+            referable = referable.get_referable(id_short)
+        return referable
+
+
+class SemanticIDQuery(NamedTuple):
+    """
+    A query for the SemanticIndexElements whose semanticID matches a Key, see
+    :meth:`~.RepositoryObjectStore.get_semantic_id` for the meaning of the attributes
+    """
+    semantic_id: model.Key
+    check_for_key_type: bool = False
+    check_for_key_local: bool = False
+    check_for_key_id_type: bool = False
+
+
+# Entry of the `RepositoryObjectStore.property_value_index`: The value sort key, the sort key of the element, and the
+# element
+_ValueIndexEntry = Tuple[Tuple[int, backends.IndexValue], Tuple, SemanticIndexElement]
+
+
+def _get_value_sort_key(value: backends.IndexValue) -> Tuple[int, backends.IndexValue]:
+    """
+    Get a key to sort values of different types by, which groups Booleans, numbers and strings
+    """
+    if isinstance(value, bool):
+        return 0, value
+    if isinstance(value, (int, float)):
+        return 1, value
+    return 2, value
+
+
+def _compare_value(value: backends.IndexValue, comparisons: Dict[str, backends.IndexValue]) -> bool:
+    """
+    Check if the given value fulfills all comparisons, which map an operator of VALUE_OPERATORS to the value to compare
+    to. Values of different types (Boolean, number and string) never fulfill a comparison.
+    """
+    if value is None:
+        return False
+    sort_key: Tuple[int, backends.IndexValue] = _get_value_sort_key(value)
+    for operator, other in comparisons.items():
+        other_sort_key: Tuple[int, backends.IndexValue] = _get_value_sort_key(other)
+        if sort_key[0] != other_sort_key[0]:
+            return False
+        if not {
+            "eq": sort_key == other_sort_key,
+            "ne": sort_key != other_sort_key,
+            "lt": sort_key < other_sort_key,
+            "le": sort_key <= other_sort_key,
+            "gt": sort_key > other_sort_key,
+            "ge": sort_key >= other_sort_key,
+        }[operator]:
+            return False
+    return True
+
+
+def _get_value_range(comparisons: Dict[str, backends.IndexValue]) -> Tuple[Tuple, Tuple]:
+    """
+    Get the smallest and the largest value sort key, which may fulfill the given comparisons
+    """
+    kind: int = _get_value_sort_key(next(iter(comparisons.values())))[0]
+    # Smaller and larger than all sort keys of values of this kind
+    lower: Tuple = (kind,)
+    upper: Tuple = (kind + 1,)
+    for operator, other in comparisons.items():
+        if operator in ("eq", "gt", "ge"):
+            lower = max(lower, _get_value_sort_key(other))
+        if operator in ("eq", "lt", "le"):
+            upper = min(upper, _get_value_sort_key(other))
+    return lower, upper
+
+
+_T = TypeVar("_T")
+
+
+def get_page(items: Iterable[_T], limit: int, after: Optional[Tuple], get_sort_key: Callable[[_T], Tuple]) \
+        -> List[_T]:
+    """
+    Get at most `limit` of the given items, ordered by their sort keys, e.g. :meth:`~.SemanticIndexElement.get_sort_key`
+
+    :param after: Only return items with a sort key larger than this one. Pass the sort key of the last item of the
+        previous page to get the next page. It has to be comparable to the sort keys of the items.
+    """
+    if after is not None:
+        items = (item for item in items if get_sort_key(item) > after)
+    return heapq.nsmallest(limit, items, key=get_sort_key)
+
+
+def match_id_short_path(pattern: str, id_short_path: Tuple[str, ...]) -> bool:
+    """
+    Check if the given idShort path matches the pattern
+
+    The pattern consists of idShort patterns separated by `.`, which are matched with :func:`fnmatch.fnmatchcase`,
+    e.g. `Temperature*`. A `**` matches any number of idShorts, e.g. `**.Temperature` matches all Referables with the
+    idShort `Temperature`. The empty pattern only matches the Submodel itself.
+
+    The time needed is proportional to the number of idShort patterns times the length of the path, however many `**`
+    the pattern contains.
+    """
+    segments: List[str] = []
+    for segment in pattern.split(".") if pattern else ():
+        # Consecutive `**` match the same paths as a single one
+        if segment != "**" or not segments or segments[-1] != "**":
+            segments.append(segment)
+    # matches[j] tells if the segments processed so far, i.e. the tail of the pattern, match id_short_path[j:]
+    matches: List[bool] = [False] * len(id_short_path) + [True]
+    for segment in reversed(segments):
+        if segment == "**":
+            # `**` matches id_short_path[j:] if the rest of the pattern matches any tail of it
+            for j in range(len(id_short_path) - 1, -1, -1):
+                matches[j] = matches[j] or matches[j + 1]
+        else:
+            matches = [j < len(id_short_path) and matches[j + 1] and fnmatch.fnmatchcase(id_short_path[j], segment)
+                       for j in range(len(id_short_path) + 1)]
+    return matches[0]
+
 
+class ReadWriteLock:
+    """
+    A lock that can be held by any number of readers at once, or by a single writer
 
-class RepositoryObjectStore(local_file.LocalFileObjectStore):
+    Once a writer waits for the lock, new readers wait until the writer has released it, so that a steady stream of
+    readers cannot starve writers. The lock is not reentrant.
+    """
+    def __init__(self):
+        self._condition = threading.Condition(threading.Lock())
+        self._readers: int = 0
+        self._waiting_writers: int = 0
+        self._writing: bool = False
+
+    @contextlib.contextmanager
+    def read(self) -> Iterator[None]:
+        with self._condition:
+            while self._writing or self._waiting_writers:
+                self._condition.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._readers -= 1
+                if not self._readers:
+                    self._condition.notify_all()
+
+    @contextlib.contextmanager
+    def write(self) -> Iterator[None]:
+        with self._condition:
+            self._waiting_writers += 1
+            try:
+                while self._writing or self._readers:
+                    self._condition.wait()
+            finally:
+                self._waiting_writers -= 1
+            self._writing = True
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._writing = False
+                self._condition.notify_all()
+
+
+class RepositoryObjectStore(model.AbstractObjectStore):
     """
     This ObjectStore has the added functionality that it indexes all semanticIDs in the existing Identifiable objects.
     That way, it allows for searching the objects for occurrences of a semanticID.
 
     Note, that this is just a temporary solution, as it does not scale endlessly. But it slightly fancier than
     iterating over the whole ObjectStore every time we want a semanticId
+
+    The Identifiables are persisted by the given :class:`~aas_repository_server.backends.StorageBackend`, which also
+    persists the parts of them that are needed to build the index.
+
+    The store can be shared by multiple threads. The index is guarded by a :class:`~.ReadWriteLock`: Queries only
+    exclude writers, and each write publishes its changes of the index at once, so that queries never see an
+    Identifiable partially indexed. Writes are serialized, so that the index is updated in the same order as the
+    backend. The Identifiables returned by :meth:`~.get_identifiable` are shared by all threads
+    and updated in place by :meth:`~.update_identifiable`. Use :meth:`~.load_identifiable` to get a private copy
+    instead, e.g. to serialize it.
+
+    Multiple processes can share the same backend, if each of their stores is given the same
+    :class:`~aas_repository_server.journal.ChangeJournal`. Each store appends its changes to the journal, and applies
+    the changes of the other processes to its index and local replications on :meth:`~.sync`.
     """
-    def __init__(self, storage_directory: str):
-        super().__init__(storage_directory)
+    def __init__(self, backend: backends.StorageBackend, change_journal: Optional[journal.ChangeJournal] = None):
+        super().__init__()
+        self.backend: backends.StorageBackend = backend
+        self.change_journal: Optional[journal.ChangeJournal] = change_journal
+        # Sequence number of the last journal entry, whose change is included in the index
+        self._journal_sequence: int = change_journal.get_last_sequence() if change_journal is not None else 0
+        # Weak references to the local replications of the stored objects, so that getting an object from the store
+        # always returns the same object, as long as it is referenced anywhere else
+        self._object_cache: weakref.WeakValueDictionary[model.Identifier, model.Identifiable] = \
+            weakref.WeakValueDictionary()
+        self._object_cache_lock = threading.Lock()
+        # Serializes writes, so that the changes of the backend, the object cache and the index are applied in the
+        # same order
+        self._write_lock = threading.Lock()
+        # Guards all of the following index attributes
+        self._index_lock: ReadWriteLock = ReadWriteLock()
+        # The semanticIDs of each Submodel are indexed exactly once, without a parent AAS. The parent AASs are added
+        # to the SemanticIndexElements when querying, using the `submodel_aas_index`.
         self.semantic_id_index: Dict[model.Key, Set[SemanticIndexElement]] = {}
+        # Secondary index over `semantic_id_index`, mapping each `Key.value` to the distinct Keys with that value.
+        # Keys only differ in `type`, `local` and `id_type` beyond their value, so each bucket stays small.
+        self.semantic_id_value_index: Dict[str, Set[model.Key]] = {}
+        # Maps the Identifier of each Submodel to the Identifiers of the AASs referencing it
+        self.submodel_aas_index: Dict[model.Identifier, Set[model.Identifier]] = {}
+        # The attributes of each indexed Referable, by which it can be queried with `query_elements()`, by the
+        # Identifier of its Identifiable and its idShort path
+        self.element_attributes: Dict[model.Identifier, Dict[Tuple[str, ...], backends.ElementAttributes]] = {}
+        # Secondary index over `semantic_id_index`, mapping each Key to the values of the Properties carrying it,
+        # sorted by value, so that value ranges are found by bisection
+        self.property_value_index: Dict[model.Key, List[_ValueIndexEntry]] = {}
+        # Maps each Identifier to the index entries it contributed, so that the index can be updated incrementally
+        # when an Identifiable is added, modified or discarded
+        self._semantic_id_contributions: Dict[model.Identifier, Set[Tuple[model.Key, SemanticIndexElement]]] = {}
+        self._aas_submodels: Dict[model.Identifier, List[model.Identifier]] = {}
+        # Functions that are called with the Identifier of each added, modified or discarded Identifiable, after the
+        # change has been made, e.g. to invalidate caches. They are called with None, if any Identifiable may have
+        # changed.
+        self.change_listeners: List[Callable[[Optional[model.Identifier]], None]] = []
         self._index_semantic_ids()
 
+    def get_identifiable(self, identifier: model.Identifier) -> model.Identifiable:
+        """
+        Get the Identifiable with the given Identifier from the backend
+
+        If the Identifiable is still referenced from anywhere else, that local replication is updated and returned.
+
+        :raises KeyError: If no such Identifiable exists in the object store
+        """
+        return self.get_identifiable_and_version(identifier)[0]
+
+    def get_identifiable_and_version(self, identifier: model.Identifier) \
+            -> Tuple[model.Identifiable, backends.Version]:
+        """
+        Get the Identifiable with the given Identifier and its version, whose number is incremented by each update
+
+        :raises KeyError: If no such Identifiable exists in the object store
+        """
+        identifiable, version = self.backend.get(identifier)
+        return self._get_cached(identifiable), version
+
+    def load_identifiable(self, identifier: model.Identifier) -> Tuple[model.Identifiable, backends.Version]:
+        """
+        Get a new copy of the Identifiable with the given Identifier and its version, which is not shared with other
+        threads
+
+        :raises KeyError: If no such Identifiable exists in the object store
+        """
+        return self.backend.get(identifier)
+
+    def add(self, x: model.Identifiable) -> None:
+        """
+        Add an object to the store and its semanticIDs to the index
+
+        :raises KeyError: If an object with the same id exists already in the object store
+        """
+        error: Optional[KeyError] = self.add_batch([x])[0]
+        if error is not None:
+            raise error
+
+    def add_batch(self, identifiables: Iterable[model.Identifiable], update_index: bool = True) \
+            -> List[Optional[KeyError]]:
+        """
+        Add multiple objects to the store with a single write of the backend, and their semanticIDs to the index
+
+        Objects that cannot be added do not prevent the others from being added.
+
+        :param update_index: If False, the objects are not added to the index. Call :meth:`~.rebuild_semantic_index`
+            after adding all batches instead.
+        :return: For each given object, None if it was added, or the KeyError, if an object with the same id exists
+            already in the object store
+        """
+        items: List[Tuple[model.Identifiable, backends.IndexRecord]] = [
+            (identifiable, backends.get_index_record(identifiable)) for identifiable in identifiables]
+        with self._write_lock:
+            results: List[Optional[KeyError]] = self.backend.add(items)
+            with self._object_cache_lock:
+                for (identifiable, _), error in zip(items, results):
+                    if error is None:
+                        self._object_cache[identifiable.identification] = identifiable
+            if update_index:
+                with self._index_lock.write():
+                    for (_, record), error in zip(items, results):
+                        if error is None:
+                            self._add_index_record(record)
+            self._append_to_journal([identifiable.identification
+                                     for (identifiable, _), error in zip(items, results) if error is None])
+        for (identifiable, _), error in zip(items, results):
+            if error is None:
+                self._notify_change(identifiable.identification)
+        return results
+
+    def rebuild_semantic_index(self) -> None:
+        """
+        Rebuild the index from the index records of the backend, e.g. after adding objects without updating the index
+        """
+        self._index_semantic_ids()
+
+    def discard(self, x: model.Identifiable) -> None:
+        """
+        Delete an object from the store and its semanticIDs from the index
+
+        :raises KeyError: If the object does not exist in the database
+        """
+        with self._write_lock:
+            self.backend.discard(x.identification)
+            with self._object_cache_lock:
+                self._object_cache.pop(x.identification, None)
+            with self._index_lock.write():
+                self._remove_index_record(x.identification)
+            self._append_to_journal([x.identification])
+        self._notify_change(x.identification)
+
+    def update_identifiable(self, identifiable: model.Identifiable,
+                            expected_version: Optional[backends.Version] = None) -> backends.Version:
+        """
+        Replace the stored Identifiable with the same Identifier by the given one and re-index its semanticIDs
+
+        The Identifiable is written through to the backend atomically. A local replication of the stored Identifiable
+        is updated from the given one.
+
+        :param expected_version: If given, the Identifiable is only replaced, if the stored one has this version
+        :return: The new version of the Identifiable
+        :raises KeyError: If no Identifiable with the given Identifier exists in the object store
+        :raises ~aas_repository_server.backends.VersionConflictError: If the stored Identifiable does not have the
+            expected version
+        """
+        record: backends.IndexRecord = backends.get_index_record(identifiable)
+        with self._write_lock:
+            version: backends.Version = self.backend.replace(identifiable, record, expected_version)
+            with self._object_cache_lock:
+                cached: Optional[model.Identifiable] = self._object_cache.get(identifiable.identification)
+                if cached is not None:
+                    cached.update_from(identifiable)
+            with self._index_lock.write():
+                self._remove_index_record(identifiable.identification)
+                self._add_index_record(record)
+            self._append_to_journal([identifiable.identification])
+        self._notify_change(identifiable.identification)
+        return version
+
+    def __contains__(self, x: object) -> bool:
+        """
+        Check if an object with the given Identifier, or the same Identifier as the given object, is stored
+        """
+        if isinstance(x, model.Identifiable):
+            x = x.identification
+        if not isinstance(x, model.Identifier):
+            return False
+        return x in self.backend
+
+    def __len__(self) -> int:
+        return len(self.backend)
+
+    def __iter__(self) -> Iterator[model.Identifiable]:
+        for identifiable in self.backend.iter_identifiables():
+            yield self._get_cached(identifiable)
+
+    def sync(self) -> None:
+        """
+        Apply the changes, which other processes appended to the change journal since the last sync, to the index and
+        the local replications of the changed Identifiables
+
+        If some of the changes have already been removed from the journal, the whole index is rebuilt. The changes are
+        only marked as applied once they have been applied, so that they are applied again by the next sync if applying
+        them fails.
+        """
+        if self.change_journal is None or self.change_journal.get_last_sequence() == self._journal_sequence:
+            return
+        changed: List[Optional[model.Identifier]]
+        with self._write_lock:
+            changes: Optional[List[Tuple[int, model.Identifier]]] = \
+                self.change_journal.read_changes(self._journal_sequence)
+            if changes is None:
+                # Changes appended during the rebuild may be contained in it already, applying them again is harmless
+                last: int = self.change_journal.get_last_sequence()
+                self._load_semantic_index()
+                with self._object_cache_lock:
+                    cached: List[model.Identifier] = list(self._object_cache.keys())
+                self._reload(cached, update_index=False)
+                self._journal_sequence = last
+                changed = [None]
+            else:
+                changed = list(dict.fromkeys(identifier for _, identifier in changes))
+                self._reload(changed, update_index=True)
+                if changes:
+                    self._journal_sequence = changes[-1][0]
+        for identifier in changed:
+            self._notify_change(identifier)
+
+    def close(self) -> None:
+        self.backend.close()
+        if self.change_journal is not None:
+            self.change_journal.close()
+
+    def _get_cached(self, identifiable: model.Identifiable) -> model.Identifiable:
+        """
+        Get the local replication of the given, freshly deserialized Identifiable, updating it if it exists
+        """
+        with self._object_cache_lock:
+            cached: Optional[model.Identifiable] = self._object_cache.get(identifiable.identification)
+            if cached is None:
+                self._object_cache[identifiable.identification] = identifiable
+                return identifiable
+            cached.update_from(identifiable)
+            return cached
+
+    def _reload(self, identifiers: Iterable[model.Identifier], update_index: bool) -> None:
+        """
+        Update the local replications, and optionally the index, from the Identifiables with the given Identifiers,
+        that have been changed by another process
+
+        The write lock has to be held.
+        """
+        loaded: Dict[model.Identifier, Optional[model.Identifiable]] = {}
+        for identifier in identifiers:
+            try:
+                loaded[identifier] = self.backend.get(identifier)[0]
+            except KeyError:
+                loaded[identifier] = None
+        with self._object_cache_lock:
+            for identifier, identifiable in loaded.items():
+                if identifiable is None:
+                    self._object_cache.pop(identifier, None)
+                    continue
+                cached: Optional[model.Identifiable] = self._object_cache.get(identifier)
+                if cached is not None:
+                    cached.update_from(identifiable)
+        if update_index:
+            records: List[backends.IndexRecord] = [backends.get_index_record(identifiable)
+                                                   for identifiable in loaded.values() if identifiable is not None]
+            with self._index_lock.write():
+                for identifier in loaded:
+                    self._remove_index_record(identifier)
+                for record in records:
+                    self._add_index_record(record)
+
+    def _append_to_journal(self, identifiers: List[model.Identifier]) -> None:
+        """
+        Append the Identifiers changed by this store to the change journal
+
+        The write lock has to be held.
+        """
+        if self.change_journal is None or not identifiers:
+            return
+        previous, last = self.change_journal.append(identifiers)
+        # The own changes do not have to be applied again by `sync()`, unless there are changes of other processes
+        # before them, which have not been applied yet
+        if previous == self._journal_sequence:
+            self._journal_sequence = last
+
+    def _notify_change(self, identifier: Optional[model.Identifier]) -> None:
+        for listener in self.change_listeners:
+            listener(identifier)
+
     def get_semantic_id(self,
                         semantic_id: model.Key,
                         check_for_key_type: bool = False,
                         check_for_key_local: bool = False,
                         check_for_key_id_type: bool = False) -> Set[SemanticIndexElement]:
-        # Get suiting semantic_ids for the configured search
-        possible_semantic_ids: Set[model.Key] = set()
-        for possible_semantic_id in self.semantic_id_index.keys():
-            if possible_semantic_id.value != semantic_id.value:
+        """
+        Get all SemanticIndexElements whose semanticID matches the given Key
+
+        The `Key.value` always has to match. The remaining attributes of the Key are only compared, if the
+        respective `check_for_key_*` flag is set. If all of them are set, the Key itself is looked up in the
+        `semantic_id_index`, otherwise the candidates are taken from the `semantic_id_value_index`.
+
+        A Submodel that is referenced by multiple AASs results in one SemanticIndexElement per AAS.
+        """
+        return set(self.iter_semantic_id(semantic_id, check_for_key_type, check_for_key_local, check_for_key_id_type))
+
+    def get_semantic_id_page(self,
+                             semantic_id: model.Key,
+                             check_for_key_type: bool = False,
+                             check_for_key_local: bool = False,
+                             check_for_key_id_type: bool = False,
+                             limit: int = 100,
+                             after: Optional[Tuple] = None) -> List[SemanticIndexElement]:
+        """
+        Get at most `limit` SemanticIndexElements matching the given Key, ordered by
+        :meth:`~.SemanticIndexElement.get_sort_key`
+
+        :param after: Only return SemanticIndexElements with a sort key larger than this one. Pass the sort key of
+            the last element of the previous page to get the next page.
+        """
+        return get_page(
+            self.iter_semantic_id(semantic_id, check_for_key_type, check_for_key_local, check_for_key_id_type),
+            limit, after, SemanticIndexElement.get_sort_key
+        )
+
+    def iter_semantic_id(self,
+                         semantic_id: model.Key,
+                         check_for_key_type: bool = False,
+                         check_for_key_local: bool = False,
+                         check_for_key_id_type: bool = False) -> Iterator[SemanticIndexElement]:
+        """
+        Iterate over the SemanticIndexElements matching the given Key
+
+        The matching index entries are taken from the index at once, so that the iteration yields a consistent
+        snapshot of the index and does not block writers while the caller processes the SemanticIndexElements.
+        See :meth:`~.get_semantic_id` for the meaning of the parameters.
+
+        The SemanticIndexElements of the same parent Identifiable are yielded one after another, so that a caller
+        resolving their Referables only needs to keep one parent Identifiable at a time.
+        """
+        with self._index_lock.read():
+            entries: List[Tuple[SemanticIndexElement, Tuple[model.Identifier, ...]]] = self._get_semantic_id_entries(
+                SemanticIDQuery(semantic_id, check_for_key_type, check_for_key_local, check_for_key_id_type))
+        grouped_entries: Dict[model.Identifier, List[Tuple[SemanticIndexElement, Tuple[model.Identifier, ...]]]] = {}
+        for entry in entries:
+            grouped_entries.setdefault(entry[0].parent_identifiable, []).append(entry)
+        return self._expand_semantic_id_entries(
+            entry for group in grouped_entries.values() for entry in group)
+
+    def query_semantic_ids(self, queries: Sequence[SemanticIDQuery]) -> List[List[SemanticIndexElement]]:
+        """
+        Get the SemanticIndexElements matching each of the given queries
+
+        All queries are resolved while holding the read lock of the index once, so that the results of all of them
+        reflect the same consistent snapshot of the index. A query that occurs multiple times is only resolved once.
+
+        :return: The SemanticIndexElements of each query, in order of the queries
+        """
+        with self._index_lock.read():
+            entries: Dict[SemanticIDQuery, List[Tuple[SemanticIndexElement, Tuple[model.Identifier, ...]]]] = {}
+            for query in queries:
+                if query not in entries:
+                    entries[query] = self._get_semantic_id_entries(query)
+        return [list(self._expand_semantic_id_entries(entries[query])) for query in queries]
+
+    def _get_semantic_id_entries(self, query: SemanticIDQuery) \
+            -> List[Tuple[SemanticIndexElement, Tuple[model.Identifier, ...]]]:
+        """
+        Get the SemanticIndexElements matching the given query, together with the Identifiers of the AASs referencing
+        their parent Identifiable
+
+        The caller has to hold the read lock of the index.
+        """
+        matching_semantic_ids: List[model.Key] = self._get_matching_semantic_ids(*query)
+        entries: List[Tuple[SemanticIndexElement, Tuple[model.Identifier, ...]]] = []
+        for i, result_semantic_id in enumerate(matching_semantic_ids):
+            for element in self.semantic_id_index.get(result_semantic_id, ()):
+                # A Referable can carry multiple of the matching Keys, but must be returned only once
+                if any(element in self.semantic_id_index.get(other_semantic_id, ())
+                       for other_semantic_id in matching_semantic_ids[:i]):
+                    continue
+                entries.append((element, tuple(self.submodel_aas_index.get(element.parent_identifiable, ()))))
+        return entries
+
+    @staticmethod
+    def _expand_semantic_id_entries(entries: Iterable[Tuple[SemanticIndexElement, Tuple[model.Identifier, ...]]]) \
+            -> Iterator[SemanticIndexElement]:
+        """
+        Yield one SemanticIndexElement per AAS referencing the parent Identifiable of each entry
+        """
+        for element, aas_identifiers in entries:
+            if aas_identifiers:
+                for aas_identifier in aas_identifiers:
+                    yield element._replace(parent_asset_administration_shell=aas_identifier)
+            else:
+                yield element
+
+    def query_elements(self,
+                       semantic_id: model.Key,
+                       check_for_key_type: bool = False,
+                       check_for_key_local: bool = False,
+                       check_for_key_id_type: bool = False,
+                       model_type: Optional[str] = None,
+                       id_short_path: Optional[str] = None,
+                       value: Optional[Dict[str, backends.IndexValue]] = None) \
+            -> Iterator[Tuple[SemanticIndexElement, backends.ElementAttributes]]:
+        """
+        Iterate over the SemanticIndexElements matching the given Key, whose Referables match all of the given filters,
+        together with the attributes of the Referables
+
+        Like :meth:`~.iter_semantic_id`, the iteration yields a consistent snapshot of the index. See
+        :meth:`~.get_semantic_id` for the meaning of the `check_for_key_*` parameters.
+
+        :param model_type: The name of the class of the Referables, e.g. `Property`
+        :param id_short_path: A pattern the idShort paths of the Referables have to match, see
+            :func:`~.match_id_short_path`
+        :param value: Comparisons the values of the Properties have to fulfill, mapping an operator of
+            VALUE_OPERATORS to the value to compare to, e.g. `{"ge": 20, "lt": 30}`. Ranges are looked up in the
+            `property_value_index`, instead of comparing the values of all matching Referables.
+        """
+        value_range: Optional[Tuple[Tuple, Tuple]] = _get_value_range(value) if value else None
+        with self._index_lock.read():
+            entries: List[Tuple[SemanticIndexElement, backends.ElementAttributes, Tuple[model.Identifier, ...]]] = []
+            found: Set[SemanticIndexElement] = set()
+            for result_semantic_id in self._get_matching_semantic_ids(
+                    semantic_id, check_for_key_type, check_for_key_local, check_for_key_id_type):
+                elements: Iterable[SemanticIndexElement]
+                if value_range is not None:
+                    elements = self._iter_value_range(result_semantic_id, *value_range)
+                else:
+                    elements = self.semantic_id_index.get(result_semantic_id, ())
+                for element in elements:
+                    attributes: backends.ElementAttributes = self.element_attributes.get(
+                        element.parent_identifiable, {}).get(element.id_short_path, backends.ElementAttributes(""))
+                    if element in found \
+                            or (model_type is not None and attributes.model_type != model_type) \
+                            or (value and not _compare_value(attributes.value, value)):
+                        continue
+                    found.add(element)
+                    entries.append((element, attributes,
+                                    tuple(self.submodel_aas_index.get(element.parent_identifiable, ()))))
+        for element, attributes, aas_identifiers in entries:
+            # Matched after releasing the lock, so that a long pattern does not block writers
+            if id_short_path is not None and not match_id_short_path(id_short_path, element.id_short_path):
                 continue
-            if check_for_key_type and possible_semantic_id.key_type != semantic_id.key_type:
+            if aas_identifiers:
+                for aas_identifier in aas_identifiers:
+                    yield element._replace(parent_asset_administration_shell=aas_identifier), attributes
+            else:
+                yield element, attributes
+
+    def _iter_value_range(self, semantic_id: model.Key, lower: Tuple, upper: Tuple) -> Iterator[SemanticIndexElement]:
+        """
+        Iterate over the elements of the `property_value_index` of the given Key, whose value sort key is between the
+        given bounds (inclusive)
+        """
+        entries: List[_ValueIndexEntry] = self.property_value_index.get(semantic_id, [])
+        for i in range(bisect.bisect_left(entries, (lower,)), len(entries)):
+            if entries[i][0] > upper:
+                break
+            yield entries[i][2]
+
+    def _get_matching_semantic_ids(self,
+                                   semantic_id: model.Key,
+                                   check_for_key_type: bool,
+                                   check_for_key_local: bool,
+                                   check_for_key_id_type: bool) -> List[model.Key]:
+        """
+        Get the Keys of the `semantic_id_index` that match the given Key for the configured search
+        """
+        if check_for_key_type and check_for_key_local and check_for_key_id_type:
+            candidate_semantic_ids: Iterable[model.Key] = (semantic_id,)
+        else:
+            candidate_semantic_ids = self.semantic_id_value_index.get(semantic_id.value, ())
+        matching_semantic_ids: List[model.Key] = []
+        for possible_semantic_id in candidate_semantic_ids:
+            if check_for_key_type and possible_semantic_id.type != semantic_id.type:
                 continue
             if check_for_key_local and possible_semantic_id.local != semantic_id.local:
                 continue
             if check_for_key_id_type and possible_semantic_id.id_type != semantic_id.id_type:
                 continue
-            possible_semantic_ids.add(possible_semantic_id)
-        # Return the results
-        results: Set[SemanticIndexElement] = set()
-        for result_semantic_id in possible_semantic_ids:
-            if self.semantic_id_index.get(result_semantic_id) is not None:
-                results.update(self.semantic_id_index[result_semantic_id])
-        return results
+            matching_semantic_ids.append(possible_semantic_id)
+        return matching_semantic_ids
 
     def _add_semantic_id_to_index(
             self,
             semantic_id: model.Key,
-            referable: model.Referable,
             parent_identifiable: model.Identifier,
-            parent_aas: Optional[model.Identifier] = None
+            id_short_path: Tuple[str, ...] = (),
+            attributes: Optional[backends.ElementAttributes] = None,
+            sort_values: bool = True
     ):
         """
         Adds a semanticID's Key to the index
+
+        A Key that is added for the same Referable again, e.g. from an index record written before the records were
+        deduplicated, is ignored, since it is removed only once by :meth:`~._remove_index_record`.
+
+        :param sort_values: If False, the value is appended to the `property_value_index`, which then has to be sorted
+            by the caller
         """
-        if self.semantic_id_index.get(semantic_id) is None:
-            self.semantic_id_index[semantic_id] = {
-                SemanticIndexElement(
-                    referable,
-                    parent_identifiable,
-                    parent_aas
-                )
-            }
+        element: SemanticIndexElement = SemanticIndexElement(parent_identifiable, id_short_path)
+        contributions: Set[Tuple[model.Key, SemanticIndexElement]] = \
+            self._semantic_id_contributions.setdefault(parent_identifiable, set())
+        if (semantic_id, element) in contributions:
             return
-        else:
-            self.semantic_id_index[semantic_id].add(
-                SemanticIndexElement(
-                    referable,
-                    parent_identifiable,
-                    parent_aas
-                )
-            )
-
-    def _index_semantic_ids_in_submodel(
-            self,
-            submodel: model.Submodel,
-            submodel_identifier: model.Identifier,
-            aas_identifier: Optional[model.Identifier] = None
-    ):
-        if submodel.semantic_id is not None:
-            for key in submodel.semantic_id.key:
-                self._add_semantic_id_to_index(
-                    semantic_id=key,
-                    referable=submodel,
-                    parent_identifiable=submodel_identifier,
-                    parent_aas=aas_identifier
-                )
-        for submodel_element in traversal.walk_submodel(submodel):
-            if submodel_element.semantic_id:
-                for key in submodel_element.semantic_id.key:
-                    self._add_semantic_id_to_index(
-                        semantic_id=key,
-                        referable=submodel_element,
-                        parent_identifiable=submodel_identifier,
-                        parent_aas=aas_identifier
-                    )
-
-    def _add_identifiable_to_semantic_id_index(self, identifiable: model.Identifiable):
-        # The following types of Identifiable exist:
-        #  - Asset
-        #  - AssetAdministrationShell
-        #  - Submodel
-        #  - ConceptDescription
-        # For simplicity, I omit ConceptDescriptions and Assets
-        if isinstance(identifiable, model.AssetAdministrationShell):
-            aas_identifier: model.Identifier = identifiable.identification
-            for submodel_reference in identifiable.submodel:
-                submodel: model.Submodel = submodel_reference.resolve(self)
-                submodel_identifier: model.Identifier = submodel.identification
-                self._index_semantic_ids_in_submodel(
-                    submodel=submodel,
-                    submodel_identifier=submodel_identifier,
-                    aas_identifier=aas_identifier
-                )
-        elif isinstance(identifiable, model.Submodel):
-            submodel: model.Submodel = identifiable
-            submodel_identifier: model.Identifier = identifiable.identification
-            self._index_semantic_ids_in_submodel(
-                submodel=submodel,
-                submodel_identifier=submodel_identifier,
-                aas_identifier=None
-            )
-        else:
-            pass
+        contributions.add((semantic_id, element))
+        self.semantic_id_value_index.setdefault(semantic_id.value, set()).add(semantic_id)
+        self.semantic_id_index.setdefault(semantic_id, set()).add(element)
+        if attributes is not None and attributes.value is not None:
+            entry: _ValueIndexEntry = (_get_value_sort_key(attributes.value), element.get_sort_key(), element)
+            entries: List[_ValueIndexEntry] = self.property_value_index.setdefault(semantic_id, [])
+            if sort_values:
+                bisect.insort(entries, entry)
+            else:
+                entries.append(entry)
+
+    def _add_index_record(self, record: backends.IndexRecord, sort_values: bool = True):
+        """
+        Adds the semanticIDs of a Submodel or the Submodel references of an AAS to the index
+        """
+        for key, id_short_path in record.semantic_ids:
+            self._add_semantic_id_to_index(key, record.identifier, id_short_path,
+                                           record.attributes.get(id_short_path), sort_values)
+        if record.attributes:
+            self.element_attributes[record.identifier] = record.attributes
+        if record.submodels:
+            self._aas_submodels[record.identifier] = record.submodels
+            for submodel_identifier in record.submodels:
+                self.submodel_aas_index.setdefault(submodel_identifier, set()).add(record.identifier)
+
+    def _remove_index_record(self, identifier: model.Identifier):
+        """
+        Removes everything the Identifiable with the given Identifier contributed to the index
+        """
+        element_attributes: Dict[Tuple[str, ...], backends.ElementAttributes] = \
+            self.element_attributes.pop(identifier, {})
+        for semantic_id, element in self._semantic_id_contributions.pop(identifier, ()):
+            elements: Set[SemanticIndexElement] = self.semantic_id_index[semantic_id]
+            elements.discard(element)
+            if not elements:
+                del self.semantic_id_index[semantic_id]
+                keys: Set[model.Key] = self.semantic_id_value_index[semantic_id.value]
+                keys.discard(semantic_id)
+                if not keys:
+                    del self.semantic_id_value_index[semantic_id.value]
+            attributes: Optional[backends.ElementAttributes] = element_attributes.get(element.id_short_path)
+            if attributes is not None and attributes.value is not None:
+                entries: List[_ValueIndexEntry] = self.property_value_index[semantic_id]
+                del entries[bisect.bisect_left(
+                    entries, (_get_value_sort_key(attributes.value), element.get_sort_key(), element))]
+                if not entries:
+                    del self.property_value_index[semantic_id]
+        for submodel_identifier in self._aas_submodels.pop(identifier, ()):
+            # Records stored before the Identifiers were deduplicated may list a Submodel more than once
+            aas_identifiers: Optional[Set[model.Identifier]] = self.submodel_aas_index.get(submodel_identifier)
+            if aas_identifiers is None:
+                continue
+            aas_identifiers.discard(identifier)
+            if not aas_identifiers:
+                del self.submodel_aas_index[submodel_identifier]
 
     def _index_semantic_ids(self):
         """
-        Iterate over all objects in the object store and build the `self.semantic_id_index`
+        Build the `self.semantic_id_index` from the index records of all objects in the backend
+
+        The records are loaded before locking the index, so queries are only blocked while the index is filled. Writes
+        wait for the rebuild, so that none of their changes are lost.
+        """
+        with self._write_lock:
+            self._load_semantic_index()
+
+    def _load_semantic_index(self):
+        """
+        Replace the index by one built from the index records of the backend
+
+        The write lock has to be held.
         """
-        self.semantic_id_index = {}
-        for identifiable in self:
-            self._add_identifiable_to_semantic_id_index(identifiable)
+        records: List[backends.IndexRecord] = list(self.backend.load_index_records())
+        with self._index_lock.write():
+            self.semantic_id_index = {}
+            self.semantic_id_value_index = {}
+            self.submodel_aas_index = {}
+            self.element_attributes = {}
+            self.property_value_index = {}
+            self._semantic_id_contributions = {}
+            self._aas_submodels = {}
+            for record in records:
+                self._add_index_record(record, sort_values=False)
+            # Sorting once is faster than inserting each value at its position
+            for entries in self.property_value_index.values():
+                entries.sort()
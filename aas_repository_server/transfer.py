@@ -0,0 +1,166 @@
+"""
+Export and import the Identifiables of a :class:`~aas_repository_server.storage.RepositoryObjectStore` as newline
+delimited JSON (NDJSON), i.e. one JSON serialized Identifiable per line
+
+Both directions are generator pipelines, which hold at most one batch of Identifiables in memory, so they can be used
+for backups and migrations of large repositories. They are available via the `/export` and `/import` routes, and on
+the command line, using the storage configured in the `config.ini`:
+
+.. code-block::
+
+    python -m aas_repository_server.transfer export backup.ndjson
+    python -m aas_repository_server.transfer import --rebuild-index backup.ndjson
+
+Use `-` as file name to write to stdout or read from stdin. The server should not be running while importing on the
+command line, as it would not notice the imported Identifiables, unless the `JOURNAL_FILE` is configured.
+"""
+import argparse
+import json
+import sys
+from typing import Iterable, Iterator, List, NamedTuple, Optional, Tuple, TypeVar, Union
+
+from basyx.aas import model
+from basyx.aas.adapter.json import json_deserialization
+from aas_repository_server import storage
+
+_T = TypeVar("_T")
+
+
+class ImportResult(NamedTuple):
+    """
+    Summary of an NDJSON import
+
+    :ivar added: The number of added Identifiables
+    :ivar errors: Tuples of the (1-based) line number and the error message of each line that was not imported
+    """
+    added: int
+    errors: List[Tuple[int, str]]
+
+
+def iter_batches(iterable: Iterable[_T], batch_size: int) -> Iterator[List[_T]]:
+    """
+    Split the given iterable into lists of at most `batch_size` items
+    """
+    batch: List[_T] = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def parse_ndjson(lines: Iterable[Union[bytes, str]], decoder: Optional[type] = None) \
+        -> Iterator[Union[object, ValueError]]:
+    """
+    Parse each non-empty line as a JSON document
+
+    If a line cannot be parsed, the ValueError is yielded in place of the document, so that the position of the
+    remaining documents is kept.
+
+    :param decoder: The JSONDecoder class used to parse the documents
+    """
+    for line in lines:
+        if line.strip():
+            yield _parse_ndjson_line(line, decoder)
+
+
+def _parse_ndjson_line(line: Union[bytes, str], decoder: Optional[type]) -> Union[object, ValueError]:
+    try:
+        return json.loads(line, cls=decoder)
+    except ValueError as e:
+        return e
+
+
+def export_ndjson(object_store: storage.RepositoryObjectStore) -> Iterator[bytes]:
+    """
+    Serialize all Identifiables of the object store, one line each
+
+    The stored JSON is copied without deserializing the Identifiables.
+    """
+    for data in object_store.backend.iter_serialized():
+        yield data + b"\n"
+
+
+def import_ndjson(object_store: storage.RepositoryObjectStore,
+                  lines: Iterable[Union[bytes, str]],
+                  batch_size: int = 1000,
+                  rebuild_index: bool = False) -> ImportResult:
+    """
+    Add the Identifiables of the given NDJSON lines to the object store, `batch_size` Identifiables at a time
+
+    Lines that cannot be parsed, do not contain an Identifiable, or contain an Identifiable that exists already, are
+    skipped and reported in the result.
+
+    :param rebuild_index: Do not update the semantic index for each batch, but rebuild it once at the end, using the
+        `index_processes` of the object store. Until then, the semantic index does not contain the imported
+        Identifiables.
+    """
+    added: int = 0
+    errors: List[Tuple[int, str]] = []
+    documents: Iterator[Tuple[int, Union[object, ValueError]]] = (
+        (line_number, _parse_ndjson_line(line, json_deserialization.AASFromJsonDecoder))
+        for line_number, line in enumerate(lines, start=1) if line.strip()
+    )
+    for batch in iter_batches(documents, batch_size):
+        identifiables: List[Tuple[int, model.Identifiable]] = []
+        for line_number, document in batch:
+            if isinstance(document, ValueError):
+                errors.append((line_number, "Could not parse line, not valid JSON"))
+            elif not isinstance(document, model.Identifiable):
+                errors.append((line_number, "Not a valid Identifiable"))
+            else:
+                identifiables.append((line_number, document))
+        results: List[Optional[KeyError]] = object_store.add_batch(
+            (identifiable for _, identifiable in identifiables), update_index=not rebuild_index)
+        for (line_number, identifiable), error in zip(identifiables, results):
+            if error is None:
+                added += 1
+            else:
+                errors.append((line_number, "Identifiable {} already exists".format(identifiable.identification)))
+    if rebuild_index:
+        object_store.rebuild_semantic_index()
+    return ImportResult(added, errors)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m aas_repository_server.transfer",
+        description="Export or import the Identifiables of the configured repository as newline delimited JSON"
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    export_parser = subparsers.add_parser("export", help="Write all Identifiables to a file")
+    export_parser.add_argument("file", help="The NDJSON file to write, or - for stdout")
+    import_parser = subparsers.add_parser("import", help="Add the Identifiables of a file")
+    import_parser.add_argument("file", help="The NDJSON file to read, or - for stdin")
+    import_parser.add_argument("--batch-size", type=int, default=1000,
+                               help="Number of Identifiables that are stored together")
+    import_parser.add_argument("--rebuild-index", action="store_true",
+                               help="Rebuild the semantic index once after the import, instead of updating it")
+    args = parser.parse_args(argv)
+    # The object store is created from the configuration of the server
+    from aas_repository_server import routes
+
+    if args.command == "export":
+        output = sys.stdout.buffer if args.file == "-" else open(args.file, "wb")
+        try:
+            output.writelines(export_ndjson(routes.OBJECT_STORE))
+        finally:
+            if output is not sys.stdout.buffer:
+                output.close()
+        return 0
+    input_ = sys.stdin.buffer if args.file == "-" else open(args.file, "rb")
+    try:
+        result: ImportResult = import_ndjson(routes.OBJECT_STORE, input_, args.batch_size, args.rebuild_index)
+    finally:
+        if input_ is not sys.stdin.buffer:
+            input_.close()
+    for line_number, message in result.errors:
+        print("Line {}: {}".format(line_number, message), file=sys.stderr)
+    print("Imported {} Identifiables, skipped {} lines".format(result.added, len(result.errors)), file=sys.stderr)
+    return 1 if result.errors else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,193 @@
+"""
+Stores of the users of the server and their password hashes
+
+A user store is a mutable mapping of usernames to password hashes. The store is selected with the `USER_STORE` option
+in the `[AUTHENTICATION]` section of the config:
+
+    - `file`: :class:`~.FileUserStore`, a text file with one `username, password hash` line per user
+    - `sqlite`: :class:`~.SQLiteUserStore`, a SQLite database, which is shared safely by multiple processes
+"""
+import abc
+import os
+import sqlite3
+import tempfile
+import threading
+from typing import Dict, Iterable, Iterator, MutableMapping, Optional, Tuple
+
+from aas_repository_server import connections
+
+
+class UserStore(MutableMapping[str, str], metaclass=abc.ABCMeta):
+    """
+    Abstract base class of the user stores, mapping each username to its password hash
+    """
+    def add_all(self, users: Iterable[Tuple[str, str]]) -> None:
+        """
+        Add or replace multiple users at once
+
+        :param users: Tuples of username and password hash
+        """
+        for username, password_hash in users:
+            self[username] = password_hash
+
+    def save(self) -> None:
+        """
+        Persist the changes made to the store, if they are not persisted immediately
+        """
+
+    def close(self) -> None:
+        pass
+
+
+class FileUserStore(UserStore):
+    """
+    Keeps the users of a text file with one `username, password hash` line per user in memory
+
+    Changes are only written to the file by :meth:`~.save`, which replaces the whole file. If the file has been changed
+    by another process, it is read again on the next access, discarding unsaved changes. Use the
+    :class:`~.SQLiteUserStore` for many users, or users changed by multiple processes.
+    """
+    def __init__(self, file_path: str):
+        self.file_path: str = file_path
+        self._lock = threading.RLock()
+        self._users: Dict[str, str] = {}
+        self._file_stat: Optional[Tuple[int, int]] = None
+        self._reload_if_changed()
+
+    def __getitem__(self, username: str) -> str:
+        with self._lock:
+            self._reload_if_changed()
+            return self._users[username]
+
+    def __setitem__(self, username: str, password_hash: str) -> None:
+        with self._lock:
+            self._reload_if_changed()
+            self._users[username] = password_hash
+
+    def __delitem__(self, username: str) -> None:
+        with self._lock:
+            self._reload_if_changed()
+            del self._users[username]
+
+    def __iter__(self) -> Iterator[str]:
+        with self._lock:
+            self._reload_if_changed()
+            return iter(list(self._users))
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._reload_if_changed()
+            return len(self._users)
+
+    def save(self) -> None:
+        with self._lock:
+            # Replace the file atomically, so that other processes never read a partially written file
+            fd, temp_path = tempfile.mkstemp(prefix=".", suffix=".tmp", dir=os.path.dirname(self.file_path))
+            try:
+                with os.fdopen(fd, "w") as file:
+                    for usr, psw in self._users.items():
+                        file.write(usr + ", " + psw + "\n")
+                os.replace(temp_path, self.file_path)
+            except BaseException:
+                os.remove(temp_path)
+                raise
+            self._file_stat = self._get_file_stat()
+
+    def _reload_if_changed(self) -> None:
+        with self._lock:
+            file_stat: Optional[Tuple[int, int]] = self._get_file_stat()
+            if file_stat == self._file_stat:
+                return
+            self._users = load_user_file(self.file_path) if file_stat is not None else {}
+            self._file_stat = file_stat
+
+    def _get_file_stat(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat: os.stat_result = os.stat(self.file_path)
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+
+class SQLiteUserStore(UserStore):
+    """
+    Stores the users in a SQLite database in WAL mode, indexed by username
+
+    Each change is written immediately as a single row, and each lookup reads the database, so that changes made by
+    other processes are visible at once.
+    """
+    def __init__(self, file_path: str):
+        self.file_path: str = file_path
+        self._lock = threading.Lock()
+        self._database: connections.ProcessLocalConnection = connections.ProcessLocalConnection(
+            file_path, ("journal_mode=WAL",), isolation_level=None)
+        with self._lock:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS users (username TEXT PRIMARY KEY, password_hash TEXT NOT NULL) "
+                "WITHOUT ROWID"
+            )
+
+    def __getitem__(self, username: str) -> str:
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT password_hash FROM users WHERE username = ?", (username,)).fetchone()
+        if row is None:
+            raise KeyError(username)
+        return row[0]
+
+    def __setitem__(self, username: str, password_hash: str) -> None:
+        with self._lock:
+            self._connection.execute("INSERT OR REPLACE INTO users VALUES (?, ?)", (username, password_hash))
+
+    def __delitem__(self, username: str) -> None:
+        with self._lock:
+            if self._connection.execute("DELETE FROM users WHERE username = ?", (username,)).rowcount == 0:
+                raise KeyError(username)
+
+    def __iter__(self) -> Iterator[str]:
+        with self._lock:
+            usernames = [row[0] for row in self._connection.execute("SELECT username FROM users ORDER BY username")]
+        return iter(usernames)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM users").fetchone()[0]
+
+    def add_all(self, users: Iterable[Tuple[str, str]]) -> None:
+        """
+        Add or replace multiple users in a single transaction
+
+        :param users: Tuples of username and password hash
+        """
+        with self._lock:
+            self._connection.execute("BEGIN IMMEDIATE")
+            try:
+                self._connection.executemany("INSERT OR REPLACE INTO users VALUES (?, ?)", users)
+            except BaseException:
+                self._connection.execute("ROLLBACK")
+                raise
+            self._connection.execute("COMMIT")
+
+    def close(self) -> None:
+        with self._lock:
+            self._database.close()
+
+    @property
+    def _connection(self) -> sqlite3.Connection:
+        return self._database.get()
+
+
+def load_user_file(file_path: str) -> Dict[str, str]:
+    """
+    Read the users of a file with one `username, password hash` line per user
+    """
+    users: Dict[str, str] = {}
+    with open(file_path, "r") as file:
+        data = file.read().rstrip("\n").split("\n")
+        for i in data:
+            try:
+                usr, psw = i.split(", ")
+                users[usr] = psw
+            except ValueError:
+                pass
+    return users
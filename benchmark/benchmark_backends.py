@@ -0,0 +1,64 @@
+"""
+Benchmark comparing the storage backends of the `RepositoryObjectStore`
+
+Creates a synthetic store of Submodels in each backend and measures the time it takes to add them in batches, to get
+each of them by its Identifier, to export all of them and to load the semantic index when the store is opened again.
+The `local_file` backend uses a semantic index snapshot, as configured by default.
+
+Run with `python -m benchmark.benchmark_backends [number of submodels]`
+"""
+import os
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List
+
+from aas_repository_server import backends, storage
+from benchmark.benchmark_index_build import make_submodel
+
+
+NUMBER_OF_SUBMODELS = 5_000
+BATCH_SIZE = 1_000
+
+
+def main():
+    number_of_submodels: int = int(sys.argv[1]) if len(sys.argv) > 1 else NUMBER_OF_SUBMODELS
+    submodels = [make_submodel(i) for i in range(number_of_submodels)]
+    with tempfile.TemporaryDirectory() as temp_dir:
+        os.makedirs(os.path.join(temp_dir, "aas_store"))
+        create_backend: Dict[str, Callable[[], backends.StorageBackend]] = {
+            "local_file": lambda: backends.LocalFileBackend(
+                os.path.join(temp_dir, "aas_store"), os.path.join(temp_dir, "semantic_index.sqlite3")),
+            "sqlite": lambda: backends.SQLiteBackend(os.path.join(temp_dir, "aas_store.sqlite3")),
+        }
+        print("{} Submodels, batches of {}".format(number_of_submodels, BATCH_SIZE))
+        print("{:>12} {:>10} {:>10} {:>10} {:>10}".format("backend", "add [s]", "get [s]", "export [s]", "open [s]"))
+        for name, create in create_backend.items():
+            timings: List[float] = []
+            object_store = storage.RepositoryObjectStore(create())
+
+            start = time.perf_counter()
+            for i in range(0, number_of_submodels, BATCH_SIZE):
+                object_store.add_batch(submodels[i:i + BATCH_SIZE])
+            timings.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            for submodel in submodels:
+                object_store.backend.get(submodel.identification)
+            timings.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            for _ in object_store.backend.iter_serialized():
+                pass
+            timings.append(time.perf_counter() - start)
+            object_store.close()
+
+            start = time.perf_counter()
+            object_store = storage.RepositoryObjectStore(create())
+            timings.append(time.perf_counter() - start)
+            object_store.close()
+            print("{:>12} {:>10.2f} {:>10.2f} {:>10.2f} {:>10.2f}".format(name, *timings))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""
+Benchmark for building the semantic index of a `RepositoryObjectStore`
+
+Creates a synthetic store of Submodels with nested SubmodelElementCollections and compares the time it takes to build
+the semantic index serially and with process pools of different sizes. No semantic index snapshot is used, so that
+every file is deserialized in each run.
+
+Run with `python -m benchmark.benchmark_index_build [number of submodels]`
+"""
+import os
+import sys
+import tempfile
+import time
+
+from basyx.aas import model
+from aas_repository_server import backends, storage
+
+
+NUMBER_OF_SUBMODELS = 2_000
+COLLECTIONS_PER_SUBMODEL = 5
+PROPERTIES_PER_COLLECTION = 10
+
+
+def make_submodel(i: int) -> model.Submodel:
+    def semantic_id(j: int) -> model.Reference:
+        return model.Reference((model.Key(
+            type_=model.KeyElements.GLOBAL_REFERENCE,
+            local=False,
+            value="https://example.com/semanticIDs/{}".format(j),
+            id_type=model.KeyType.IRI
+        ),))
+    return model.Submodel(
+        identification=model.Identifier("https://example.com/sm/{}".format(i), model.IdentifierType.IRI),
+        semantic_id=semantic_id(i),
+        submodel_element=[
+            model.SubmodelElementCollectionUnordered(
+                id_short="Collection{}".format(c),
+                semantic_id=semantic_id(c),
+                value=[
+                    model.Property(
+                        id_short="Property{}".format(p),
+                        value_type=model.datatypes.String,
+                        value="Value{}".format(p),
+                        semantic_id=semantic_id(c * PROPERTIES_PER_COLLECTION + p)
+                    )
+                    for p in range(PROPERTIES_PER_COLLECTION)
+                ]
+            )
+            for c in range(COLLECTIONS_PER_SUBMODEL)
+        ]
+    )
+
+
+def main():
+    number_of_submodels: int = int(sys.argv[1]) if len(sys.argv) > 1 else NUMBER_OF_SUBMODELS
+    with tempfile.TemporaryDirectory() as storage_dir:
+        backend = backends.LocalFileBackend(storage_dir)
+        object_store = storage.RepositoryObjectStore(backend)
+        for i in range(number_of_submodels):
+            object_store.add(make_submodel(i))
+        print("{} Submodels, {} CPUs".format(number_of_submodels, os.cpu_count()))
+        print("{:>10} {:>12}".format("processes", "build [s]"))
+        for processes in sorted({1, 2, 4, 8, os.cpu_count() or 1}):
+            backend.index_processes = processes
+            start = time.perf_counter()
+            object_store.rebuild_semantic_index()
+            print("{:>10} {:>12.2f}".format(processes, time.perf_counter() - start))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+"""
+Benchmark for `RepositoryObjectStore.get_semantic_id`
+
+Fills the semantic index of an empty RepositoryObjectStore with an increasing number of distinct semanticIDs and
+measures the mean query latency for every combination of the `check_for_key_*` flags. The latency should stay flat,
+independent of the number of semanticIDs in the index.
+
+Run with `python -m benchmark.benchmark_semantic_index`
+"""
+import itertools
+import tempfile
+import timeit
+
+from basyx.aas import model
+from aas_repository_server import backends, storage
+
+
+NUMBERS_OF_KEYS = (1_000, 10_000, 100_000, 300_000)
+QUERIES = 1_000
+
+
+def make_key(i: int) -> model.Key:
+    return model.Key(
+        type_=model.KeyElements.GLOBAL_REFERENCE,
+        local=False,
+        value="https://example.com/semanticIDs/{}".format(i),
+        id_type=model.KeyType.IRI
+    )
+
+
+def main():
+    with tempfile.TemporaryDirectory() as storage_dir:
+        object_store = storage.RepositoryObjectStore(backends.LocalFileBackend(storage_dir))
+        submodel_identifier = model.Identifier("https://example.com/sm/benchmark", model.IdentifierType.IRI)
+        number_of_keys = 0
+        print("{:>10} {:>30} {:>16}".format("keys", "flags (type, local, id_type)", "latency [us]"))
+        for target in NUMBERS_OF_KEYS:
+            for i in range(number_of_keys, target):
+                object_store._add_semantic_id_to_index(make_key(i), submodel_identifier)
+            number_of_keys = target
+            query_key = make_key(target // 2)
+            for flags in itertools.product((False, True), repeat=3):
+                seconds = timeit.timeit(
+                    lambda: object_store.get_semantic_id(query_key, *flags),
+                    number=QUERIES
+                )
+                print("{:>10} {:>30} {:>16.2f}".format(target, str(flags), seconds / QUERIES * 1e6))
+
+
+if __name__ == '__main__':
+    main()
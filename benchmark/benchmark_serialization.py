@@ -0,0 +1,61 @@
+"""
+Benchmark for serializing large Submodels, as done by `/get_identifiable`
+
+Compares the size of the JSON and the time needed to produce it for the previous `json.dumps(..., indent=4)`, compact
+JSON produced by the standard library and compact JSON produced by `aas_repository_server.serialization.dumps`, which
+uses `orjson` or `ujson` if installed.
+
+Run with `python -m benchmark.benchmark_serialization`
+"""
+import json
+import timeit
+import unittest.mock
+
+from basyx.aas import model
+from basyx.aas.adapter.json import json_serialization
+from aas_repository_server import serialization
+
+
+NUMBERS_OF_PROPERTIES = (1_000, 10_000, 50_000)
+REPETITIONS = 3
+
+
+def make_submodel(number_of_properties: int) -> model.Submodel:
+    return model.Submodel(
+        identification=model.Identifier("https://example.com/sm/benchmark", model.IdentifierType.IRI),
+        submodel_element=[
+            model.Property(
+                id_short="Property{}".format(i),
+                value_type=model.datatypes.Double,
+                value=i / 3,
+                semantic_id=model.Reference((model.Key(
+                    type_=model.KeyElements.GLOBAL_REFERENCE,
+                    local=False,
+                    value="https://example.com/semanticIDs/{}".format(i % 100),
+                    id_type=model.KeyType.IRI
+                ),))
+            )
+            for i in range(number_of_properties)
+        ]
+    )
+
+
+def main():
+    print("{:>10} {:>24} {:>12} {:>10}".format("properties", "method", "size [kB]", "time [ms]"))
+    for number_of_properties in NUMBERS_OF_PROPERTIES:
+        submodel = make_submodel(number_of_properties)
+        methods = {
+            "json, indent=4": lambda: json.dumps(submodel, cls=json_serialization.AASToJsonEncoder, indent=4),
+            "json, compact": lambda: serialization.dumps(submodel),
+            "{}, compact".format(serialization.JSON_LIBRARY): lambda: serialization.dumps(submodel),
+        }
+        for name, method in methods.items():
+            json_library = "json" if name.startswith("json,") else serialization.JSON_LIBRARY
+            with unittest.mock.patch.object(serialization, "JSON_LIBRARY", json_library):
+                size = len(method())
+                seconds = timeit.timeit(method, number=REPETITIONS) / REPETITIONS
+            print("{:>10} {:>24} {:>12.0f} {:>10.1f}".format(number_of_properties, name, size / 1000, seconds * 1000))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,41 @@
+"""
+Benchmark of the overhead of the `auth.token_required` decorator
+
+Calls a decorated no-op view function in a request context with a valid token, once with the TOKEN_CACHE, and once
+with the token being decoded on every call, as before the cache was added.
+
+Run with `python -m benchmark.benchmark_token_required [number of calls]`
+"""
+import sys
+import time
+
+import flask
+import jwt
+
+from aas_repository_server import auth
+
+
+NUMBER_OF_CALLS = 100_000
+
+
+def main():
+    number_of_calls: int = int(sys.argv[1]) if len(sys.argv) > 1 else NUMBER_OF_CALLS
+    app = flask.Flask(__name__)
+    view = auth.token_required(lambda current_user: current_user)
+    auth.add_user("benchmark", "benchmark")
+    token: str = jwt.encode({"name": "benchmark", "exp": int(time.time()) + 3600}, auth.SECRET_KEY, algorithm="HS256")
+    print("{} calls".format(number_of_calls))
+    print("{:>12} {:>10} {:>14}".format("cache size", "total [s]", "per call [us]"))
+    for cache_size in (0, auth.TOKEN_CACHE_SIZE):
+        auth.TOKEN_CACHE = auth.TokenCache(cache_size)
+        with app.test_request_context(headers={"x-access-tokens": token}):
+            start = time.perf_counter()
+            for _ in range(number_of_calls):
+                view()
+            duration: float = time.perf_counter() - start
+        print("{:>12} {:>10.2f} {:>14.2f}".format(cache_size, duration, duration / number_of_calls * 1e6))
+    auth.remove_user("benchmark")
+
+
+if __name__ == '__main__':
+    main()
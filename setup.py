@@ -21,5 +21,5 @@ setuptools.setup(
     long_description=long_description,
     long_description_content_type="text/markdown",
     url="",
-    packages=setuptools.find_packages(exclude=["test", "test.*"])
+    packages=setuptools.find_packages(exclude=["test", "test.*", "benchmark", "benchmark.*"])
 )
@@ -1,7 +1,17 @@
+import os
+import subprocess
+import sys
+import tempfile
+import time
 import unittest
+import unittest.mock
+from typing import Callable, Dict
 
+import flask
+import jwt
+import werkzeug.security
 
-from aas_repository_server import auth
+from aas_repository_server import auth, user_stores
 
 
 class UserTest(unittest.TestCase):
@@ -27,3 +37,164 @@ class UserTest(unittest.TestCase):
         self.assertEqual(True, auth.check_if_user_exists("test"))
         self.assertEqual(False, auth.check_if_user_exists("anotherTest"))
         auth.remove_user("test")
+
+
+class TokenRequiredTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.app = flask.Flask(__name__)
+        self.protected = auth.token_required(lambda current_user: current_user)
+        auth.add_user("test", "test")
+        auth.TOKEN_CACHE.clear()
+
+    def tearDown(self) -> None:
+        auth.USERS.pop("test", None)
+        auth.TOKEN_CACHE.clear()
+
+    def _encode(self, expiration_time: float, name: str = "test") -> str:
+        return jwt.encode({"name": name, "exp": int(expiration_time)}, auth.SECRET_KEY, algorithm="HS256")
+
+    def _request(self, token: str):
+        with self.app.test_request_context(headers={"x-access-tokens": token}):
+            return self.protected()
+
+    def test_cached_token(self):
+        token: str = self._encode(time.time() + 60)
+        with unittest.mock.patch.object(auth.jwt, "decode", wraps=jwt.decode) as decode:
+            self.assertEqual("test", self._request(token))
+            self.assertEqual("test", self._request(token))
+            decode.assert_called_once()
+        self.assertEqual(1, len(auth.TOKEN_CACHE))
+        # The cached token of a removed user is rejected
+        auth.remove_user("test")
+        self.assertEqual(401, self._request(token).status_code)
+
+    def test_expired_token(self):
+        token: str = self._encode(time.time() + 60)
+        self.assertEqual("test", self._request(token))
+        with unittest.mock.patch.object(auth.time, "time", return_value=time.time() + 60):
+            self.assertEqual(401, self._request(token).status_code)
+        self.assertEqual(401, self._request(self._encode(time.time() - 1)).status_code)
+        self.assertEqual(401, self._request("invalid").status_code)
+        self.assertEqual(1, len(auth.TOKEN_CACHE))
+
+    def test_cache_size(self):
+        cache = auth.TokenCache(2)
+        for token in ("a", "b", "c"):
+            cache.put(token, "test", 0)
+        self.assertEqual(2, len(cache))
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(("test", 0), cache.get("c"))
+
+
+class SecretKeyTest(unittest.TestCase):
+    def test_load_secret_key(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            file_path: str = os.path.join(temp_dir, "secret_key")
+            key: str = auth.load_secret_key(file_path)
+            self.assertEqual(128, len(key))
+            self.assertEqual(0o600, os.stat(file_path).st_mode & 0o777)
+            self.assertEqual(key, auth.load_secret_key(file_path))
+            self.assertEqual(["secret_key"], os.listdir(temp_dir))
+
+    def test_token_of_other_process(self):
+        # Another server process reads the same key and issues tokens, which are accepted by this one
+        token: str = subprocess.run(
+            [sys.executable, "-c", "from aas_repository_server import auth; print(auth.create_token('test'))"],
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+            check=True, capture_output=True, text=True
+        ).stdout.strip()
+        auth.add_user("test", "test")
+        try:
+            with flask.Flask(__name__).test_request_context(headers={"x-access-tokens": token}):
+                self.assertEqual("test", auth.token_required(lambda current_user: current_user)())
+        finally:
+            auth.USERS.pop("test", None)
+
+
+class UserStoreTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
+
+    def test_user_stores(self):
+        file_path: str = os.path.join(self.temp_dir.name, "users.dat")
+        sqlite_path: str = os.path.join(self.temp_dir.name, "users.sqlite3")
+        create_store: Dict[str, Callable[[], user_stores.UserStore]] = {
+            "file": lambda: user_stores.FileUserStore(file_path),
+            "sqlite": lambda: user_stores.SQLiteUserStore(sqlite_path),
+        }
+        for name, create in create_store.items():
+            with self.subTest(name):
+                store: user_stores.UserStore = create()
+                store["a"] = "hash_a"
+                store.add_all(("user{}".format(i), "hash{}".format(i)) for i in range(100))
+                store["a"] = "new_hash_a"
+                self.assertEqual(101, len(store))
+                self.assertEqual("new_hash_a", store.get("a"))
+                self.assertIsNone(store.get("b"))
+                del store["user0"]
+                with self.assertRaises(KeyError):
+                    del store["user0"]
+                store.save()
+                # Changes made by another process are read
+                other: user_stores.UserStore = create()
+                self.assertEqual(set(store), set(other))
+                other["b"] = "hash_b"
+                other.save()
+                self.assertEqual("hash_b", store.get("b"))
+                other.close()
+                store.close()
+
+    def test_file_format(self):
+        file_path: str = os.path.join(self.temp_dir.name, "users.dat")
+        with open(file_path, "w") as file:
+            file.write("a, hash_a\nb, hash_b\n")
+        store = user_stores.FileUserStore(file_path)
+        self.assertEqual({"a": "hash_a", "b": "hash_b"}, dict(store))
+        store.pop("a")
+        store.save()
+        with open(file_path) as file:
+            self.assertEqual("b, hash_b\n", file.read())
+        self.assertEqual([], [name for name in os.listdir(self.temp_dir.name) if name.endswith(".tmp")])
+
+    def test_add_users(self):
+        with unittest.mock.patch.object(auth, "USERS", user_stores.SQLiteUserStore(":memory:")):
+            auth.add_users(("user{}".format(i), "password") for i in range(10))
+            self.assertTrue(auth.check_if_user_exists("user9"))
+            self.assertNotEqual("password", auth.get_password_hash("user9"))
+            auth.remove_user("user9")
+            self.assertFalse(auth.check_if_user_exists("user9"))
+
+
+class PasswordHashTest(unittest.TestCase):
+    def setUp(self) -> None:
+        # The rehashed password is saved, so do not use the users.dat
+        patcher = unittest.mock.patch.object(auth, "USERS", user_stores.SQLiteUserStore(":memory:"))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_rehash_on_login(self):
+        auth.USERS["test"] = werkzeug.security.generate_password_hash("test", method="sha1", salt_length=8)
+        self.assertTrue(auth.needs_rehash(auth.get_password_hash("test")))
+        self.assertFalse(auth.check_password("test", "wrong"))
+        self.assertTrue(auth.needs_rehash(auth.get_password_hash("test")))
+        self.assertTrue(auth.check_password("test", "test"))
+        self.assertFalse(auth.needs_rehash(auth.get_password_hash("test")))
+        self.assertTrue(auth.check_password("test", "test"))
+        self.assertFalse(auth.check_password("unknown", "test"))
+
+
+class RateLimiterTest(unittest.TestCase):
+    def test_rate_limiter(self):
+        limiter = auth.RateLimiter(60, 2)
+        with unittest.mock.patch.object(auth.time, "monotonic", return_value=100):
+            self.assertEqual([0, 0], [limiter.acquire("a"), limiter.acquire("a")])
+            self.assertAlmostEqual(1, limiter.acquire("a"))
+            self.assertEqual(0, limiter.acquire("b"))
+        # One attempt per second is allowed again
+        with unittest.mock.patch.object(auth.time, "monotonic", return_value=101):
+            self.assertEqual(0, limiter.acquire("a"))
+            self.assertAlmostEqual(1, limiter.acquire("a"))
+        self.assertEqual(0, auth.RateLimiter(0, 0).acquire("a"))
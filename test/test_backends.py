@@ -0,0 +1,295 @@
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import unittest
+import unittest.mock
+from typing import List
+
+from basyx.aas import model
+from aas_repository_server import backends, storage
+
+
+class _BackendTest:
+    """
+    Tests every StorageBackend has to pass, mixed into the TestCase of each backend
+    """
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.semantic_id: model.Key = model.Key(
+            type_=model.KeyElements.GLOBAL_REFERENCE,
+            local=False,
+            value="https://example.com/semanticIDs/ONE",
+            id_type=model.KeyType.IRI
+        )
+        self.submodel: model.Submodel = model.Submodel(
+            identification=model.Identifier("https://example.com/sm/test_submodel01", model.IdentifierType.IRI),
+            submodel_element=[
+                model.SubmodelElementCollectionUnordered(
+                    id_short="TestCollection",
+                    value=[
+                        model.Property(
+                            id_short="TestProperty",
+                            value_type=model.datatypes.String,
+                            semantic_id=model.Reference((self.semantic_id,))
+                        )
+                    ]
+                )
+            ]
+        )
+        self.aas: model.AssetAdministrationShell = model.AssetAdministrationShell(
+            asset=model.AASReference((model.Key(
+                type_=model.KeyElements.ASSET,
+                local=False,
+                value="https://example.com/asset/test_asset",
+                id_type=model.KeyType.IRI
+            ),), model.Asset),
+            identification=model.Identifier("https://example.com/aas/test_aas", model.IdentifierType.IRI),
+            submodel={model.AASReference.from_referable(self.submodel)}
+        )
+        self.backend: backends.StorageBackend = self.create_backend()
+        self.backend.add([(self.submodel, backends.get_index_record(self.submodel))])
+
+    def tearDown(self) -> None:
+        self.backend.close()
+        self.temp_dir.cleanup()
+
+    def create_backend(self) -> backends.StorageBackend:
+        raise NotImplementedError()
+
+    def test_add_get_discard(self):
+        results = self.backend.add([
+            (self.aas, backends.get_index_record(self.aas)),
+            (self.submodel, backends.get_index_record(self.submodel))
+        ])
+        self.assertIsNone(results[0])
+        self.assertIsInstance(results[1], KeyError)
+        self.assertEqual(2, len(self.backend))
+        self.assertIn(self.aas.identification, self.backend)
+        submodel, version = self.backend.get(self.submodel.identification)
+        self.assertEqual(1, version.number)
+        self.assertIsInstance(submodel, model.Submodel)
+        self.assertIsNot(self.submodel, submodel)
+        self.assertEqual("TestProperty",
+                         submodel.get_referable("TestCollection").get_referable("TestProperty").id_short)
+        self.assertEqual({self.aas.identification, self.submodel.identification},
+                         {identifiable.identification for identifiable in self.backend.iter_identifiables()})
+        self.assertEqual(
+            {"https://example.com/aas/test_aas", "https://example.com/sm/test_submodel01"},
+            {json.loads(data)["identification"]["id"] for data in self.backend.iter_serialized()}
+        )
+        self.backend.discard(self.submodel.identification)
+        self.assertNotIn(self.submodel.identification, self.backend)
+        with self.assertRaises(KeyError):
+            self.backend.get(self.submodel.identification)
+        with self.assertRaises(KeyError):
+            self.backend.discard(self.submodel.identification)
+        self.assertEqual([self.aas.identification], [r.identifier for r in self.backend.load_index_records()])
+        # An Identifiable added again under the same Identifier has another version
+        self.backend.add([(self.submodel, backends.get_index_record(self.submodel))])
+        new_version: backends.Version = self.backend.get(self.submodel.identification)[1]
+        self.assertEqual(1, new_version.number)
+        self.assertNotEqual(version, new_version)
+
+    def test_replace(self):
+        replacement = model.Submodel(identification=self.submodel.identification, id_short="Replaced")
+        tag: str = self.backend.get(self.submodel.identification)[1].tag
+        self.assertEqual(backends.Version(tag, 2),
+                         self.backend.replace(replacement, backends.get_index_record(replacement)))
+        self.assertEqual(backends.Version(tag, 3), self.backend.replace(
+            replacement, backends.get_index_record(replacement), backends.Version(tag, 2)))
+        with self.assertRaises(backends.VersionConflictError):
+            self.backend.replace(self.submodel, backends.get_index_record(self.submodel), backends.Version(tag, 2))
+        with self.assertRaises(backends.VersionConflictError):
+            self.backend.replace(self.submodel, backends.get_index_record(self.submodel), backends.Version("other", 3))
+        submodel, version = self.backend.get(self.submodel.identification)
+        self.assertEqual(("Replaced", backends.Version(tag, 3)), (submodel.id_short, version))
+        self.assertEqual([[]], [record.semantic_ids for record in self.backend.load_index_records()])
+        with self.assertRaises(KeyError):
+            self.backend.replace(self.aas, backends.get_index_record(self.aas))
+        self.assertNotIn(self.aas.identification, self.backend)
+
+    def test_replace_concurrently(self):
+        replacements = [model.Submodel(identification=self.submodel.identification, id_short="Replaced{}".format(i))
+                        for i in range(8)]
+        results: List[object] = []
+        version: backends.Version = self.backend.get(self.submodel.identification)[1]
+
+        def replace(replacement: model.Submodel) -> None:
+            try:
+                results.append(self.backend.replace(replacement, backends.get_index_record(replacement), version))
+            except backends.VersionConflictError as e:
+                results.append(e)
+
+        threads = [threading.Thread(target=replace, args=(replacement,)) for replacement in replacements]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        # Only one writer may replace version 1
+        self.assertEqual([2], [result.number for result in results if isinstance(result, backends.Version)])
+        self.assertEqual(2, self.backend.get(self.submodel.identification)[1].number)
+
+    def test_load_index_records(self):
+        self.backend.add([(self.aas, backends.get_index_record(self.aas))])
+        self.backend.close()
+        self.backend = self.create_backend()
+        with unittest.mock.patch.object(backends, "get_index_record") as get_index_record:
+            records = {record.identifier: record for record in self.backend.load_index_records()}
+            get_index_record.assert_not_called()
+        self.assertEqual([(self.semantic_id, ("TestCollection", "TestProperty"))],
+                         records[self.submodel.identification].semantic_ids)
+        self.assertEqual([self.submodel.identification], records[self.aas.identification].submodels)
+        self.assertEqual({("TestCollection", "TestProperty"): backends.ElementAttributes("Property")},
+                         records[self.submodel.identification].attributes)
+
+    def test_object_store(self):
+        object_store = storage.RepositoryObjectStore(self.backend)
+        self.assertIn(self.submodel.identification, object_store)
+        object_store.add(self.aas)
+        result = object_store.get_semantic_id(self.semantic_id)
+        self.assertEqual(1, len(result))
+        element: storage.SemanticIndexElement = result.pop()
+        self.assertEqual(self.aas.identification, element.parent_asset_administration_shell)
+        self.assertEqual("TestProperty", element.resolve_referable(object_store).id_short)
+        self.assertIs(self.aas, object_store.get_identifiable(self.aas.identification))
+        self.assertEqual(2, len(list(object_store)))
+
+
+class LocalFileBackendTest(_BackendTest, unittest.TestCase):
+    def create_backend(self) -> backends.LocalFileBackend:
+        storage_dir: str = os.path.join(self.temp_dir.name, "aas_store")
+        os.makedirs(storage_dir, exist_ok=True)
+        return backends.LocalFileBackend(storage_dir, os.path.join(self.temp_dir.name, "semantic_index.sqlite3"))
+
+    def test_reindex_changed_files(self):
+        self.assertEqual(1, len(self.backend.semantic_index_snapshot.get_file_stats()))
+        # Change the file behind the backend's back
+        backends.LocalFileBackend(self.backend.directory_path).discard(self.submodel.identification)
+        unindexed = model.Submodel(identification=self.submodel.identification)
+        backends.LocalFileBackend(self.backend.directory_path).add([(unindexed, backends.get_index_record(unindexed))])
+        self.assertEqual([[]], [record.semantic_ids for record in self.backend.load_index_records()])
+        # Remove the file
+        os.remove(self.backend._get_file_path(self.submodel.identification))
+        self.assertEqual([], list(self.backend.load_index_records()))
+        self.assertEqual({}, self.backend.semantic_index_snapshot.get_file_stats())
+
+    def test_discarded_while_indexing(self):
+        file_name: str = self.backend._get_file_name(self.submodel.identification)
+        other = model.Submodel(identification=model.Identifier("https://example.com/sm/test_submodel02",
+                                                               model.IdentifierType.IRI))
+        self.backend.add([(other, backends.get_index_record(other))])
+        file_names: List[str] = self.backend._list_file_names()
+        # Another process discards the file after it was listed, before it is stat'ed or read
+        os.remove(self.backend._get_file_path(self.submodel.identification))
+        with unittest.mock.patch.object(self.backend, "_list_file_names", return_value=file_names):
+            self.assertEqual([other.identification],
+                             [record.identifier for record in self.backend.load_index_records()])
+        self.assertNotIn(file_name, self.backend.semantic_index_snapshot.get_file_stats())
+        self.assertEqual([], backends._read_index_records(self.backend.directory_path, [file_name]))
+        without_snapshot = backends.LocalFileBackend(self.backend.directory_path)
+        with unittest.mock.patch.object(without_snapshot, "_list_file_names", return_value=file_names):
+            self.assertEqual(1, len(list(without_snapshot.load_index_records())))
+
+    def test_add_batch(self):
+        submodels: List[model.Submodel] = [
+            model.Submodel(
+                identification=model.Identifier("https://example.com/sm/batch{}".format(i), model.IdentifierType.IRI),
+                semantic_id=model.Reference((self.semantic_id,))
+            )
+            for i in range(3)
+        ]
+        with unittest.mock.patch.object(self.backend.semantic_index_snapshot, "store_records",
+                                        wraps=self.backend.semantic_index_snapshot.store_records) as store_records:
+            self.backend.add([(submodel, backends.get_index_record(submodel)) for submodel in submodels])
+            store_records.assert_called_once()
+        self.assertEqual(4, len(self.backend.semantic_index_snapshot.get_file_stats()))
+
+    def test_atomic_writes(self):
+        replacement = model.Submodel(identification=self.submodel.identification, id_short="Replaced")
+        with unittest.mock.patch.object(backends.serialization, "dumps", side_effect=RuntimeError()):
+            with self.assertRaises(RuntimeError):
+                self.backend.replace(replacement, backends.get_index_record(replacement))
+        # The stored file is untouched and no temporary file is left behind
+        submodel, version = self.backend.get(self.submodel.identification)
+        self.assertEqual(("", 1), (submodel.id_short, version.number))
+        self.assertEqual(1, len(os.listdir(self.backend.directory_path)))
+
+    def test_parallel_index_build(self):
+        for i in range(2, 6):
+            submodel = model.Submodel(
+                identification=model.Identifier("https://example.com/sm/test_submodel0{}".format(i),
+                                                model.IdentifierType.IRI),
+                semantic_id=model.Reference((self.semantic_id,))
+            )
+            self.backend.add([(submodel, backends.get_index_record(submodel))])
+        backend = backends.LocalFileBackend(self.backend.directory_path, index_processes=2)
+        self.assertEqual(5, len(list(backend.load_index_records())))
+        self.backend.close()
+        os.remove(self.backend.semantic_index_snapshot.file_path)
+        self.backend = backends.LocalFileBackend(self.backend.directory_path,
+                                                 self.backend.semantic_index_snapshot.file_path, index_processes=2)
+        self.assertEqual(5, len(list(self.backend.load_index_records())))
+        self.assertEqual(5, len(self.backend.semantic_index_snapshot.get_file_stats()))
+
+    def test_outdated_snapshot(self):
+        self.backend.close()
+        os.remove(self.backend.semantic_index_snapshot.file_path)
+        # A snapshot written before the attributes were indexed
+        connection = sqlite3.connect(self.backend.semantic_index_snapshot.file_path)
+        with connection:
+            connection.execute("CREATE TABLE files ("
+                               "name TEXT PRIMARY KEY, mtime_ns INTEGER, size INTEGER, id_type TEXT, id TEXT, "
+                               "submodels TEXT)")
+        connection.close()
+        self.backend = self.create_backend()
+        self.assertEqual([{("TestCollection", "TestProperty"): backends.ElementAttributes("Property")}],
+                         [record.attributes for record in self.backend.load_index_records()])
+
+
+class SQLiteBackendTest(_BackendTest, unittest.TestCase):
+    def create_backend(self) -> backends.SQLiteBackend:
+        return backends.SQLiteBackend(os.path.join(self.temp_dir.name, "aas_store.sqlite3"))
+
+    def test_missing_attributes(self):
+        # Rows written before the attributes were indexed
+        self.backend._connection.execute("UPDATE semantic_ids SET model_type = NULL")
+        self.assertEqual([{("TestCollection", "TestProperty"): backends.ElementAttributes("Property")}],
+                         [record.attributes for record in self.backend.load_index_records()])
+        self.assertEqual(0, self.backend._connection.execute(
+            "SELECT COUNT(*) FROM semantic_ids WHERE model_type IS NULL").fetchone()[0])
+        # A database created before the attributes were indexed
+        file_path: str = os.path.join(self.temp_dir.name, "old.sqlite3")
+        connection = sqlite3.connect(file_path)
+        with connection:
+            connection.execute("CREATE TABLE identifiables (id_type TEXT NOT NULL, id TEXT NOT NULL, "
+                               "model_type TEXT NOT NULL, submodels TEXT NOT NULL, data BLOB NOT NULL, "
+                               "version INTEGER NOT NULL, PRIMARY KEY (id_type, id))")
+            connection.execute("CREATE TABLE semantic_ids (id_type TEXT NOT NULL, id TEXT NOT NULL, type TEXT, "
+                               "local INTEGER, value TEXT, key_id_type TEXT, id_short_path TEXT)")
+        connection.close()
+        backend = backends.SQLiteBackend(file_path)
+        backend.add([(self.submodel, backends.get_index_record(self.submodel))])
+        self.assertEqual(1, len(list(backend.load_index_records())))
+        backend.close()
+
+    def test_wal_mode(self):
+        self.assertEqual("wal", self.backend._connection.execute("PRAGMA journal_mode").fetchone()[0])
+
+    def test_add_batch_transaction(self):
+        submodel = model.Submodel(
+            identification=model.Identifier("https://example.com/sm/batch", model.IdentifierType.IRI),
+            semantic_id=model.Reference((self.semantic_id,))
+        )
+        # A failing batch is rolled back as a whole
+        with unittest.mock.patch.object(backends, "_key_to_row", side_effect=RuntimeError()):
+            with self.assertRaises(RuntimeError):
+                self.backend.add([(submodel, backends.get_index_record(submodel))])
+        self.assertNotIn(submodel.identification, self.backend)
+        self.assertEqual([None, None, KeyError], [
+            e if e is None else type(e)
+            for e in self.backend.add([(identifiable, backends.get_index_record(identifiable))
+                                       for identifiable in (submodel, self.aas, submodel)])
+        ])
+        self.assertEqual(3, len(self.backend))
@@ -0,0 +1,119 @@
+import hashlib
+import io
+import os
+import tempfile
+import time
+import unittest
+import unittest.mock
+
+from aas_repository_server import files
+
+
+class FileStoreTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.file_store = files.FileStore(self.temp_dir.name)
+
+    def tearDown(self) -> None:
+        self.file_store.close()
+        self.temp_dir.cleanup()
+
+    def _count_blobs(self) -> int:
+        return sum(len(file_names) for _, _, file_names in os.walk(self.file_store.blob_directory_path))
+
+    def test_add_stream(self):
+        sha256: str = self.file_store.add_stream("a.fmu", io.BytesIO(b"content"), 100)
+        self.assertEqual(hashlib.sha256(b"content").hexdigest(), sha256)
+        self.assertEqual(sha256, self.file_store.get_sha256("a.fmu"))
+        self.assertEqual(os.path.join(self.file_store.blob_directory_path, sha256[0:2], sha256[2:4], sha256),
+                         self.file_store.get_path("a.fmu"))
+        with open(self.file_store.get_path("a.fmu"), "rb") as file:
+            self.assertEqual(b"content", file.read())
+        self.assertIsNone(self.file_store.get_path("b.fmu"))
+
+    def test_deduplication(self):
+        sha256: str = self.file_store.add_stream("a.fmu", io.BytesIO(b"content"), 100)
+        self.file_store.add_stream("b.fmu", io.BytesIO(b"content"), 100)
+        self.assertTrue(self.file_store.link("c.fmu", sha256))
+        self.assertFalse(self.file_store.link("d.fmu", hashlib.sha256(b"unknown").hexdigest()))
+        self.assertEqual(1, self._count_blobs())
+        self.file_store.remove("a.fmu")
+        self.file_store.remove("b.fmu")
+        self.assertTrue(self.file_store.has_blob(sha256))
+        # Overwriting the last name referring to a blob deletes the blob
+        self.file_store.add_stream("c.fmu", io.BytesIO(b"other content"), 100)
+        self.assertFalse(self.file_store.has_blob(sha256))
+        self.assertEqual(1, self._count_blobs())
+        self.file_store.remove("c.fmu")
+        self.assertEqual(0, self._count_blobs())
+        with self.assertRaises(KeyError):
+            self.file_store.remove("c.fmu")
+
+    def test_add_stream_fail(self):
+        self.file_store.add_stream("a.fmu", io.BytesIO(b"content"), 100)
+        with unittest.mock.patch.object(files, "CHUNK_SIZE", 10):
+            with self.assertRaises(files.FileTooLargeError):
+                self.file_store.add_stream("a.fmu", io.BytesIO(b"x" * 101), 100)
+        with self.assertRaises(files.DigestMismatchError):
+            self.file_store.add_stream("a.fmu", io.BytesIO(b"x"), 100, hashlib.sha256(b"y").hexdigest())
+        self.assertEqual(hashlib.sha256(b"content").hexdigest(), self.file_store.get_sha256("a.fmu"))
+        self.assertEqual([], os.listdir(self.file_store.temp_directory_path))
+
+    def test_import_legacy_files(self):
+        self.file_store.close()
+        os.makedirs(os.path.join(self.temp_dir.name, "models"))
+        for name in ("a.fmu", "models/b.fmu"):
+            with open(os.path.join(self.temp_dir.name, name), "wb") as file:
+                file.write(b"content")
+        self.file_store = files.FileStore(self.temp_dir.name)
+        self.assertEqual(hashlib.sha256(b"content").hexdigest(), self.file_store.get_sha256("a.fmu"))
+        self.assertEqual(hashlib.sha256(b"content").hexdigest(), self.file_store.get_sha256("models/b.fmu"))
+        self.assertFalse(os.path.exists(os.path.join(self.temp_dir.name, "a.fmu")))
+        self.assertEqual(1, self._count_blobs())
+
+    def test_upload_session(self):
+        upload_id: str = self.file_store.initiate_upload("a.fmu", hashlib.sha256(b"part1part2part3").hexdigest())
+        # Parts can be uploaded in any order
+        self.file_store.put_upload_part(upload_id, 3, io.BytesIO(b"part3"), 100)
+        self.file_store.put_upload_part(upload_id, 1, io.BytesIO(b"part1"), 100)
+        with self.assertRaises(ValueError):
+            self.file_store.complete_upload(upload_id, 100)
+        # Upload sessions survive a restart
+        self.file_store.close()
+        self.file_store = files.FileStore(self.temp_dir.name)
+        self.assertEqual(hashlib.sha256(b"part2").hexdigest(),
+                         self.file_store.put_upload_part(upload_id, 2, io.BytesIO(b"part2"), 100))
+        with self.assertRaises(files.FileTooLargeError):
+            self.file_store.complete_upload(upload_id, 10)
+        sha256: str = self.file_store.complete_upload(upload_id, 100)
+        self.assertEqual(hashlib.sha256(b"part1part2part3").hexdigest(), sha256)
+        with open(self.file_store.get_path("a.fmu"), "rb") as file:
+            self.assertEqual(b"part1part2part3", file.read())
+        self.assertEqual([], os.listdir(self.file_store.upload_directory_path))
+        with self.assertRaises(KeyError):
+            self.file_store.put_upload_part(upload_id, 1, io.BytesIO(b"part1"), 100)
+
+    def test_upload_session_fail(self):
+        upload_id: str = self.file_store.initiate_upload("a.fmu", hashlib.sha256(b"other").hexdigest())
+        with self.assertRaises(ValueError):
+            self.file_store.put_upload_part(upload_id, 0, io.BytesIO(b"part0"), 100)
+        with self.assertRaises(ValueError):
+            self.file_store.complete_upload(upload_id, 100)
+        self.file_store.put_upload_part(upload_id, 1, io.BytesIO(b"part1"), 100)
+        with self.assertRaises(files.DigestMismatchError):
+            self.file_store.complete_upload(upload_id, 100)
+        self.assertIsNone(self.file_store.get_sha256("a.fmu"))
+        self.file_store.abort_upload(upload_id)
+        with self.assertRaises(KeyError):
+            self.file_store.abort_upload(upload_id)
+        with self.assertRaises(KeyError):
+            self.file_store.abort_upload("../tmp")
+
+    def test_remove_stale_uploads(self):
+        upload_id: str = self.file_store.initiate_upload("a.fmu")
+        self.file_store.remove_stale_uploads(60)
+        self.assertEqual("a.fmu", self.file_store.get_upload_name(upload_id))
+        with unittest.mock.patch.object(files.time, "time", return_value=time.time() + 61):
+            self.file_store.remove_stale_uploads(60)
+        with self.assertRaises(KeyError):
+            self.file_store.get_upload_name(upload_id)
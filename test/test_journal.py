@@ -0,0 +1,45 @@
+import os
+import tempfile
+import unittest
+
+from basyx.aas import model
+from aas_repository_server import journal
+
+
+class ChangeJournalTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.file_path: str = os.path.join(self.temp_dir.name, "journal.sqlite3")
+        self.journal = journal.ChangeJournal(self.file_path)
+        self.identifiers = [model.Identifier("https://example.com/sm/{}".format(i), model.IdentifierType.IRI)
+                            for i in range(3)]
+
+    def tearDown(self) -> None:
+        self.journal.close()
+        self.temp_dir.cleanup()
+
+    def test_append_read(self):
+        self.assertEqual(0, self.journal.get_last_sequence())
+        self.assertEqual([], self.journal.read_changes(0))
+        self.assertEqual((0, 2), self.journal.append(self.identifiers[:2]))
+        # Another process appends to the same file
+        other = journal.ChangeJournal(self.file_path)
+        self.assertEqual((2, 3), other.append(self.identifiers[2:]))
+        other.close()
+        self.assertEqual(3, self.journal.get_last_sequence())
+        self.assertEqual(list(enumerate(self.identifiers, start=1)), self.journal.read_changes(0))
+        self.assertEqual([(3, self.identifiers[2])], self.journal.read_changes(2))
+        self.assertEqual([], self.journal.read_changes(3))
+
+    def test_removed_entries(self):
+        self.journal.append(self.identifiers[:2])
+        self.journal.append(self.identifiers[2:])
+        self.journal.PRUNE_INTERVAL = 0
+        self.journal.retention = -1
+        self.journal.append(self.identifiers[:1])
+        # The first entries have been removed
+        self.assertIsNone(self.journal.read_changes(1))
+        self.assertEqual(4, self.journal.get_last_sequence())
+        self.assertEqual([], self.journal.read_changes(4))
+        # The journal has been recreated
+        self.assertIsNone(self.journal.read_changes(5))
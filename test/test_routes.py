@@ -1,9 +1,15 @@
+import base64
+import hashlib
+import io
+import itertools
 import unittest
+import unittest.mock
 import requests.auth
 import json
-from typing import Set
+from typing import Dict, Set, List, Optional
 
 from basyx.aas import model
+from werkzeug.middleware.proxy_fix import ProxyFix
 from basyx.aas.adapter.json import json_serialization, json_deserialization
 from aas_repository_server import routes, auth
 
@@ -14,6 +20,7 @@ class HTTPServerTestUnauthorizedPaths(unittest.TestCase):
         routes.APP.config['WTF_CSRF_ENABLED'] = False
         routes.APP.config['DEBUG'] = True
         auth.add_user("test", "test")  # Add a test user to the User DB
+        auth.LOGIN_RATE_LIMITER.reset()
         self.test_client = routes.APP.test_client()
 
     def tearDown(self) -> None:
@@ -37,6 +44,45 @@ class HTTPServerTestUnauthorizedPaths(unittest.TestCase):
         response = self.test_client.get("/login", headers=headers)
         self.assertEqual(response.status_code, 200)
 
+    def test_refresh_token(self):
+        headers = {"Authorization": requests.auth._basic_auth_str("test", "test")}
+        tokens = json.loads(self.test_client.get("/login", headers=headers).data)
+        with unittest.mock.patch.object(auth.werkzeug.security, "check_password_hash") as check_password_hash:
+            response = self.test_client.post("/refresh", headers={"x-refresh-token": tokens["refresh_token"]})
+            check_password_hash.assert_not_called()
+        self.assertEqual(response.status_code, 200)
+        token: str = json.loads(response.data)["token"]
+        response = self.test_client.get("/test_authorized", headers={"x-access-tokens": token})
+        self.assertEqual(response.status_code, 200)
+        # Access and refresh tokens cannot be used in place of each other
+        response = self.test_client.get("/test_authorized", headers={"x-access-tokens": tokens["refresh_token"]})
+        self.assertEqual(response.status_code, 401)
+        response = self.test_client.post("/refresh", headers={"x-refresh-token": token})
+        self.assertEqual(response.status_code, 401)
+        # Changing the password invalidates the refresh token
+        auth.add_user("test", "new password")
+        response = self.test_client.post("/refresh", headers={"x-refresh-token": tokens["refresh_token"]})
+        self.assertEqual(response.status_code, 401)
+
+    def test_login_rate_limit(self):
+        headers = {"Authorization": requests.auth._basic_auth_str("test", "wrong")}
+        for _ in range(auth.LOGIN_BURST):
+            self.assertEqual(401, self.test_client.get("/login", headers=headers).status_code)
+        response = self.test_client.get("/login", headers=headers)
+        self.assertEqual(429, response.status_code)
+        self.assertGreater(int(response.headers["Retry-After"]), 0)
+
+    def test_login_rate_limit_behind_proxy(self):
+        headers = {"Authorization": requests.auth._basic_auth_str("test", "wrong")}
+        # With TRUSTED_PROXIES = 1, the clients are told apart by the X-Forwarded-For header of the proxy
+        with unittest.mock.patch.object(routes.APP, "wsgi_app", ProxyFix(routes.APP.wsgi_app, x_for=1)):
+            for _ in range(auth.LOGIN_BURST):
+                self.test_client.get("/login", headers={"X-Forwarded-For": "192.0.2.1", **headers})
+            self.assertEqual(429, self.test_client.get(
+                "/login", headers={"X-Forwarded-For": "192.0.2.1", **headers}).status_code)
+            self.assertEqual(401, self.test_client.get(
+                "/login", headers={"X-Forwarded-For": "192.0.2.2", **headers}).status_code)
+
 
 class TestGetIdentifiable(unittest.TestCase):
     def setUp(self) -> None:
@@ -44,6 +90,7 @@ class TestGetIdentifiable(unittest.TestCase):
         routes.APP.config['WTF_CSRF_ENABLED'] = False
         routes.APP.config['DEBUG'] = True
         auth.add_user("test", "test")  # Add a test user to the User DB
+        auth.LOGIN_RATE_LIMITER.reset()
         self.test_client = routes.APP.test_client()
         login = self.test_client.get("/login", headers={"Authorization": requests.auth._basic_auth_str("test", "test")})
         self.token: str = json.loads(login.data)["token"]
@@ -80,9 +127,117 @@ class TestGetIdentifiable(unittest.TestCase):
         self.assertIsInstance(sm, model.Submodel)
         self.assertEqual(sm.identification, identifiable.identification)
         self.assertEqual(sm.id_short, identifiable.id_short)
+        self.assertNotIn(b"\n", response.data)
+        # Indented JSON is only returned on request
+        response = self.test_client.get(
+            "/get_identifiable?pretty=1",
+            headers=self.auth_headers,
+            data=json.dumps(identifier, cls=json_serialization.AASToJsonEncoder)
+        )
+        self.assertEqual(200, response.status_code)
+        self.assertIn(b"\n", response.data)
+        # Clean up object store
+        routes.OBJECT_STORE.remove(identifiable)
+
+    def test_get_identifiable_etag(self):
+        identifier: model.Identifier = model.Identifier(
+            id_="https://example.com/sm/test_submodel",
+            id_type=model.IdentifierType.IRI
+        )
+        identifiable: model.Submodel = model.Submodel(
+            identification=identifier,
+            id_short="exampleSM"
+        )
+        routes.OBJECT_STORE.add(identifiable)
+        data: str = json.dumps(identifier, cls=json_serialization.AASToJsonEncoder)
+        response = self.test_client.get("/get_identifiable", headers=self.auth_headers, data=data)
+        self.assertEqual(200, response.status_code)
+        etag: str = response.headers["ETag"]
+        response = self.test_client.get(
+            "/get_identifiable",
+            headers={"If-None-Match": etag, **self.auth_headers},
+            data=data
+        )
+        self.assertEqual(304, response.status_code)
+        self.assertEqual(b"", response.data)
+        self.assertEqual(etag, response.headers["ETag"])
+        # Modifying the Identifiable invalidates the cached response
+        self.assertIsNotNone(routes.RESPONSE_CACHE.get((identifier, False)))
+        response = self.test_client.put(
+            "/modify_identifiable",
+            headers=self.auth_headers,
+            data=json.dumps(
+                model.Submodel(identification=identifier, id_short="modifiedSM"),
+                cls=json_serialization.AASToJsonEncoder
+            )
+        )
+        self.assertEqual(200, response.status_code)
+        self.assertIsNone(routes.RESPONSE_CACHE.get((identifier, False)))
+        self.assertNotEqual(etag, response.headers["ETag"])
+        response = self.test_client.get("/get_identifiable", headers={"If-None-Match": etag, **self.auth_headers},
+                                        data=data)
+        self.assertEqual(200, response.status_code)
+        self.assertEqual("modifiedSM", json.loads(response.data)["idShort"])
         # Clean up object store
         routes.OBJECT_STORE.remove(identifiable)
 
+    def test_modify_identifiable_if_match(self):
+        identifier: model.Identifier = model.Identifier(
+            id_="https://example.com/sm/test_submodel",
+            id_type=model.IdentifierType.IRI
+        )
+        routes.OBJECT_STORE.add(model.Submodel(identification=identifier, id_short="exampleSM"))
+        response = self.test_client.get(
+            "/get_identifiable",
+            headers=self.auth_headers,
+            data=json.dumps(identifier, cls=json_serialization.AASToJsonEncoder)
+        )
+        etag: str = response.headers["ETag"]
+        for id_short, if_match, status_code in (("firstSM", etag, 200), ("secondSM", etag, 412),
+                                                ("thirdSM", "*", 200), ("fourthSM", '"a", "b"', 400)):
+            response = self.test_client.put(
+                "/modify_identifiable",
+                headers={"If-Match": if_match, **self.auth_headers},
+                data=json.dumps(model.Submodel(identification=identifier, id_short=id_short),
+                                cls=json_serialization.AASToJsonEncoder)
+            )
+            self.assertEqual(status_code, response.status_code)
+        self.assertEqual("thirdSM", routes.OBJECT_STORE.get_identifiable(identifier).id_short)
+        self.assertEqual(400, self.test_client.put(
+            "/modify_identifiable",
+            headers={"If-Match": '"not-a-version"', **self.auth_headers},
+            data=json.dumps(model.Submodel(identification=identifier), cls=json_serialization.AASToJsonEncoder)
+        ).status_code)
+        # Clean up object store
+        routes.OBJECT_STORE.discard(routes.OBJECT_STORE.get_identifiable(identifier))
+
+    def test_etag_after_discard_and_add(self):
+        identifier: model.Identifier = model.Identifier(
+            id_="https://example.com/sm/test_submodel",
+            id_type=model.IdentifierType.IRI
+        )
+        data: str = json.dumps(identifier, cls=json_serialization.AASToJsonEncoder)
+        routes.OBJECT_STORE.add(model.Submodel(identification=identifier, id_short="firstSM"))
+        etag: str = self.test_client.get("/get_identifiable", headers=self.auth_headers, data=data).headers["ETag"]
+        routes.OBJECT_STORE.discard(routes.OBJECT_STORE.get_identifiable(identifier))
+        # The Identifiable added again under the same Identifier has version 1 as well, but another ETag
+        routes.OBJECT_STORE.add(model.Submodel(identification=identifier, id_short="secondSM"))
+        response = self.test_client.get("/get_identifiable", headers={"If-None-Match": etag, **self.auth_headers},
+                                        data=data)
+        self.assertEqual(200, response.status_code)
+        self.assertEqual("secondSM", json.loads(response.data)["idShort"])
+        self.assertNotEqual(etag, response.headers["ETag"])
+        response = self.test_client.put(
+            "/modify_identifiable",
+            headers={"If-Match": etag, **self.auth_headers},
+            data=json.dumps(model.Submodel(identification=identifier, id_short="thirdSM"),
+                            cls=json_serialization.AASToJsonEncoder)
+        )
+        self.assertEqual(412, response.status_code)
+        self.assertEqual("secondSM", routes.OBJECT_STORE.get_identifiable(identifier).id_short)
+        # Clean up object store
+        routes.OBJECT_STORE.discard(routes.OBJECT_STORE.get_identifiable(identifier))
+
     def test_get_identifiable_fail_400(self):
         response = self.test_client.get(
             "/get_identifiable",
@@ -126,6 +281,115 @@ class TestGetIdentifiable(unittest.TestCase):
         )
 
 
+class BulkIdentifiableTest(unittest.TestCase):
+    def setUp(self) -> None:
+        routes.APP.config["TESTING"] = True
+        routes.APP.config['WTF_CSRF_ENABLED'] = False
+        routes.APP.config['DEBUG'] = True
+        auth.add_user("test", "test")  # Add a test user to the User DB
+        auth.LOGIN_RATE_LIMITER.reset()
+        self.test_client = routes.APP.test_client()
+        login = self.test_client.get("/login", headers={"Authorization": requests.auth._basic_auth_str("test", "test")})
+        self.token: str = json.loads(login.data)["token"]
+        self.auth_headers = {"x-access-tokens": "{}".format(self.token)}
+        self.submodels: List[model.Submodel] = [
+            model.Submodel(
+                identification=model.Identifier("https://example.com/sm/bulk{}".format(i), model.IdentifierType.IRI),
+                id_short="bulkSM{}".format(i)
+            )
+            for i in range(3)
+        ]
+
+    def tearDown(self) -> None:
+        for submodel in self.submodels:
+            if submodel.identification in routes.OBJECT_STORE:
+                routes.OBJECT_STORE.discard(submodel)
+        auth.remove_user("test")  # Remove the test user from the User DB
+
+    def test_add_get_identifiables(self):
+        routes.OBJECT_STORE.add(self.submodels[0])
+        prop = model.Property(id_short="iAM", value_type=model.datatypes.String, value="A wrong datatype")
+        response = self.test_client.post(
+            "/add_identifiables",
+            headers=self.auth_headers,
+            data=json.dumps([*self.submodels, prop], cls=json_serialization.AASToJsonEncoder)
+        )
+        self.assertEqual(200, response.status_code)
+        self.assertEqual([409, 200, 200, 422], [result["status"] for result in json.loads(response.data)])
+        self.assertEqual(
+            {"id": "https://example.com/sm/bulk1", "idType": "IRI"},
+            json.loads(response.data)[1]["identification"]
+        )
+        unknown: model.Identifier = model.Identifier("https://example.com/sm/unknown", model.IdentifierType.IRI)
+        response = self.test_client.get(
+            "/get_identifiables",
+            headers=self.auth_headers,
+            data=json.dumps([sm.identification for sm in self.submodels] + [unknown, "no identifier"],
+                            cls=json_serialization.AASToJsonEncoder)
+        )
+        self.assertEqual(200, response.status_code)
+        results = json.loads(response.data, cls=json_deserialization.AASFromJsonDecoder)
+        self.assertEqual([200, 200, 200, 404, 422], [result["status"] for result in results])
+        self.assertEqual(["bulkSM0", "bulkSM1", "bulkSM2"], [result["data"].id_short for result in results[:3]])
+
+    def test_add_get_identifiables_ndjson(self):
+        lines: List[str] = [json.dumps(sm, cls=json_serialization.AASToJsonEncoder) for sm in self.submodels]
+        with unittest.mock.patch.object(routes, "BULK_BATCH_SIZE", 2), \
+                unittest.mock.patch.object(routes.OBJECT_STORE, "add_batch",
+                                           wraps=routes.OBJECT_STORE.add_batch) as add_batch:
+            response = self.test_client.post(
+                "/add_identifiables",
+                headers=self.auth_headers,
+                content_type="application/x-ndjson",
+                data="\n".join([lines[0], "not JSON", "", *lines[1:]]) + "\n"
+            )
+            self.assertEqual(200, response.status_code)
+            self.assertEqual("application/x-ndjson", response.mimetype)
+            results = [json.loads(line) for line in response.data.splitlines()]
+            # The results are streamed, so the batches are added while the response is read
+            self.assertEqual(2, add_batch.call_count)
+        self.assertEqual([200, 400, 200, 200], [result["status"] for result in results])
+        response = self.test_client.get(
+            "/get_identifiables?pretty=1",
+            headers=self.auth_headers,
+            content_type="application/x-ndjson",
+            data="\n".join(json.dumps(sm.identification, cls=json_serialization.AASToJsonEncoder)
+                           for sm in self.submodels)
+        )
+        self.assertEqual(200, response.status_code)
+        results = [json.loads(line, cls=json_deserialization.AASFromJsonDecoder)
+                   for line in response.data.splitlines()]
+        self.assertEqual(["bulkSM0", "bulkSM1", "bulkSM2"], [result["data"].id_short for result in results])
+
+    def test_export_import(self):
+        routes.OBJECT_STORE.add_batch(self.submodels)
+        response = self.test_client.get("/export", headers=self.auth_headers)
+        self.assertEqual(200, response.status_code)
+        self.assertEqual("application/x-ndjson", response.mimetype)
+        lines: List[bytes] = [line for line in response.data.splitlines() if b"bulkSM" in line]
+        self.assertEqual(3, len(lines))
+        for submodel in self.submodels:
+            routes.OBJECT_STORE.discard(submodel)
+        response = self.test_client.post(
+            "/import?rebuild_index=1",
+            headers=self.auth_headers,
+            data=b"\n".join(lines + [b"not JSON"])
+        )
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(
+            {"added": 3, "errors": [{"line": 4, "message": "Could not parse line, not valid JSON"}]},
+            json.loads(response.data)
+        )
+        self.assertEqual("bulkSM1", routes.OBJECT_STORE.get_identifiable(self.submodels[1].identification).id_short)
+
+    def test_bulk_fail_400(self):
+        for data in ("Some senseless data", "{}"):
+            response = self.test_client.post("/add_identifiables", headers=self.auth_headers, data=data)
+            self.assertEqual(400, response.status_code)
+            response = self.test_client.get("/get_identifiables", headers=self.auth_headers, data=data)
+            self.assertEqual(400, response.status_code)
+
+
 class QuerySemanticIDTest(unittest.TestCase):
     def setUp(self) -> None:
         """
@@ -207,6 +471,7 @@ class QuerySemanticIDTest(unittest.TestCase):
         routes.APP.config['WTF_CSRF_ENABLED'] = False
         routes.APP.config['DEBUG'] = True
         auth.add_user("test", "test")  # Add a test user to the User DB
+        auth.LOGIN_RATE_LIMITER.reset()
         self.test_client = routes.APP.test_client()
         login = self.test_client.get("/login", headers={"Authorization": requests.auth._basic_auth_str("test", "test")})
         self.token: str = json.loads(login.data)["token"]
@@ -254,6 +519,222 @@ class QuerySemanticIDTest(unittest.TestCase):
             identifiers
         )
 
+    def _query_semantic_id_one(self, **kwargs):
+        return self.test_client.get(
+            "/query_semantic_id",
+            headers=self.auth_headers,
+            data=json.dumps(
+                {
+                    "semantic_id": self.semantic_id_1.key[0],
+                    "check_for_key_type": False,
+                    "check_for_key_local": False,
+                    "check_for_key_id_type": False,
+                    **kwargs
+                },
+                cls=json_serialization.AASToJsonEncoder
+            )
+        )
+
+    def test_query_semantic_id_paginated(self):
+        results: List = []
+        cursor: Optional[str] = None
+        pages: int = 0
+        while True:
+            response = self._query_semantic_id_one(limit=2, cursor=cursor)
+            self.assertEqual(200, response.status_code)
+            page = json.loads(response.data)
+            self.assertLessEqual(len(page), 2)
+            results.extend(page)
+            pages += 1
+            cursor = response.headers.get("x-next-cursor")
+            if cursor is None:
+                break
+        self.assertEqual(2, pages)
+        self.assertEqual(3, len(results))
+        self.assertEqual(
+            ["https://example.com/sm/test_submodel01", "https://example.com/sm/test_submodel01",
+             "https://example.com/sm/test_submodel03"],
+            [i["identifier"]["id"] for i in results]
+        )
+        self.assertEqual(422, self._query_semantic_id_one(limit=0).status_code)
+        self.assertEqual(422, self._query_semantic_id_one(limit=2, cursor="not a cursor").status_code)
+        # Well-formed cursors with fields of other types
+        for sort_key in ([1, 2, [3], 4, 5], ["a", "b", "c", "d", "e"], ["a", "b", [1], "d", "e"], ["a", "b", []],
+                         {"a": 1}):
+            cursor: str = base64.urlsafe_b64encode(json.dumps(sort_key).encode("utf-8")).decode("ascii")
+            self.assertEqual(422, self._query_semantic_id_one(limit=2, cursor=cursor).status_code)
+        self.assertEqual(422, self._query_semantic_id_one(limit=2, cursor=1).status_code)
+
+    def test_query_semantic_id_stream(self):
+        response = self._query_semantic_id_one(stream=True)
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(
+            {"https://example.com/sm/test_submodel01", "https://example.com/sm/test_submodel03"},
+            {i["identifier"]["id"] for i in json.loads(response.data)}
+        )
+        response = self._query_semantic_id_one(stream=True, limit=1)
+        self.assertEqual(1, len(json.loads(response.data)))
+        self.assertIsNotNone(response.headers.get("x-next-cursor"))
+
+    def test_query_semantic_id_include(self):
+        response = self._query_semantic_id_one(include="value")
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(
+            [("https://example.com/sm/test_submodel01", "", None),
+             ("https://example.com/sm/test_submodel01", "TestProperty", "TestValue"),
+             ("https://example.com/sm/test_submodel03", "", None)],
+            sorted((i["identifier"]["id"], i["id_short_path"], i["value"]) for i in json.loads(response.data))
+        )
+        response = self._query_semantic_id_one(include="element", limit=2, stream=True)
+        self.assertEqual(200, response.status_code)
+        results = json.loads(response.data, cls=json_deserialization.AASFromJsonDecoder)
+        self.assertEqual("", results[0]["id_short_path"])
+        self.assertIsInstance(results[0]["element"], model.Submodel)
+        self.assertEqual("TestProperty", results[1]["id_short_path"])
+        self.assertIsInstance(results[1]["element"], model.Property)
+        self.assertEqual("TestValue", results[1]["element"].value)
+        response = self._query_semantic_id_one(include="path")
+        self.assertEqual({"", "TestProperty"}, {i["id_short_path"] for i in json.loads(response.data)})
+        self.assertNotIn("element", json.loads(response.data)[0])
+        self.assertEqual(422, self._query_semantic_id_one(include="everything").status_code)
+
+    def test_query_semantic_id_include_reads_once(self):
+        identifier: model.Identifier = model.Identifier("https://example.com/sm/test_submodel04",
+                                                        model.IdentifierType.IRI)
+        routes.OBJECT_STORE.add(model.Submodel(
+            identification=identifier,
+            submodel_element=[model.Property(id_short="Property{}".format(i), value_type=model.datatypes.Int,
+                                             value=i, semantic_id=self.semantic_id_1) for i in range(50)]
+        ))
+        backend = routes.OBJECT_STORE.backend
+        resolve_referable = routes._resolve_referable
+        kept: List[int] = []
+
+        def count_kept(element, identifiables):
+            kept.append(len(identifiables))
+            return resolve_referable(element, identifiables)
+        for include, stream in itertools.product(("element", "value"), (False, True)):
+            kept.clear()
+            with unittest.mock.patch.object(backend, "get", wraps=backend.get) as get, \
+                    unittest.mock.patch.object(routes.OBJECT_STORE, "get_identifiable") as get_identifiable, \
+                    unittest.mock.patch.object(routes, "_resolve_referable", count_kept):
+                response = self._query_semantic_id_one(include=include, stream=stream)
+                # A streamed response is only generated when it is read
+                self.assertEqual(53, len(json.loads(response.data)))
+            self.assertEqual(200, response.status_code)
+            # Each Identifiable is read once, as a private copy instead of the shared one
+            self.assertEqual(3, get.call_count)
+            self.assertEqual(3, len({call.args[0] for call in get.call_args_list}))
+            get_identifiable.assert_not_called()
+            # A streamed response only keeps the Identifiable of the current results
+            if stream:
+                self.assertLessEqual(max(kept), 1)
+        # The values of Properties are returned like the values of /query_elements
+        values: Dict[str, object] = {
+            i["id_short_path"]: i["value"] for i in json.loads(self._query_semantic_id_one(include="value").data)
+            if i["identifier"]["id"] == identifier.id
+        }
+        self.assertEqual(49, values["Property49"])
+        self.assertEqual(values, {
+            i["id_short_path"]: i["value"] for i in json.loads(self._query_elements().data)
+            if i["identifier"]["id"] == identifier.id
+        })
+
+    def _query_semantic_ids(self, queries: List[Dict], **kwargs):
+        return self.test_client.get(
+            "/query_semantic_ids",
+            headers=self.auth_headers,
+            data=json.dumps({"queries": queries, **kwargs}, cls=json_serialization.AASToJsonEncoder)
+        )
+
+    def test_query_semantic_ids(self):
+        unknown_key: model.Key = model.Key(
+            type_=model.KeyElements.GLOBAL_REFERENCE,
+            local=False,
+            value="https://example.com/semanticIDs/UNKNOWN",
+            id_type=model.KeyType.IRI
+        )
+        response = self._query_semantic_ids([
+            {"semantic_id": self.semantic_id_1.key[0]},
+            {"semantic_id": unknown_key},
+            {"semantic_id": self.semantic_id_2.key[0], "check_for_key_type": True, "check_for_key_local": True,
+             "check_for_key_id_type": True},
+        ], include="path")
+        self.assertEqual(200, response.status_code)
+        response_list = json.loads(response.data)
+        self.assertEqual(
+            ["https://example.com/semanticIDs/ONE", "https://example.com/semanticIDs/UNKNOWN",
+             "https://example.com/semanticIDs/TWO"],
+            [i["semantic_id"]["value"] for i in response_list]
+        )
+        self.assertEqual(
+            [[("https://example.com/sm/test_submodel01", ""),
+              ("https://example.com/sm/test_submodel01", "TestProperty"),
+              ("https://example.com/sm/test_submodel03", "")],
+             [],
+             [("https://example.com/sm/test_submodel02", "")]],
+            [sorted((j["identifier"]["id"], j["id_short_path"]) for j in i["results"]) for i in response_list]
+        )
+        self.assertEqual([], json.loads(self._query_semantic_ids([]).data))
+        self.assertEqual(422, self._query_semantic_ids([{"check_for_key_type": True}]).status_code)
+        self.assertEqual(422, self._query_semantic_ids(["not a query"]).status_code)
+        self.assertEqual(422, self._query_semantic_ids([], include="everything").status_code)
+        with unittest.mock.patch.object(routes, "MAX_BATCH_QUERIES", 1):
+            response = self._query_semantic_ids([{"semantic_id": unknown_key}] * 2)
+        self.assertEqual(422, response.status_code)
+
+    def _query_elements(self, **kwargs):
+        return self.test_client.get(
+            "/query_elements",
+            headers=self.auth_headers,
+            data=json.dumps({"semantic_id": self.semantic_id_1.key[0], **kwargs},
+                            cls=json_serialization.AASToJsonEncoder)
+        )
+
+    def test_query_elements(self):
+        response = self._query_elements(model_type="Property", id_short_path="Test*", value={"eq": "TestValue"})
+        self.assertEqual(200, response.status_code)
+        self.assertEqual([{
+            "identifier": {"id": "https://example.com/sm/test_submodel01", "idType": "IRI"},
+            "asset_administration_shell": None,
+            "id_short_path": "TestProperty",
+            "model_type": "Property",
+            "value": "TestValue"
+        }], json.loads(response.data))
+        self.assertEqual([], json.loads(self._query_elements(value={"gt": "TestValue"}).data))
+        response = self._query_elements(id_short_path="", limit=1)
+        self.assertEqual(["https://example.com/sm/test_submodel01"],
+                         [i["identifier"]["id"] for i in json.loads(response.data)])
+        response = self._query_elements(id_short_path="", limit=1, cursor=response.headers["x-next-cursor"])
+        self.assertEqual(["https://example.com/sm/test_submodel03"],
+                         [i["identifier"]["id"] for i in json.loads(response.data)])
+        self.assertNotIn("x-next-cursor", response.headers)
+        self.assertEqual(422, self._query_elements(value={"between": 1}).status_code)
+        self.assertEqual(422, self._query_elements(value={"eq": None}).status_code)
+        self.assertEqual(422, self._query_elements(model_type=1).status_code)
+        cursor: str = base64.urlsafe_b64encode(json.dumps([1, 2, [3], 4, 5]).encode("utf-8")).decode("ascii")
+        self.assertEqual(422, self._query_elements(limit=1, cursor=cursor).status_code)
+
+    def test_query_elements_large_integer(self):
+        routes.OBJECT_STORE.add(model.Submodel(
+            identification=model.Identifier("https://example.com/sm/test_submodel04", model.IdentifierType.IRI),
+            submodel_element=[
+                model.Property(id_short="Large", value_type=model.datatypes.Integer, value=10 ** 30,
+                               semantic_id=self.semantic_id_1),
+                model.Property(id_short="Small", value_type=model.datatypes.Integer, value=-2 ** 63,
+                               semantic_id=self.semantic_id_1)
+            ]
+        ))
+        # Integers beyond 64 bits are returned as numbers, which every JSON implementation can represent
+        response = self._query_elements(model_type="Property", value={"ge": 10 ** 20})
+        self.assertEqual(200, response.status_code)
+        self.assertEqual([("Large", 1e30)], [(i["id_short_path"], i["value"]) for i in json.loads(response.data)])
+        response = self._query_elements(model_type="Property", value={"lt": 0})
+        self.assertEqual([-2 ** 63], [i["value"] for i in json.loads(response.data)])
+        response = self._query_semantic_id_one(include="value")
+        self.assertEqual(200, response.status_code)
+        self.assertIn(1e30, [i["value"] for i in json.loads(response.data)])
+
     def test_query_semantic_id_fail_400(self):
         response = self.test_client.get(
             "/query_semantic_id",
@@ -278,3 +759,150 @@ class QuerySemanticIDTest(unittest.TestCase):
             "Request does not have correct format",
             response.data.decode("utf-8")
         )
+
+
+class FileTest(unittest.TestCase):
+    def setUp(self) -> None:
+        routes.APP.config["TESTING"] = True
+        routes.APP.config['WTF_CSRF_ENABLED'] = False
+        routes.APP.config['DEBUG'] = True
+        auth.add_user("test", "test")  # Add a test user to the User DB
+        auth.LOGIN_RATE_LIMITER.reset()
+        self.test_client = routes.APP.test_client()
+        login = self.test_client.get("/login", headers={"Authorization": requests.auth._basic_auth_str("test", "test")})
+        self.token: str = json.loads(login.data)["token"]
+        self.auth_headers = {"x-access-tokens": "{}".format(self.token)}
+        self.file_name: str = "test_file.fmu"
+        self.file_content: bytes = bytes(range(256)) * 64
+        routes.FILE_STORE.add_stream(self.file_name, io.BytesIO(self.file_content), routes.MAX_FILE_SIZE)
+
+    def tearDown(self) -> None:
+        for file_name in (self.file_name, "copied_file.fmu"):
+            if routes.FILE_STORE.get_sha256(file_name) is not None:
+                routes.FILE_STORE.remove(file_name)
+        auth.remove_user("test")  # Remove the test user from the User DB
+
+    def test_get_file(self):
+        response = self.test_client.get("/get_file", headers=self.auth_headers, data="file:/" + self.file_name)
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(self.file_content, response.data)
+        self.assertEqual(str(len(self.file_content)), response.headers["Content-Length"])
+        self.assertEqual('"{}"'.format(hashlib.sha256(self.file_content).hexdigest()), response.headers["ETag"])
+        self.assertIn("Last-Modified", response.headers)
+        # Conditional request
+        response = self.test_client.get(
+            "/get_file",
+            headers={"If-None-Match": response.headers["ETag"], **self.auth_headers},
+            data="file:/" + self.file_name
+        )
+        self.assertEqual(304, response.status_code)
+
+    def test_get_file_range(self):
+        response = self.test_client.get(
+            "/get_file",
+            headers={"Range": "bytes=100-199", **self.auth_headers},
+            data="file:/" + self.file_name
+        )
+        self.assertEqual(206, response.status_code)
+        self.assertEqual(self.file_content[100:200], response.data)
+        self.assertEqual("bytes 100-199/{}".format(len(self.file_content)), response.headers["Content-Range"])
+        response = self.test_client.get(
+            "/get_file",
+            headers={"Range": "bytes={}-".format(len(self.file_content) + 1), **self.auth_headers},
+            data="file:/" + self.file_name
+        )
+        self.assertEqual(416, response.status_code)
+
+    def test_get_file_fail_404(self):
+        response = self.test_client.get("/get_file", headers=self.auth_headers, data="file:/unknown_file.fmu")
+        self.assertEqual(404, response.status_code)
+        response = self.test_client.get("/get_file", headers=self.auth_headers, data="file:/../config.ini.default")
+        self.assertEqual(404, response.status_code)
+
+    def test_post_file(self):
+        content: bytes = b"New content" * 1000
+        response = self.test_client.post(
+            "/post_file",
+            headers={"name": self.file_name, **self.auth_headers},
+            data=content
+        )
+        self.assertEqual(200, response.status_code)
+        self.assertEqual("file:" + self.file_name, response.data.decode("utf-8"))
+        self.assertEqual(hashlib.sha256(content).hexdigest(), response.headers["sha256"])
+        response = self.test_client.get("/get_file", headers=self.auth_headers, data="file:/" + self.file_name)
+        self.assertEqual(content, response.data)
+
+    def test_post_file_deduplicated(self):
+        sha256: str = hashlib.sha256(self.file_content).hexdigest()
+        response = self.test_client.get("/check_file", headers=self.auth_headers, data=sha256)
+        self.assertEqual(200, response.status_code)
+        response = self.test_client.get("/check_file", headers=self.auth_headers, data=hashlib.sha256().hexdigest())
+        self.assertEqual(404, response.status_code)
+        # The content is known, so it does not need to be uploaded again
+        response = self.test_client.post(
+            "/post_file",
+            headers={"name": "copied_file.fmu", "sha256": sha256, **self.auth_headers}
+        )
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(sha256, response.headers["sha256"])
+        response = self.test_client.get("/get_file", headers=self.auth_headers, data="file:/copied_file.fmu")
+        self.assertEqual(self.file_content, response.data)
+        # An uploaded File must match the given digest
+        response = self.test_client.post(
+            "/post_file",
+            headers={"name": "copied_file.fmu", "sha256": hashlib.sha256(b"content").hexdigest(), **self.auth_headers},
+            data=b"other content"
+        )
+        self.assertEqual(400, response.status_code)
+
+    def test_post_file_fail(self):
+        response = self.test_client.post("/post_file", headers=self.auth_headers, data=b"content")
+        self.assertEqual(400, response.status_code)
+        with unittest.mock.patch.object(routes, "MAX_FILE_SIZE", 10):
+            response = self.test_client.post(
+                "/post_file",
+                headers={"name": self.file_name, **self.auth_headers},
+                data=b"More than 10 bytes"
+            )
+        self.assertEqual(413, response.status_code)
+        # The existing File is kept
+        response = self.test_client.get("/get_file", headers=self.auth_headers, data="file:/" + self.file_name)
+        self.assertEqual(self.file_content, response.data)
+
+    def test_upload_session(self):
+        response = self.test_client.post("/initiate_upload", headers={"name": "copied_file.fmu", **self.auth_headers})
+        self.assertEqual(200, response.status_code)
+        upload_id: str = response.data.decode("utf-8")
+        for part_number, offset in ((2, 8192), (1, 0)):
+            response = self.test_client.put(
+                "/upload_part",
+                headers={"upload-id": upload_id, "part-number": str(part_number), **self.auth_headers},
+                data=self.file_content[offset:offset + 8192]
+            )
+            self.assertEqual(200, response.status_code)
+        response = self.test_client.put(
+            "/upload_part",
+            headers={"upload-id": upload_id, "part-number": "first", **self.auth_headers},
+            data=b"content"
+        )
+        self.assertEqual(400, response.status_code)
+        response = self.test_client.post("/complete_upload", headers={"upload-id": upload_id, **self.auth_headers})
+        self.assertEqual(200, response.status_code)
+        self.assertEqual("file:copied_file.fmu", response.data.decode("utf-8"))
+        self.assertEqual(hashlib.sha256(self.file_content).hexdigest(), response.headers["sha256"])
+        response = self.test_client.get("/get_file", headers=self.auth_headers, data="file:/copied_file.fmu")
+        self.assertEqual(self.file_content, response.data)
+        response = self.test_client.post("/complete_upload", headers={"upload-id": upload_id, **self.auth_headers})
+        self.assertEqual(404, response.status_code)
+
+    def test_abort_upload(self):
+        response = self.test_client.post("/initiate_upload", headers={"name": "copied_file.fmu", **self.auth_headers})
+        upload_id: str = response.data.decode("utf-8")
+        response = self.test_client.delete("/abort_upload", headers={"upload-id": upload_id, **self.auth_headers})
+        self.assertEqual(200, response.status_code)
+        response = self.test_client.put(
+            "/upload_part",
+            headers={"upload-id": upload_id, "part-number": "1", **self.auth_headers},
+            data=b"content"
+        )
+        self.assertEqual(404, response.status_code)
@@ -0,0 +1,71 @@
+import json
+import unittest
+import unittest.mock
+
+from basyx.aas import model
+from basyx.aas.adapter.json import json_serialization
+from basyx.aas.examples.data import example_aas
+from aas_repository_server import serialization
+
+
+class SerializationTest(unittest.TestCase):
+    def test_dumps(self):
+        for json_library in ("json", serialization.JSON_LIBRARY):
+            with unittest.mock.patch.object(serialization, "JSON_LIBRARY", json_library):
+                for identifiable in example_aas.create_full_example():
+                    expected = json.loads(json.dumps(identifiable, cls=json_serialization.AASToJsonEncoder))
+                    compact: bytes = serialization.dumps(identifiable)
+                    self.assertNotIn(b"\n", compact)
+                    self.assertEqual(expected, json.loads(compact))
+                    pretty: bytes = serialization.dumps(identifiable, pretty=True)
+                    self.assertIn(b"\n", pretty)
+                    self.assertEqual(expected, json.loads(pretty))
+
+    def test_dumps_nested(self):
+        identifier: model.Identifier = model.Identifier(
+            "https://example.com/sm/test_submodel",
+            model.IdentifierType.IRI
+        )
+        self.assertEqual(
+            [{"identifier": {"id": "https://example.com/sm/test_submodel", "idType": "IRI"}, "aas": None}],
+            json.loads(serialization.dumps([{"identifier": identifier, "aas": None}]))
+        )
+
+    def test_get_serialized_value(self):
+        self.assertEqual("5", serialization.get_serialized_value(model.Property("p", model.datatypes.Int, 5)))
+        self.assertIsNone(serialization.get_serialized_value(model.Range("r", model.datatypes.Int, 1, 2)))
+        collection = model.SubmodelElementCollectionUnordered(
+            "c", (model.Property("p", model.datatypes.String, "x"),))
+        self.assertEqual([{"idShort": "p", "modelType": {"name": "Property"}, "value": "x", "valueType": "string"}],
+                         json.loads(serialization.dumps(serialization.get_serialized_value(collection))))
+
+
+class SerializationCacheTest(unittest.TestCase):
+    def test_lru(self):
+        cache = serialization.SerializationCache(max_bytes=10)
+        cache.put(("a", False), b"aaaa", cache.generation)
+        cache.put(("b", False), b"bbbb", cache.generation)
+        self.assertIsNotNone(cache.get(("a", False)))
+        # "b" is the least recently used entry now
+        cache.put(("c", False), b"cccc", cache.generation)
+        self.assertIsNone(cache.get(("b", False)))
+        self.assertEqual(b"aaaa", cache.get(("a", False))[0])
+        self.assertEqual(b"cccc", cache.get(("c", False))[0])
+        # Data larger than the cache is not cached
+        data, etag = cache.put(("d", False), b"d" * 11, cache.generation)
+        self.assertEqual(b"d" * 11, data)
+        self.assertIsNone(cache.get(("d", False)))
+
+    def test_invalidate(self):
+        cache = serialization.SerializationCache(max_bytes=100)
+        data, etag = cache.put(("a", False), b"aaaa", cache.generation)
+        self.assertEqual((data, etag), cache.put(("a", True), b"aaaa", cache.generation))
+        cache.put(("b", False), b"bbbb", cache.generation)
+        generation: int = cache.generation
+        cache.invalidate("a")
+        self.assertIsNone(cache.get(("a", False)))
+        self.assertIsNone(cache.get(("a", True)))
+        self.assertIsNotNone(cache.get(("b", False)))
+        # Data read before the invalidation is not cached
+        cache.put(("a", False), b"aaaa", generation)
+        self.assertIsNone(cache.get(("a", False)))
@@ -1,8 +1,13 @@
+import gc
+import os
+import tempfile
+import threading
 import unittest
-from typing import Set, Dict
+import unittest.mock
+from typing import Callable, Optional, Set, List, Tuple
 
 from basyx.aas import model
-from aas_repository_server import routes, storage
+from aas_repository_server import backends, journal, routes, storage
 
 
 class RepositoryObjectStoreTest(unittest.TestCase):
@@ -93,3 +98,578 @@ class RepositoryObjectStoreTest(unittest.TestCase):
         query_2 = self.object_store.get_semantic_id(self.semantic_id_2.key[0])
         # Expected return: Submodel02
         self.assertEqual(1, len(query_2))
+
+    def test_get_semantic_id_check_flags(self):
+        self.object_store._index_semantic_ids()
+        other_type_key: model.Key = model.Key(
+            type_=model.KeyElements.CONCEPT_DESCRIPTION,
+            local=True,
+            value="https://example.com/semanticIDs/ONE",
+            id_type=model.KeyType.IRDI
+        )
+        # Only the value is compared by default
+        self.assertEqual(3, len(self.object_store.get_semantic_id(other_type_key)))
+        self.assertEqual(0, len(self.object_store.get_semantic_id(other_type_key, check_for_key_type=True)))
+        self.assertEqual(0, len(self.object_store.get_semantic_id(other_type_key, check_for_key_local=True)))
+        self.assertEqual(0, len(self.object_store.get_semantic_id(other_type_key, check_for_key_id_type=True)))
+        query = self.object_store.get_semantic_id(
+            self.semantic_id_1.key[0],
+            check_for_key_type=True,
+            check_for_key_local=True,
+            check_for_key_id_type=True
+        )
+        self.assertEqual(3, len(query))
+        unknown_key: model.Key = model.Key(
+            type_=model.KeyElements.GLOBAL_REFERENCE,
+            local=False,
+            value="https://example.com/semanticIDs/UNKNOWN",
+            id_type=model.KeyType.IRI
+        )
+        self.assertEqual(0, len(self.object_store.get_semantic_id(unknown_key)))
+
+    def test_query_semantic_ids(self):
+        unknown_key: model.Key = model.Key(
+            type_=model.KeyElements.GLOBAL_REFERENCE,
+            local=False,
+            value="https://example.com/semanticIDs/UNKNOWN",
+            id_type=model.KeyType.IRI
+        )
+        other_type_key: model.Key = model.Key(
+            type_=model.KeyElements.CONCEPT_DESCRIPTION,
+            local=False,
+            value="https://example.com/semanticIDs/TWO",
+            id_type=model.KeyType.IRI
+        )
+        queries = [
+            storage.SemanticIDQuery(self.semantic_id_1.key[0]),
+            storage.SemanticIDQuery(unknown_key),
+            storage.SemanticIDQuery(other_type_key, check_for_key_type=True),
+            storage.SemanticIDQuery(other_type_key),
+            storage.SemanticIDQuery(self.semantic_id_1.key[0]),
+        ]
+        results = self.object_store.query_semantic_ids(queries)
+        self.assertEqual([3, 0, 0, 1, 3], [len(result) for result in results])
+        for query, result in zip(queries, results):
+            self.assertEqual(self.object_store.get_semantic_id(*query), set(result))
+
+    def test_incremental_index_add_discard(self):
+        # The objects added in setUp are indexed without rebuilding the index
+        self.assertEqual(3, len(self.object_store.get_semantic_id(self.semantic_id_1.key[0])))
+        self.object_store.discard(self.identifiable1)
+        query_1 = self.object_store.get_semantic_id(self.semantic_id_1.key[0])
+        self.assertEqual({self.identifiable3.identification}, {i.parent_identifiable for i in query_1})
+        self.object_store.discard(self.identifiable3)
+        self.assertEqual(0, len(self.object_store.get_semantic_id(self.semantic_id_1.key[0])))
+        self.assertNotIn(self.semantic_id_1.key[0].value, self.object_store.semantic_id_value_index)
+
+    def test_incremental_index_aas(self):
+        aas: model.AssetAdministrationShell = model.AssetAdministrationShell(
+            asset=model.AASReference((model.Key(
+                type_=model.KeyElements.ASSET,
+                local=False,
+                value="https://example.com/asset/test_asset",
+                id_type=model.KeyType.IRI
+            ),), model.Asset),
+            identification=model.Identifier("https://example.com/aas/test_aas", model.IdentifierType.IRI),
+            submodel={model.AASReference.from_referable(self.identifiable2)}
+        )
+        self.object_store.add(aas)
+        query_2 = self.object_store.get_semantic_id(self.semantic_id_2.key[0])
+        self.assertEqual({aas.identification}, {i.parent_asset_administration_shell for i in query_2})
+        self.object_store.discard(aas)
+        query_2 = self.object_store.get_semantic_id(self.semantic_id_2.key[0])
+        self.assertEqual({None}, {i.parent_asset_administration_shell for i in query_2})
+
+    def test_index_shared_submodel(self):
+        aas_identifiers: Set[model.Identifier] = set()
+        for i in range(2):
+            aas: model.AssetAdministrationShell = model.AssetAdministrationShell(
+                asset=model.AASReference((model.Key(
+                    type_=model.KeyElements.ASSET,
+                    local=False,
+                    value="https://example.com/asset/test_asset",
+                    id_type=model.KeyType.IRI
+                ),), model.Asset),
+                identification=model.Identifier("https://example.com/aas/test_aas{}".format(i),
+                                                model.IdentifierType.IRI),
+                submodel={model.AASReference.from_referable(self.identifiable1)}
+            )
+            self.object_store.add(aas)
+            aas_identifiers.add(aas.identification)
+        # The Submodel is indexed only once, but returned for each AAS
+        self.assertEqual(3, len(self.object_store.semantic_id_index[self.semantic_id_1.key[0]]))
+        self.object_store._index_semantic_ids()
+        self.assertEqual(3, len(self.object_store.semantic_id_index[self.semantic_id_1.key[0]]))
+        query_1 = self.object_store.get_semantic_id(self.semantic_id_1.key[0])
+        self.assertEqual(5, len(query_1))
+        self.assertEqual(
+            {(self.identifiable1.identification, aas_identifier) for aas_identifier in aas_identifiers}
+            | {(self.identifiable3.identification, None)},
+            {(i.parent_identifiable, i.parent_asset_administration_shell) for i in query_1}
+        )
+
+    def test_index_aas_with_repeated_submodel(self):
+        local_reference = model.AASReference.from_referable(self.identifiable2)
+        non_local_reference = model.AASReference(
+            tuple(model.Key(key.type, False, key.value, key.id_type) for key in local_reference.key), model.Submodel)
+        self.assertNotEqual(local_reference, non_local_reference)
+        aas: model.AssetAdministrationShell = model.AssetAdministrationShell(
+            asset=model.AASReference((model.Key(
+                type_=model.KeyElements.ASSET,
+                local=False,
+                value="https://example.com/asset/test_asset",
+                id_type=model.KeyType.IRI
+            ),), model.Asset),
+            identification=model.Identifier("https://example.com/aas/test_aas", model.IdentifierType.IRI),
+            submodel={local_reference, non_local_reference}
+        )
+        self.assertEqual([self.identifiable2.identification], backends.get_index_record(aas).submodels)
+        self.object_store.add(aas)
+        updated: model.AssetAdministrationShell = model.AssetAdministrationShell(
+            asset=aas.asset, identification=aas.identification, id_short="updated",
+            submodel={local_reference, non_local_reference})
+        self.object_store.update_identifiable(updated)
+        query_2 = self.object_store.get_semantic_id(self.semantic_id_2.key[0])
+        self.assertEqual({aas.identification}, {i.parent_asset_administration_shell for i in query_2})
+        # Records written before the Identifiers were deduplicated can still be removed
+        self.object_store._aas_submodels[aas.identification] = [self.identifiable2.identification] * 2
+        self.object_store.discard(self.object_store.get_identifiable(aas.identification))
+        self.assertNotIn(aas.identification, self.object_store)
+        self.assertNotIn(self.identifiable2.identification, self.object_store.submodel_aas_index)
+
+    def test_index_submodel_added_after_aas(self):
+        self.object_store.discard(self.identifiable2)
+        aas: model.AssetAdministrationShell = model.AssetAdministrationShell(
+            asset=model.AASReference((model.Key(
+                type_=model.KeyElements.ASSET,
+                local=False,
+                value="https://example.com/asset/test_asset",
+                id_type=model.KeyType.IRI
+            ),), model.Asset),
+            identification=model.Identifier("https://example.com/aas/test_aas", model.IdentifierType.IRI),
+            submodel={model.AASReference.from_referable(self.identifiable2)}
+        )
+        self.object_store.add(aas)
+        self.assertEqual(0, len(self.object_store.get_semantic_id(self.semantic_id_2.key[0])))
+        self.object_store.add(self.identifiable2)
+        query_2 = self.object_store.get_semantic_id(self.semantic_id_2.key[0])
+        self.assertEqual({aas.identification}, {i.parent_asset_administration_shell for i in query_2})
+
+    def test_incremental_index_update(self):
+        updated: model.Submodel = model.Submodel(
+            identification=self.identifiable3.identification,
+            id_short="exampleSM",
+            semantic_id=self.semantic_id_2
+        )
+        self.assertEqual(2, self.object_store.update_identifiable(updated).number)
+        # The change is written through to the backend and the local replication is updated
+        stored, version = self.object_store.backend.get(updated.identification)
+        self.assertEqual(("exampleSM", 2), (stored.id_short, version.number))
+        self.assertEqual("exampleSM", self.identifiable3.id_short)
+        self.assertIs(self.identifiable3, self.object_store.get_identifiable(updated.identification))
+        self.assertEqual(2, len(self.object_store.get_semantic_id(self.semantic_id_1.key[0])))
+        query_2 = self.object_store.get_semantic_id(self.semantic_id_2.key[0])
+        self.assertEqual(
+            {self.identifiable2.identification, self.identifiable3.identification},
+            {i.parent_identifiable for i in query_2}
+        )
+        with self.assertRaises(KeyError):
+            self.object_store.update_identifiable(model.Submodel(
+                identification=model.Identifier("https://example.com/sm/unknown", model.IdentifierType.IRI)
+            ))
+
+    def test_index_does_not_keep_referables(self):
+        identifier: model.Identifier = model.Identifier(
+            "https://example.com/sm/test_submodel04",
+            model.IdentifierType.IRI
+        )
+        self.object_store.add(model.Submodel(
+            identification=identifier,
+            submodel_element=[
+                model.Property(id_short="TestProperty", value_type=model.datatypes.String,
+                               semantic_id=self.semantic_id_2)
+            ]
+        ))
+        gc.collect()
+        self.assertNotIn(identifier, self.object_store._object_cache)
+        elements = [i for i in self.object_store.get_semantic_id(self.semantic_id_2.key[0])
+                    if i.parent_identifiable == identifier]
+        self.assertEqual(1, len(elements))
+        self.assertEqual(("TestProperty",), elements[0].id_short_path)
+        self.assertEqual("TestProperty", elements[0].resolve_referable(self.object_store).id_short)
+
+    def test_add_batch(self):
+        submodels: List[model.Submodel] = [
+            model.Submodel(
+                identification=model.Identifier("https://example.com/sm/batch{}".format(i), model.IdentifierType.IRI),
+                semantic_id=self.semantic_id_2
+            )
+            for i in range(2)
+        ]
+        changed: List[model.Identifier] = []
+        self.object_store.change_listeners.append(changed.append)
+        try:
+            results = self.object_store.add_batch([submodels[0], self.identifiable1, submodels[1]])
+        finally:
+            self.object_store.change_listeners.remove(changed.append)
+        self.assertEqual([None, KeyError, None], [e if e is None else type(e) for e in results])
+        self.assertEqual([sm.identification for sm in submodels], changed)
+        self.assertEqual(3, len(self.object_store.get_semantic_id(self.semantic_id_2.key[0])))
+        self.assertIs(submodels[1], self.object_store.get_identifiable(submodels[1].identification))
+
+
+class ReadWriteLockTest(unittest.TestCase):
+    def test_read_write_lock(self):
+        lock = storage.ReadWriteLock()
+        events: List[str] = []
+        readers_inside = threading.Barrier(3)
+
+        def read() -> None:
+            with lock.read():
+                # All readers hold the lock at the same time
+                readers_inside.wait(timeout=5)
+                events.append("read")
+
+        def write() -> None:
+            with lock.write():
+                events.append("write")
+
+        with lock.read():
+            readers = [threading.Thread(target=read) for _ in range(2)]
+            for reader in readers:
+                reader.start()
+            readers_inside.wait(timeout=5)
+            writer = threading.Thread(target=write)
+            writer.start()
+            writer.join(timeout=0.1)
+            # The writer waits for the readers to release the lock
+            self.assertTrue(writer.is_alive())
+        for thread in (*readers, writer):
+            thread.join(timeout=5)
+        self.assertEqual(["read", "read", "write"], events)
+
+
+class ThreadSafetyTest(unittest.TestCase):
+    """
+    Stress test querying the index of a RepositoryObjectStore, while other threads modify it
+    """
+    NUMBER_OF_SUBMODELS = 20
+    DURATION = 1.0
+
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.object_store = storage.RepositoryObjectStore(
+            backends.SQLiteBackend(os.path.join(self.temp_dir.name, "aas_store.sqlite3")))
+        self.semantic_id: model.Key = model.Key(
+            type_=model.KeyElements.GLOBAL_REFERENCE,
+            local=False,
+            value="https://example.com/semanticIDs/ONE",
+            id_type=model.KeyType.IRI
+        )
+        self.object_store.add_batch(self._make_submodel(i, 0) for i in range(self.NUMBER_OF_SUBMODELS))
+
+    def tearDown(self) -> None:
+        self.object_store.close()
+        self.temp_dir.cleanup()
+
+    def _make_submodel(self, i: int, revision: int, prefix: str = "sm") -> model.Submodel:
+        return model.Submodel(
+            identification=model.Identifier("https://example.com/{}/{}".format(prefix, i), model.IdentifierType.IRI),
+            submodel_element=[
+                model.Property(
+                    id_short="Revision{}".format(revision),
+                    value_type=model.datatypes.String,
+                    semantic_id=model.Reference((self.semantic_id,))
+                )
+            ]
+        )
+
+    def test_concurrent_queries_and_writes(self):
+        errors: List[BaseException] = []
+        stop = threading.Event()
+
+        def run(function: Callable[[int], None]) -> Callable[[], None]:
+            def target() -> None:
+                i = 0
+                try:
+                    while not stop.is_set():
+                        function(i)
+                        i += 1
+                except BaseException as e:
+                    errors.append(e)
+                    stop.set()
+            return target
+
+        def update(i: int) -> None:
+            self.object_store.update_identifiable(self._make_submodel(i % self.NUMBER_OF_SUBMODELS, i))
+
+        def add_discard(i: int) -> None:
+            submodel = self._make_submodel(i, i, prefix="temporary")
+            self.object_store.add(submodel)
+            self.object_store.discard(submodel)
+
+        def query(i: int) -> None:
+            elements = [element for element in self.object_store.iter_semantic_id(self.semantic_id)
+                        if element.parent_identifiable.id.startswith("https://example.com/sm/")]
+            # Each of the updated Submodels is indexed exactly once at any time
+            self.assertEqual(self.NUMBER_OF_SUBMODELS, len(elements))
+            self.assertEqual(self.NUMBER_OF_SUBMODELS, len({element.parent_identifiable for element in elements}))
+            self.object_store.get_semantic_id_page(self.semantic_id, limit=5)
+
+        threads = [threading.Thread(target=run(function))
+                   for function in (update, update, add_discard, query, query, query)]
+        for thread in threads:
+            thread.start()
+        stop.wait(self.DURATION)
+        stop.set()
+        for thread in threads:
+            thread.join()
+        self.assertEqual([], errors)
+        # The incrementally updated index equals a rebuilt one
+        semantic_id_index = {key: set(elements) for key, elements in self.object_store.semantic_id_index.items()}
+        self.object_store.rebuild_semantic_index()
+        self.assertEqual(self.object_store.semantic_id_index, semantic_id_index)
+
+
+class SharedStorageTest(unittest.TestCase):
+    """
+    Two object stores sharing a backend and change journal, as two processes of the server would
+    """
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.stores: List[storage.RepositoryObjectStore] = [self._create_store() for _ in range(2)]
+        self.semantic_id: model.Key = model.Key(
+            type_=model.KeyElements.GLOBAL_REFERENCE,
+            local=False,
+            value="https://example.com/semanticIDs/ONE",
+            id_type=model.KeyType.IRI
+        )
+        self.submodel: model.Submodel = model.Submodel(
+            identification=model.Identifier("https://example.com/sm/test_submodel01", model.IdentifierType.IRI),
+            semantic_id=model.Reference((self.semantic_id,))
+        )
+
+    def tearDown(self) -> None:
+        for store in self.stores:
+            store.close()
+        self.temp_dir.cleanup()
+
+    def _create_store(self) -> storage.RepositoryObjectStore:
+        return storage.RepositoryObjectStore(
+            backends.SQLiteBackend(os.path.join(self.temp_dir.name, "aas_store.sqlite3")),
+            journal.ChangeJournal(os.path.join(self.temp_dir.name, "journal.sqlite3"))
+        )
+
+    def test_sync(self):
+        writer, reader = self.stores
+        changed: List[Optional[model.Identifier]] = []
+        reader.change_listeners.append(changed.append)
+        writer.add(self.submodel)
+        self.assertEqual(set(), reader.get_semantic_id(self.semantic_id))
+        reader.sync()
+        self.assertEqual({storage.SemanticIndexElement(self.submodel.identification)},
+                         reader.get_semantic_id(self.semantic_id))
+        self.assertEqual([self.submodel.identification], changed)
+        # The local replication of the reader is updated
+        replication: model.Identifiable = reader.get_identifiable(self.submodel.identification)
+        writer.update_identifiable(model.Submodel(identification=self.submodel.identification, id_short="Updated"))
+        reader.sync()
+        self.assertEqual("Updated", replication.id_short)
+        self.assertEqual(set(), reader.get_semantic_id(self.semantic_id))
+        writer.discard(self.submodel)
+        reader.sync()
+        self.assertNotIn(self.submodel.identification, reader._object_cache)
+        self.assertEqual([self.submodel.identification] * 3, changed)
+        # The writer does not apply its own changes again
+        with unittest.mock.patch.object(writer, "_reload") as reload:
+            writer.sync()
+            reload.assert_not_called()
+
+    def test_forked_process(self):
+        # A process forked after the stores were created, e.g. a worker of `gunicorn --preload`
+        writer, reader = self.stores
+        inherited_connection = writer.backend._connection
+        pid: int = os.fork()
+        if pid == 0:
+            try:
+                # The child opens its own connections instead of using the inherited ones
+                if writer.backend._connection is inherited_connection:
+                    os._exit(2)
+                writer.add(self.submodel)
+            except BaseException:
+                os._exit(1)
+            os._exit(0)
+        self.assertEqual(0, os.waitstatus_to_exitcode(os.waitpid(pid, 0)[1]))
+        self.assertIs(inherited_connection, writer.backend._connection)
+        # The change of the child is applied by both stores of the parent
+        for store in self.stores:
+            store.sync()
+            self.assertEqual({storage.SemanticIndexElement(self.submodel.identification)},
+                             store.get_semantic_id(self.semantic_id))
+        writer.discard(self.submodel)
+        reader.sync()
+        self.assertEqual(set(), reader.get_semantic_id(self.semantic_id))
+
+    def test_sync_removed_changes(self):
+        writer, reader = self.stores
+        changed: List[Optional[model.Identifier]] = []
+        reader.change_listeners.append(changed.append)
+        writer.change_journal.PRUNE_INTERVAL = 0
+        writer.change_journal.retention = -1
+        writer.add(self.submodel)
+        # The change has been removed from the journal before the reader applied it
+        reader.sync()
+        self.assertEqual({storage.SemanticIndexElement(self.submodel.identification)},
+                         reader.get_semantic_id(self.semantic_id))
+        self.assertEqual([None], changed)
+
+    def test_sync_failed(self):
+        writer, reader = self.stores
+        writer.add(self.submodel)
+        # Applying the changes fails, e.g. since a file is discarded by another process meanwhile
+        with unittest.mock.patch.object(reader.backend, "get", side_effect=OSError()):
+            with self.assertRaises(OSError):
+                reader.sync()
+        reader.sync()
+        self.assertEqual({storage.SemanticIndexElement(self.submodel.identification)},
+                         reader.get_semantic_id(self.semantic_id))
+        # The same for rebuilding the whole index, if the changes have been removed from the journal
+        writer.change_journal.PRUNE_INTERVAL = 0
+        writer.change_journal.retention = -1
+        writer.discard(self.submodel)
+        with unittest.mock.patch.object(reader.backend, "load_index_records", side_effect=OSError()):
+            with self.assertRaises(OSError):
+                reader.sync()
+        reader.sync()
+        self.assertEqual(set(), reader.get_semantic_id(self.semantic_id))
+
+
+class QueryElementsTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.object_store = storage.RepositoryObjectStore(
+            backends.SQLiteBackend(os.path.join(self.temp_dir.name, "aas_store.sqlite3")))
+        self.semantic_id: model.Key = model.Key(
+            type_=model.KeyElements.GLOBAL_REFERENCE,
+            local=False,
+            value="https://example.com/semanticIDs/ONE",
+            id_type=model.KeyType.IRI
+        )
+        self.submodels: List[model.Submodel] = [self._make_submodel(i) for i in range(3)]
+        self.object_store.add_batch(self.submodels)
+
+    def tearDown(self) -> None:
+        self.object_store.close()
+        self.temp_dir.cleanup()
+
+    def _make_submodel(self, i: int) -> model.Submodel:
+        semantic_id = model.Reference((self.semantic_id,))
+        return model.Submodel(
+            identification=model.Identifier("https://example.com/sm/{}".format(i), model.IdentifierType.IRI),
+            semantic_id=semantic_id,
+            submodel_element=[
+                model.SubmodelElementCollectionUnordered(
+                    id_short="Measurements",
+                    semantic_id=semantic_id,
+                    value=[
+                        model.Property(id_short="Temperature{}".format(j), value_type=model.datatypes.Int,
+                                       value=10 * i + j, semantic_id=semantic_id)
+                        for j in range(3)
+                    ]
+                ),
+                model.Property(id_short="Name", value_type=model.datatypes.String, value="sm{}".format(i),
+                               semantic_id=semantic_id),
+                model.Property(id_short="Active", value_type=model.datatypes.Boolean, value=i == 0,
+                               semantic_id=semantic_id),
+            ]
+        )
+
+    def _query(self, **kwargs) -> Set[Tuple[str, str]]:
+        return {(element.parent_identifiable.id.rsplit("/", 1)[1], ".".join(element.id_short_path))
+                for element, _ in self.object_store.query_elements(self.semantic_id, **kwargs)}
+
+    def test_query_elements(self):
+        self.assertEqual(21, len(self._query()))
+        self.assertEqual(3, len(self._query(model_type="SubmodelElementCollectionUnordered")))
+        self.assertEqual({("0", ""), ("1", ""), ("2", "")}, self._query(model_type="Submodel"))
+        self.assertEqual(9, len(self._query(id_short_path="Measurements.*")))
+        self.assertEqual({("1", "Measurements.Temperature1")},
+                         self._query(id_short_path="**.Temperature1", value={"ge": 5, "lt": 12}))
+        self.assertEqual({("1", "Measurements.Temperature0"), ("1", "Measurements.Temperature2"),
+                          ("2", "Measurements.Temperature0")},
+                         self._query(value={"ge": 10, "le": 20, "ne": 11}))
+        self.assertEqual({("2", "Measurements.Temperature2")}, self._query(value={"gt": 21.5}))
+        self.assertEqual({("1", "Name")}, self._query(value={"eq": "sm1"}))
+        self.assertEqual({("0", "Active")}, self._query(value={"eq": True}))
+        # Values of other types are never compared
+        self.assertEqual(set(), self._query(value={"ge": 0, "lt": "z"}))
+        element, attributes = next(self.object_store.query_elements(self.semantic_id, id_short_path="Name"))
+        self.assertEqual(backends.ElementAttributes("Property", "sm{}".format(
+            element.parent_identifiable.id[-1])), attributes)
+
+    def test_value_index_updates(self):
+        submodel: model.Submodel = self._make_submodel(1)
+        submodel.get_referable("Measurements").get_referable("Temperature1").value = 100
+        self.object_store.update_identifiable(submodel)
+        self.object_store.discard(self.submodels[2])
+        self.assertEqual({("1", "Measurements.Temperature1")}, self._query(value={"gt": 12}))
+        property_value_index = {key: list(entries) for key, entries in self.object_store.property_value_index.items()}
+        element_attributes = dict(self.object_store.element_attributes)
+        self.object_store.rebuild_semantic_index()
+        self.assertEqual(self.object_store.property_value_index, property_value_index)
+        self.assertEqual(self.object_store.element_attributes, element_attributes)
+
+    def test_repeated_key(self):
+        # A Reference repeating the same Key
+        submodel: model.Submodel = model.Submodel(
+            identification=model.Identifier("https://example.com/sm/repeated", model.IdentifierType.IRI),
+            submodel_element=[model.Property(id_short="Repeated", value_type=model.datatypes.Int, value=5,
+                                             semantic_id=model.Reference((self.semantic_id, self.semantic_id)))]
+        )
+        self.assertEqual(1, len(backends.get_index_record(submodel).semantic_ids))
+        self.object_store.add(submodel)
+        submodel.get_referable("Repeated").value = 6
+        self.object_store.update_identifiable(submodel)
+        self.assertEqual([6], [entry[0][1] for entry in self.object_store.property_value_index[self.semantic_id]
+                               if entry[2].parent_identifiable == submodel.identification])
+        # Records with repeated Keys, e.g. written before they were deduplicated, are indexed once as well
+        record: backends.IndexRecord = backends.get_index_record(submodel)
+        with self.object_store._index_lock.write():
+            self.object_store._remove_index_record(submodel.identification)
+            self.object_store._add_index_record(record._replace(semantic_ids=record.semantic_ids * 2))
+            self.object_store._remove_index_record(submodel.identification)
+        self.assertEqual([], [entry for entry in self.object_store.property_value_index[self.semantic_id]
+                              if entry[2].parent_identifiable == submodel.identification])
+
+    def test_get_page(self):
+        elements: List[Tuple[storage.SemanticIndexElement, backends.ElementAttributes]] = list(
+            self.object_store.query_elements(self.semantic_id, model_type="Property"))
+        pages: List[List[Tuple[storage.SemanticIndexElement, backends.ElementAttributes]]] = []
+        after: Optional[Tuple] = None
+        while True:
+            page = storage.get_page(elements, 4, after, lambda item: item[0].get_sort_key())
+            if not page:
+                break
+            pages.append(page)
+            after = page[-1][0].get_sort_key()
+        self.assertEqual([4, 4, 4, 3], [len(page) for page in pages])
+        self.assertEqual(sorted(elements, key=lambda item: item[0].get_sort_key()),
+                         [item for page in pages for item in page])
+
+    def test_match_id_short_path(self):
+        self.assertTrue(storage.match_id_short_path("", ()))
+        self.assertFalse(storage.match_id_short_path("", ("A",)))
+        self.assertTrue(storage.match_id_short_path("A.B*", ("A", "Bc")))
+        self.assertFalse(storage.match_id_short_path("A.*", ("A", "B", "C")))
+        self.assertTrue(storage.match_id_short_path("A.**", ("A", "B", "C")))
+        self.assertTrue(storage.match_id_short_path("**.C", ("A", "B", "C")))
+        self.assertTrue(storage.match_id_short_path("**.C", ("C",)))
+        self.assertFalse(storage.match_id_short_path("**.C", ("C", "D")))
+        self.assertTrue(storage.match_id_short_path("**.**.B.**", ("A", "B")))
+        self.assertTrue(storage.match_id_short_path("**.A.**.B", ("A", "A", "C", "B")))
+        self.assertFalse(storage.match_id_short_path("**.B.**.B", ("A", "B", "C")))
+        # Many `**` do not make the matching exponential
+        id_short_path: Tuple[str, ...] = tuple("Level{}".format(i) for i in range(12))
+        with unittest.mock.patch.object(storage.fnmatch, "fnmatchcase", wraps=storage.fnmatch.fnmatchcase) as match:
+            self.assertFalse(storage.match_id_short_path("**." * 8 + "*.**.nomatch", id_short_path))
+            self.assertLessEqual(match.call_count, 2 * len(id_short_path))
@@ -0,0 +1,79 @@
+import io
+import os
+import tempfile
+import unittest
+import unittest.mock
+from typing import List
+
+from basyx.aas import model
+from aas_repository_server import backends, routes, storage, transfer
+
+
+class TransferTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.semantic_id: model.Key = model.Key(
+            type_=model.KeyElements.GLOBAL_REFERENCE,
+            local=False,
+            value="https://example.com/semanticIDs/ONE",
+            id_type=model.KeyType.IRI
+        )
+        self.source_store: storage.RepositoryObjectStore = self._create_object_store("source")
+        self.submodels: List[model.Submodel] = [
+            model.Submodel(
+                identification=model.Identifier("https://example.com/sm/{}".format(i), model.IdentifierType.IRI),
+                id_short="SM{}".format(i),
+                semantic_id=model.Reference((self.semantic_id,))
+            )
+            for i in range(5)
+        ]
+        self.source_store.add_batch(self.submodels)
+
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
+
+    def _create_object_store(self, name: str) -> storage.RepositoryObjectStore:
+        storage_dir: str = os.path.join(self.temp_dir.name, name)
+        os.makedirs(storage_dir)
+        return storage.RepositoryObjectStore(
+            backends.LocalFileBackend(storage_dir, os.path.join(self.temp_dir.name, name + ".sqlite3")))
+
+    def test_export_import(self):
+        lines: List[bytes] = list(transfer.export_ndjson(self.source_store))
+        self.assertEqual(5, len(lines))
+        self.assertTrue(all(line.endswith(b"}\n") and line.count(b"\n") == 1 for line in lines))
+        for rebuild_index in (False, True):
+            with self.subTest(rebuild_index=rebuild_index):
+                target_store = self._create_object_store("target{}".format(rebuild_index))
+                with unittest.mock.patch.object(target_store, "add_batch", wraps=target_store.add_batch) as add_batch:
+                    result = transfer.import_ndjson(target_store, lines, batch_size=2, rebuild_index=rebuild_index)
+                    self.assertEqual(3, add_batch.call_count)
+                self.assertEqual(transfer.ImportResult(5, []), result)
+                self.assertEqual(5, len(target_store.get_semantic_id(self.semantic_id)))
+                self.assertEqual("SM3", target_store.get_identifiable(self.submodels[3].identification).id_short)
+                self.assertEqual(5, len(target_store.backend.semantic_index_snapshot.get_file_stats()))
+
+    def test_import_errors(self):
+        lines: List[bytes] = list(transfer.export_ndjson(self.source_store))
+        result = transfer.import_ndjson(
+            self.source_store,
+            [b"not JSON\n", b"\n", b'{"modelType": {"name": "Property"}}\n', lines[0]],
+        )
+        self.assertEqual(0, result.added)
+        self.assertEqual([1, 3, 4], [line_number for line_number, _ in result.errors])
+
+    def test_iter_batches(self):
+        self.assertEqual([[0, 1], [2, 3], [4]], list(transfer.iter_batches(range(5), 2)))
+        self.assertEqual([], list(transfer.iter_batches([], 2)))
+
+    def test_cli(self):
+        file_path: str = os.path.join(self.temp_dir.name, "export.ndjson")
+        with unittest.mock.patch.object(routes, "OBJECT_STORE", self.source_store):
+            self.assertEqual(0, transfer.main(["export", file_path]))
+        target_store = self._create_object_store("target")
+        with unittest.mock.patch.object(routes, "OBJECT_STORE", target_store), \
+                unittest.mock.patch("sys.stderr", new_callable=io.StringIO) as stderr:
+            self.assertEqual(0, transfer.main(["import", "--rebuild-index", file_path]))
+            self.assertIn("Imported 5 Identifiables", stderr.getvalue())
+            self.assertEqual(1, transfer.main(["import", file_path]))
+        self.assertEqual(5, len(target_store.get_semantic_id(self.semantic_id)))